@@ -0,0 +1,415 @@
+import gc
+import inspect
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from signal import SIGKILL
+from typing import Any, Callable, Optional, cast
+
+from pydantic import RootModel
+from risk_engine.censoring.censor_record import CensorRecord
+from risk_engine.game.state_mutator import StateMutator
+from risk_engine.output.recording_inspector import RecordingInspector
+from risk_engine.validation.move_validator import MoveValidator
+from risk_shared.queries.query_attack import QueryAttack
+from risk_shared.queries.query_claim_territory import QueryClaimTerritory
+from risk_shared.queries.query_defend import QueryDefend
+from risk_shared.queries.query_distribute_troops import QueryDistributeTroops
+from risk_shared.queries.query_fortify import QueryFortify
+from risk_shared.queries.query_place_initial_troop import QueryPlaceInitialTroop
+from risk_shared.queries.query_redeem_cards import QueryRedeemCards
+from risk_shared.queries.query_troops_after_attack import QueryTroopsAfterAttack
+from risk_shared.queries.query_type import QueryType
+from risk_shared.records.base_move import BaseMove
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_attack_pass import MoveAttackPass
+from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
+from risk_shared.records.moves.move_defend import MoveDefend
+from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
+from risk_shared.records.moves.move_fortify import MoveFortify
+from risk_shared.records.moves.move_fortify_pass import MoveFortifyPass
+from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
+from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
+from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
+from risk_shared.records.record_start_game import RecordStartGame
+from risk_shared.records.types.move_type import MoveType
+from risk_shared.records.types.record_type import RecordType
+from tournament_simulator import setup_sandbox, start_engine, start_submissions
+
+# Parts of the engine which an older engine may not have yet are feature-detected rather than imported outright,
+# so that a baseline can be recorded on an engine from before they were added. Components which can't be timed
+# are listed under "missing" in the results, and --compare reports them as missing rather than failing.
+try:
+    from risk_engine.headless_engine import HeadlessGameEngine
+except ImportError:
+    HeadlessGameEngine = None
+
+try:
+    from risk_helper.random_bot import RandomBot
+except ImportError:
+    RandomBot = None
+
+try:
+    from risk_engine.connection.local_connection import LocalPlayerConnection
+    from risk_engine.connection.player_connection import ENCODING_COMPACT, dump_query
+    from risk_engine.game.state_checkpoints import create_replay_state, replay_record
+except ImportError:
+    create_replay_state = None
+
+NUM_PLAYERS = 5
+BENCHMARK_VERSION = 3
+
+INSPECTOR_OUTPUTS = ["get_result", "get_recording_json", "get_recording_binary", "get_visualiser_forwards_backwards_differential_json", "get_output"]
+
+def main():
+
+    # python3 benchmark.py --games 3 --output benchmark_results.json
+    # python3 benchmark.py --recordings output/game.json --compare benchmark_results.json
+    # python3 benchmark.py --games 0 --throughput 5
+
+    commands = parse_cmd_args(sys.argv[1:])
+
+    try:
+        games = int(commands["--games"][0]) if "--games" in commands else 3
+        seed = int(commands["--seed"][0]) if "--seed" in commands else 0
+        repeat = int(commands["--repeat"][0]) if "--repeat" in commands else 3
+        threshold = float(commands["--threshold"][0]) if "--threshold" in commands else 0.1
+        throughput = int(commands["--throughput"][0]) if "--throughput" in commands else 0
+    except (ValueError, IndexError):
+        print_usage()
+
+    output = commands["--output"][0] if "--output" in commands else "benchmark_results.json"
+    baseline = commands["--compare"][0] if "--compare" in commands else None
+
+    # The workloads are recordings, either of synthetic games played here between seeded in-process bots (so the
+    # same seed always benchmarks the same games), or of real games read from game.json files.
+    workloads: list[tuple[str, list[RecordType]]] = []
+    if games > 0 and not can_play_synthetic_games():
+        print("[benchmark]: this engine can't play seeded in-process games, only --recordings will be benchmarked.", flush=True)
+        games = 0
+    for i in range(games):
+        print(f"[benchmark]: playing synthetic game {i + 1}/{games}.", flush=True)
+        workloads.append((f"synthetic:{seed + i}", play_synthetic_game(seed + i)))
+    for path in commands.get("--recordings", []):
+        with open(path, "r") as f:
+            workloads.append((path, RootModel[list[RecordType]].model_validate_json(f.read()).root))
+
+    if len(workloads) == 0 and throughput == 0:
+        print_usage()
+
+    # Garbage collections would land on whichever call happened to trigger them, so they're kept out of the timings.
+    timings: dict[str, list[int]] = defaultdict(list)
+    missing: set[str] = set()
+    for name, recording in workloads:
+        print(f"[benchmark]: timing {name} ({len(recording)} records).", flush=True)
+        gc.collect()
+        gc.disable()
+        try:
+            time_recording(recording, repeat, timings, missing)
+        finally:
+            gc.enable()
+
+    results = {
+        "version": BENCHMARK_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workloads": [{ "name": name, "records": len(recording) } for name, recording in workloads],
+        "components": dict([(x, summarise(y)) for x, y in sorted(timings.items())]),
+        "missing": sorted(missing),
+    }
+
+    if throughput > 0 and not can_play_synthetic_games():
+        print("[benchmark]: this engine can't play seeded in-process games, so its throughput can't be measured.", flush=True)
+    elif throughput > 0:
+        results["throughput"] = measure_throughput(throughput, seed)
+        print(f"[benchmark]: {results['throughput']['headless_matches_per_core_hour']:.0f} headless against {results['throughput']['pipe_matches_per_core_hour']:.0f} pipe matches per core-hour ({results['throughput']['speedup']:.2f}x).", flush=True)
+
+    with open(output, "w") as f:
+        f.write(json.dumps(results, indent=2))
+    print(f"[benchmark]: results written to {output}.")
+
+    if baseline is not None:
+        with open(baseline, "r") as f:
+            regressions = compare(json.load(f), results, threshold)
+        if len(regressions) > 0:
+            print(f"[benchmark]: {len(regressions)} components regressed by more than {threshold:.0%}: {', '.join(regressions)}.")
+            sys.exit(1)
+        print(f"[benchmark]: no components regressed by more than {threshold:.0%}.")
+
+
+def parse_cmd_args(args: list[str]):
+    commands = {}
+
+    current_command = None
+    for arg in args:
+        if arg[:2] == "--":
+            current_command = arg
+            commands[current_command] = []
+            continue
+
+        if current_command == None:
+            print_usage()
+
+        commands[current_command].append(arg)
+
+    if "--help" in commands:
+        print_usage(exit_code=0)
+
+    for command, values in commands.items():
+        if command not in ["--games", "--seed", "--recordings", "--repeat", "--output", "--compare", "--threshold", "--throughput"]:
+            print_usage()
+
+        # Every option but --recordings takes exactly one value, so e.g. a --compare missing its path fails
+        # instead of silently skipping the comparison.
+        if command != "--recordings" and len(values) != 1:
+            print_usage()
+
+    return commands
+
+
+def print_usage(exit_code: int = 2):
+    """Prints the usage and exits, with status 2 unless the usage was asked for, so bad arguments fail in CI.
+    """
+    print(
+    "Usage: python3 benchmark.py [options]\n"
+    "   options:\n"
+    "       --games <count>             The number of synthetic games to play and benchmark, defaults to 3.\n"
+    "       --seed <seed>               Seed of the first synthetic game, defaults to 0.\n"
+    "       --recordings <path> ...     Recorded games (game.json files) to benchmark as well.\n"
+    "       --repeat <count>            How many times to time each whole-recording output, defaults to 3.\n"
+    "       --output <path>             Where to write the results, defaults to benchmark_results.json.\n"
+    "       --compare <path>            Results of a previous run to compare against, exits with status 1 on a regression.\n"
+    "       --threshold <fraction>      How much slower a component's median must be to count as a regression, defaults to 0.1.\n"
+    "       --throughput <count>        Also play this many synthetic games both in-process and over the FIFO pipes,\n"
+    "                                   and report the matches per core-hour of each, defaults to 0.\n"
+    "       --help                      Prints this message, bad arguments print it and exit with status 2.\n"
+    "\n"
+    "   examples:\n"
+    "       python3 benchmark.py --output baseline.json\n"
+    "       python3 benchmark.py --recordings output/game.json --compare baseline.json\n"
+    "       python3 benchmark.py --games 0 --throughput 5\n")
+    sys.exit(exit_code)
+
+
+def can_play_synthetic_games() -> bool:
+    return HeadlessGameEngine is not None and RandomBot is not None and "seed" in inspect.signature(HeadlessGameEngine).parameters
+
+
+def play_synthetic_game(seed: int) -> list[RecordType]:
+    assert HeadlessGameEngine is not None and RandomBot is not None
+    engine = HeadlessGameEngine([RandomBot(seed * NUM_PLAYERS + x) for x in range(NUM_PLAYERS)], seed=seed)
+    engine.start()
+    return engine.state.recording
+
+
+def play_pipe_game(seed: int) -> tuple[list[RecordType], float]:
+    """Plays the same game as play_synthetic_game, but with the engine and each bot in their own process
+    talking over the FIFO pipes, the way tournament_simulator.py runs a match. Returns the recording and the
+    CPU seconds used by all six processes.
+    """
+    sandbox = tempfile.mkdtemp(prefix=f"risk_benchmark_{seed}_")
+    try:
+        seats = [f"{sandbox}/seat{x}.py" for x in range(NUM_PLAYERS)]
+        for x, seat in enumerate(seats):
+            with open(seat, "w") as f:
+                f.write(f"from risk_helper.random_bot import main\nmain({seed * NUM_PLAYERS + x})\n")
+
+        start = get_children_cpu_time()
+        setup_sandbox(sandbox, seats)
+        submission_pids = start_submissions(sandbox)
+        try:
+            start_engine(sandbox, seed)
+        finally:
+            # The submissions are reaped as well as killed, children only count towards RUSAGE_CHILDREN
+            # once they have been waited for.
+            for pid in submission_pids:
+                try:
+                    os.kill(pid, SIGKILL)
+                except ProcessLookupError:
+                    pass
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+        cpu_time = get_children_cpu_time() - start
+
+        try:
+            with open(f"{sandbox}/output/game.json", "r") as f:
+                recording = RootModel[list[RecordType]].model_validate_json(f.read()).root
+        except FileNotFoundError:
+            with open(f"{sandbox}/output/engine.err", "r") as f:
+                raise RuntimeError(f"Pipe game {seed} didn't finish, the engine's stderr was:\n{f.read()}")
+
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    return recording, cpu_time
+
+
+def get_children_cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure_throughput(matches: int, seed: int) -> dict[str, Any]:
+    """Plays each synthetic game in-process and over the pipes, and compares the CPU time per match of the
+    two. CPU time rather than wall time is measured, so the result is the matches one core can play, however
+    many matches are run at once. The games must record the same, otherwise the comparison isn't like for
+    like, so the seeds of any which don't are listed under "mismatched".
+    """
+    headless_cpu_time = 0.0
+    pipe_cpu_time = 0.0
+    mismatched: list[int] = []
+    for i in range(matches):
+        print(f"[benchmark]: playing throughput game {i + 1}/{matches}.", flush=True)
+        start = time.process_time()
+        recording = play_synthetic_game(seed + i)
+        headless_cpu_time += time.process_time() - start
+
+        pipe_recording, cpu_time = play_pipe_game(seed + i)
+        pipe_cpu_time += cpu_time
+        if pipe_recording != recording:
+            mismatched.append(seed + i)
+
+    return {
+        "matches": matches,
+        "headless_cpu_s_per_match": headless_cpu_time / matches,
+        "pipe_cpu_s_per_match": pipe_cpu_time / matches,
+        "headless_matches_per_core_hour": 3600 * matches / headless_cpu_time,
+        "pipe_matches_per_core_hour": 3600 * matches / pipe_cpu_time,
+        "speedup": pipe_cpu_time / headless_cpu_time,
+        "mismatched": mismatched,
+    }
+
+
+def get_query(move: BaseMove, update: dict[int, RecordType]) -> QueryType:
+    """The query the engine sent to get `move`.
+    """
+    match move:
+        case MoveClaimTerritory():
+            return QueryClaimTerritory(update=update)
+        case MovePlaceInitialTroop():
+            return QueryPlaceInitialTroop(update=update)
+        case MoveAttack() | MoveAttackPass():
+            return QueryAttack(update=update)
+        case MoveDefend() as r:
+            return QueryDefend(move_attack_id=r.move_attack_id, update=update)
+        case MoveTroopsAfterAttack() as r:
+            return QueryTroopsAfterAttack(record_attack_id=r.record_attack_id, update=update)
+        case MoveDistributeTroops() as r:
+            return QueryDistributeTroops(cause=r.cause, update=update)
+        case MoveRedeemCards() as r:
+            return QueryRedeemCards(cause=r.cause, update=update)
+        case MoveFortify() | MoveFortifyPass():
+            return QueryFortify(update=update)
+        case _:
+            raise ValueError(f"No query is answered by a {type(move).__name__}.")
+
+
+def timed(timings: dict[str, list[int]], component: str, f: Callable[[], Any]) -> Any:
+    start = time.perf_counter_ns()
+    result = f()
+    timings[component].append(time.perf_counter_ns() - start)
+    return result
+
+
+def replay_recording(recording: list[RecordType], timings: dict[str, list[int]]):
+    # Replays the recording through the engine, with every query, validation and commit timed as the engine
+    # would have made them.
+    state = create_replay_state(recording)
+    mutator = StateMutator(state)
+    validator = MoveValidator(state)
+    censor = CensorRecord(state)
+    connections = dict([(x, LocalPlayerConnection(player_id=x, bot=cast(Any, None))) for x in range(NUM_PLAYERS)])
+
+    for i, record in enumerate(recording):
+        # Records committed by the mutator itself when it applied an earlier record were never queried or
+        # committed by the engine, replaying them only checks them.
+        if i < len(state.recording):
+            replay_record(state, mutator, i, record)
+            continue
+
+        if isinstance(record, BaseMove):
+            player = record.move_by_player
+            update = timed(timings, "connection._get_record_update_dict", lambda: connections[player]._get_record_update_dict(state, censor))
+            query = get_query(record, update)
+            timed(timings, f"query.model_dump_json.{query.query_type}", lambda: query.model_dump_json())
+            timed(timings, "query.dump_query_compact", lambda: dump_query(query, censor, player, ENCODING_COMPACT))
+            timed(timings, f"validator.validate.{record.record_type}", lambda: validator.validate(cast(MoveType, record), query, player))
+
+        timed(timings, f"mutator.commit.{record.record_type}", lambda: replay_record(state, mutator, i, record))
+
+    # Uncached censoring, as if every record was sent to every player.
+    for record in recording:
+        for player in range(NUM_PLAYERS):
+            timed(timings, f"censor.censor.{record.record_type}", lambda: censor.censor(record, player))
+
+
+def time_recording(recording: list[RecordType], repeat: int, timings: dict[str, list[int]], missing: set[str]):
+    if len(recording) == 0 or not isinstance(recording[0], RecordStartGame):
+        raise ValueError("Recording must start with a RecordStartGame.")
+
+    if create_replay_state is not None:
+        replay_recording(recording, timings)
+    else:
+        missing.update(["connection._get_record_update_dict", "query.*", "validator.validate.*", "mutator.commit.*", "censor.censor.*"])
+
+    for _ in range(repeat):
+        inspector = RecordingInspector(recording)
+        for output in INSPECTOR_OUTPUTS:
+            f = getattr(inspector, output, None)
+            if f is not None:
+                timed(timings, f"inspector.{output}", f)
+            else:
+                missing.add(f"inspector.{output}")
+
+
+def summarise(samples: list[int]) -> dict[str, Any]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "total_ms": sum(ordered) / 1e6,
+        "mean_us": statistics.fmean(ordered) / 1e3,
+        "median_us": statistics.median(ordered) / 1e3,
+        "p95_us": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] / 1e3,
+        "min_us": ordered[0] / 1e3,
+    }
+
+
+def compare(baseline: dict[str, Any], results: dict[str, Any], threshold: float) -> list[str]:
+    """Prints each component's median against the baseline, and returns the components which regressed by
+    more than `threshold`. Medians are compared rather than means, so one slow outlier (e.g. a garbage
+    collection) doesn't count as a regression.
+    """
+    if baseline.get("version") != results["version"]:
+        print(f"[benchmark]: baseline is from benchmark version {baseline.get('version')}, comparing anyway.")
+
+    regressions: list[str] = []
+    print(f"{'component':<80} {'baseline us':>12} {'current us':>12} {'ratio':>8}")
+    for component, current in results["components"].items():
+        previous: Optional[dict[str, Any]] = baseline["components"].get(component)
+        if previous is None:
+            print(f"{component:<80} {'-':>12} {current['median_us']:>12.2f} {'new':>8}")
+            continue
+
+        ratio = current["median_us"] / previous["median_us"] if previous["median_us"] > 0 else float("inf")
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(component)
+        print(f"{component:<80} {previous['median_us']:>12.2f} {current['median_us']:>12.2f} {ratio:>7.2f}x{' REGRESSED' if regressed else ''}")
+
+    for component in sorted(baseline["components"].keys() - results["components"].keys()):
+        print(f"{component:<80} {baseline['components'][component]['median_us']:>12.2f} {'-':>12} {'missing':>8}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
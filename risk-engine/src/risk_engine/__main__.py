@@ -1,7 +1,45 @@
+import os
 import sys
 import cProfile
+from typing import Optional
 from risk_engine.game_engine import GameEngine
 
-game = GameEngine(len(sys.argv) > 1 and sys.argv[1] == "--print-recording-interactive")
+
+def print_usage(error: str):
+    """Prints what was wrong with the arguments and the usage, and exits with status 2.
+    """
+    print(
+    f"{error}\n"
+    "Usage: python3 -m risk_engine [options]\n"
+    "   options:\n"
+    "       --seed <seed>                   Integer seed for the game, defaults to GAME_ENGINE_SEED if that is set,\n"
+    "                                       otherwise to a random seed. Either way it is recorded in RecordStartGame.\n"
+    "       --print-recording-interactive   Prints the length of the recording at the start of each turn.\n"
+    "       --binary-recording              Also writes the columnar binary recording.\n", file=sys.stderr)
+    sys.exit(2)
+
+
+def parse_seed() -> Optional[int]:
+    # The seed can be given as "--seed <seed>" or through the GAME_ENGINE_SEED environment variable,
+    # otherwise a random seed is chosen (and recorded in RecordStartGame).
+    if "--seed" in sys.argv:
+        i = sys.argv.index("--seed") + 1
+        if i >= len(sys.argv):
+            print_usage("--seed is missing its value.")
+        try:
+            return int(sys.argv[i])
+        except ValueError:
+            print_usage(f"--seed must be an integer, got \"{sys.argv[i]}\".")
+
+    if "GAME_ENGINE_SEED" in os.environ:
+        try:
+            return int(os.environ["GAME_ENGINE_SEED"])
+        except ValueError:
+            print_usage(f"GAME_ENGINE_SEED must be an integer, got \"{os.environ['GAME_ENGINE_SEED']}\".")
+
+    return None
+
+
+game = GameEngine("--print-recording-interactive" in sys.argv, seed=parse_seed(), binary_recording="--binary-recording" in sys.argv)
 game.start()
-#cProfile.run("game.start()", "./output/engine.prof")
\ No newline at end of file
+#cProfile.run("game.start()", "./output/engine.prof")
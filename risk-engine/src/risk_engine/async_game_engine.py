@@ -0,0 +1,91 @@
+import asyncio
+import json
+import sys
+from typing import Optional
+
+from risk_engine.connection.async_player_connection import AsyncPlayerConnection
+from risk_engine.exceptions import PlayerException
+from risk_engine.game.record_factory import record_banned_factory
+from risk_engine.game_engine import BaseGameEngine
+from risk_engine.output.recording_writer import RecordingWriter
+
+
+class AsyncGameEngine(BaseGameEngine):
+    """Runs the same rules as GameEngine, but awaits on the player's pipes instead of blocking on them, so
+    that many matches (each with their own core directory) can share one process and event loop.
+    """
+
+    def __init__(self, core_directory: str, seed: Optional[int]=None, binary_recording: bool=False):
+        with open(f"{core_directory}/input/catalog.json", "r") as f:
+            catalog = json.load(f)
+
+        super().__init__(print_recording_interactive=False, catalog=catalog, seed=seed, binary_recording=binary_recording)
+        self.core_directory = core_directory
+        self.connections: dict[int, AsyncPlayerConnection] = {}
+
+
+    async def start(self):
+        self.mutator.writer = RecordingWriter(f"{self.core_directory}/output", self.state.recording)
+        try:
+            await self._connect()
+            await self._run_game()
+        except PlayerException as e:
+            record = record_banned_factory(e)
+            self.mutator.commit(record)
+        finally:
+            for connection in self.connections.values():
+                connection.close()
+            self._finish()
+
+
+    async def _connect(self):
+        self.connections = dict([(x, AsyncPlayerConnection(player_id=x, core_directory=self.core_directory)) for x in self.state.players.keys()])
+        for connection in self.connections.values():
+            await connection.open_pipes()
+
+
+    async def _run_game(self):
+        rules = self._play_game()
+        try:
+            player_id, query = next(rules)
+            while True:
+                player_id, query = rules.send(await query(self.connections[player_id]))
+        except StopIteration:
+            pass
+
+
+async def run_matches(matches: list[tuple[str, Optional[int]]]) -> list[Optional[BaseException]]:
+    """Runs every (core_directory, seed) match concurrently on the current event loop, each core directory
+    must be laid out like the one used by GameEngine with the submissions already started. Returns the
+    exception each match's engine crashed with, if any, so one crashed match doesn't take down the rest.
+    """
+    return await asyncio.gather(*[AsyncGameEngine(core_directory, seed).start() for core_directory, seed in matches], return_exceptions=True)
+
+
+def main():
+
+    # python3 -m risk_engine.async_game_engine matches/0 matches/1:42 matches/2
+
+    if len(sys.argv) < 2:
+        print_usage()
+
+    try:
+        matches = [(x.split(":")[0], int(x.split(":")[1]) if ":" in x else None) for x in sys.argv[1:]]
+    except ValueError:
+        print_usage()
+
+    for (core_directory, _), error in zip(matches, asyncio.run(run_matches(matches))):
+        if error is not None:
+            print(f"[engine]: match in {core_directory} crashed with {{{error!r}}}", flush=True)
+
+
+def print_usage():
+    print(
+    "Usage: python3 -m risk_engine.async_game_engine <core_directory>[:<seed>] ...\n"
+    "   Runs a match in each core directory concurrently, each must be laid out like the engine's core directory\n"
+    "   (input/catalog.json, output/ and submission<n>/io/) with the submissions already started.\n")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,7 +1,8 @@
 
 
-from typing import cast
+from typing import Optional, cast
 from risk_engine.game.engine_state import EngineState
+from risk_shared.protocol import compact
 from risk_shared.records.moves.move_attack import MoveAttack
 from risk_shared.records.record_attack import RecordAttack
 from risk_shared.records.record_drew_card import PublicRecordDrewCard, RecordDrewCard
@@ -15,6 +16,52 @@ class CensorRecord():
     def __init__(self, state: EngineState):
         self.state = state
 
+        # Censored records and their serialised JSON, keyed by (record index, viewpoint). Records which look the
+        # same to every player share the viewpoint None, so they are only censored and serialised once per game.
+        self._censored_cache: dict[tuple[int, Optional[int]], RecordType] = {}
+        self._json_cache: dict[tuple[int, Optional[int]], str] = {}
+        self._compact_cache: dict[tuple[int, Optional[int]], str] = {}
+
+
+    def _get_viewpoint(self, record: RecordType, player_id: int) -> Optional[int]:
+        match record:
+            case RecordDrewCard() as r:
+                return player_id if r.player == player_id else None
+
+            case RecordPlayerEliminated() as r:
+                record_attack = cast(RecordAttack, self.state.recording[r.record_attack_id])
+                move_attack = cast(MoveAttack, self.state.recording[record_attack.move_attack_id])
+                return player_id if move_attack.move_by_player == player_id else None
+
+            case RecordStartGame():
+                return player_id
+
+        return None
+
+
+    def censor_cached(self, i: int, player_id: int) -> RecordType:
+        record = self.state.recording[i]
+        key = (i, self._get_viewpoint(record, player_id))
+        if key not in self._censored_cache:
+            self._censored_cache[key] = self.censor(record, player_id)
+        return self._censored_cache[key]
+
+
+    def censor_json(self, i: int, player_id: int) -> str:
+        record = self.state.recording[i]
+        key = (i, self._get_viewpoint(record, player_id))
+        if key not in self._json_cache:
+            self._json_cache[key] = self.censor_cached(i, player_id).model_dump_json()
+        return self._json_cache[key]
+
+
+    def censor_compact(self, i: int, player_id: int) -> str:
+        record = self.state.recording[i]
+        key = (i, self._get_viewpoint(record, player_id))
+        if key not in self._compact_cache:
+            self._compact_cache[key] = compact.dumps(self.censor_cached(i, player_id))
+        return self._compact_cache[key]
+
     def censor(self, record: RecordType, player_id: int) -> RecordType:
         
         match record:
@@ -6,4 +6,3 @@ OPEN_PIPE_TIMEOUT_SECONDS = 3
 TIMEOUT_SECONDS = 1
 CUMULATIVE_TIMEOUT_SECONDS = 8
 MAX_CHARACTERS_READ = 4096
-READ_CHUNK_SIZE = 1024
\ No newline at end of file
@@ -0,0 +1,174 @@
+import asyncio
+import errno
+import json
+import os
+from time import monotonic_ns
+from typing import Optional, Type, Union, cast, final
+
+from pydantic import ValidationError
+
+from risk_engine.censoring.censor_record import CensorRecord
+from risk_engine.config.ioconfig import CUMULATIVE_TIMEOUT_SECONDS, MAX_CHARACTERS_READ, OPEN_PIPE_TIMEOUT_SECONDS, TIMEOUT_SECONDS
+from risk_engine.connection.base_connection import BaseConnection, T1, T2
+from risk_engine.connection.player_connection import InvalidMoveError, dump_query, load_move
+from risk_engine.exceptions import BrokenPipeException, CumulativeTimeoutException, InvalidMessageException, InvalidMoveException, TimeoutException
+from risk_engine.validation.move_validator import MoveValidator
+from risk_shared.protocol.framing import ENCODING_JSON, ENCODINGS, READ_SIZE, FrameDecoder, FramingError, encode_binary_frame, encode_legacy_frame
+from risk_shared.queries.query_type import QueryType
+from risk_shared.records.types.move_type import MoveType
+
+
+async def _wait_for_fd(fd: int, write: bool) -> None:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def on_ready():
+        if not future.done():
+            future.set_result(None)
+
+    if write:
+        loop.add_writer(fd, on_ready)
+    else:
+        loop.add_reader(fd, on_ready)
+
+    try:
+        await future
+    finally:
+        if write:
+            loop.remove_writer(fd)
+        else:
+            loop.remove_reader(fd)
+
+
+@final
+class AsyncPlayerConnection(BaseConnection):
+    """The asyncio equivalent of PlayerConnection, the pipes are read and written through the event loop so
+    a single process can run many matches while it waits on submissions. Its query methods are awaited.
+    """
+
+    def __init__(self, player_id: int, core_directory: str):
+        super().__init__(player_id)
+        self._core_directory = core_directory
+        self._to_engine_fd: int
+        self._from_engine_fd: int
+        self._decoder = FrameDecoder(MAX_CHARACTERS_READ)
+        self._binary_framing: bool = False
+        self._encoding: int = ENCODING_JSON
+        self._cumulative_time_ns: int = 0
+
+
+    async def open_pipes(self):
+        await self._time_limited(self._open_pipes(), None, "You didn't open 'to_engine' for writing or 'from_engine.pipe' for reading in time.", initial=True)
+
+
+    async def _open_pipes(self):
+        # See PlayerConnection._open_pipes.
+        self._to_engine_fd = os.open(f"{self._core_directory}/submission{self.player_id}/io/to_engine.pipe", os.O_RDONLY | os.O_NONBLOCK)
+        while True:
+            try:
+                self._from_engine_fd = os.open(f"{self._core_directory}/submission{self.player_id}/io/from_engine.pipe", os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                await asyncio.sleep(0.001)
+
+
+    def close(self):
+        for fd in [getattr(self, "_to_engine_fd", None), getattr(self, "_from_engine_fd", None)]:
+            if fd is not None:
+                os.close(fd)
+
+
+    async def _time_limited(self, coroutine, query: Optional[QueryType], error_message: str = "You took too long to respond.", initial=False):
+        time_limit_ns = (OPEN_PIPE_TIMEOUT_SECONDS if initial else TIMEOUT_SECONDS) * 1_000_000_000
+        cumulative_time_remaining_ns = CUMULATIVE_TIMEOUT_SECONDS * 1_000_000_000 - self._cumulative_time_ns
+        start = monotonic_ns()
+
+        try:
+            result = await asyncio.wait_for(coroutine, max(0, min(time_limit_ns, cumulative_time_remaining_ns)) / 1_000_000_000)
+        except asyncio.TimeoutError:
+            self._cumulative_time_ns += monotonic_ns() - start
+            if time_limit_ns <= cumulative_time_remaining_ns:
+                raise TimeoutException(self.player_id, error_message, query)
+            raise CumulativeTimeoutException(self.player_id, error_message, query)
+
+        self._cumulative_time_ns += monotonic_ns() - start
+        if self._cumulative_time_ns > CUMULATIVE_TIMEOUT_SECONDS * 1_000_000_000:
+            raise CumulativeTimeoutException(self.player_id, error_message, query)
+
+        return result
+
+
+    async def _send(self, data: str) -> None:
+        # We only switch to binary framing once the player has shown they understand it.
+        if self._binary_framing:
+            view = memoryview(encode_binary_frame(data.encode(), self._encoding))
+        else:
+            view = memoryview(encode_legacy_frame(data))
+
+        while len(view) > 0:
+            try:
+                written = os.write(self._from_engine_fd, view)
+            except BlockingIOError:
+                await _wait_for_fd(self._from_engine_fd, write=True)
+                continue
+            view = view[written:]
+
+
+    async def _receive(self) -> tuple[int, str]:
+        try:
+            while (message := self._decoder.next()) is None:
+                try:
+                    chunk = os.read(self._to_engine_fd, READ_SIZE)
+                except BlockingIOError:
+                    await _wait_for_fd(self._to_engine_fd, write=False)
+                    continue
+
+                if not chunk:
+                    raise BrokenPipeException(self.player_id, "You closed 'to_engine.pipe'.", None)
+                self._decoder.feed(chunk)
+        except FramingError as e:
+            raise InvalidMessageException(player_id=self.player_id, error_message=str(e))
+
+        binary_framing, encoding, data = message
+        if encoding not in ENCODINGS:
+            raise InvalidMessageException(player_id=self.player_id, error_message=f"You send a message with an unknown encoding {encoding}.")
+
+        self._binary_framing = self._binary_framing or binary_framing
+        self._encoding = encoding
+        try:
+            return (encoding, data.decode())
+        except UnicodeDecodeError:
+            raise InvalidMessageException(player_id=self.player_id, error_message="You send a message which was not valid UTF-8.")
+
+
+    async def _exchange(self, query: QueryType, response_types: tuple[Type[MoveType], ...], validator: MoveValidator, censor: CensorRecord) -> MoveType:
+        await self._send(dump_query(query, censor, self.player_id, self._encoding, advertise=not self._binary_framing))
+
+        encoding, data = await self._receive()
+        move = load_move(data, encoding, response_types, self.player_id)
+        try:
+            validator.validate(move, query, self.player_id)
+        except ValueError as e:
+            raise InvalidMoveError(str(e), move)
+        return move
+
+
+    async def _query_move(self, query: QueryType, response_type: Type[T1], validator: MoveValidator, censor: CensorRecord) -> T1: # type: ignore[override]
+        return cast(T1, await self._query_move_types(query, (response_type,), validator, censor))
+
+
+    async def _query_move_union(self, query: QueryType, response_type_1: Type[T1], response_type_2: Type[T2], validator: MoveValidator, censor: CensorRecord) -> Union[T1, T2]: # type: ignore[override]
+        return cast(Union[T1, T2], await self._query_move_types(query, (response_type_1, response_type_2), validator, censor))
+
+
+    async def _query_move_types(self, query: QueryType, response_types: tuple[Type[MoveType], ...], validator: MoveValidator, censor: CensorRecord) -> MoveType:
+        try:
+            return await self._time_limited(self._exchange(query, response_types, validator, censor), query)
+        except BrokenPipeError:
+            raise BrokenPipeException(self.player_id, "You closed 'from_engine.pipe'.", query)
+        except ValidationError as e:
+            raise InvalidMessageException(self.player_id, "You sent an invalid message to the game engine.", json.loads(e.json()))
+        except InvalidMoveError as e:
+            raise InvalidMoveException(self.player_id, str(e), e.invalid_move)
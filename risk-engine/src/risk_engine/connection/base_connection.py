@@ -0,0 +1,96 @@
+from typing import Literal, Type, TypeVar, Union
+
+from risk_engine.censoring.censor_record import CensorRecord
+from risk_engine.game.engine_state import EngineState
+from risk_engine.validation.move_validator import MoveValidator
+from risk_shared.queries.query_attack import QueryAttack
+from risk_shared.queries.query_claim_territory import QueryClaimTerritory
+from risk_shared.queries.query_defend import QueryDefend
+from risk_shared.queries.query_distribute_troops import QueryDistributeTroops
+from risk_shared.queries.query_fortify import QueryFortify
+from risk_shared.queries.query_place_initial_troop import QueryPlaceInitialTroop
+from risk_shared.queries.query_redeem_cards import QueryRedeemCards
+from risk_shared.queries.query_troops_after_attack import QueryTroopsAfterAttack
+from risk_shared.queries.query_type import QueryType
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_attack_pass import MoveAttackPass
+from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
+from risk_shared.records.moves.move_defend import MoveDefend
+from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
+from risk_shared.records.moves.move_fortify import MoveFortify
+from risk_shared.records.moves.move_fortify_pass import MoveFortifyPass
+from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
+from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
+from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
+from risk_shared.records.types.move_type import MoveType
+
+
+T1 = TypeVar("T1", bound=MoveType)
+T2 = TypeVar("T2", bound=MoveType)
+class BaseConnection():
+    """Builds the queries sent to a player, subclasses implement the transport which sends a query and
+    returns the player's validated move, in _query_move and _query_move_union.
+
+    The query methods return whatever the transport returns, so a subclass whose transport is a coroutine
+    (AsyncPlayerConnection) has query methods which are awaited.
+    """
+
+    def __init__(self, player_id: int):
+        self.player_id: int = player_id
+        self._record_update_watermark: int = 0
+
+
+    def _query_move(self, query: QueryType, response_type: Type[T1], validator: MoveValidator, censor: CensorRecord) -> T1:
+        raise NotImplementedError
+
+
+    def _query_move_union(self, query: QueryType, response_type_1: Type[T1], response_type_2: Type[T2], validator: MoveValidator, censor: CensorRecord) -> Union[T1, T2]:
+        raise NotImplementedError
+
+
+    def _get_record_update_dict(self, state: EngineState, censor: CensorRecord):
+        if self._record_update_watermark >= len(state.recording):
+            raise RuntimeError("Record update watermark out of sync with state, did you try to send two queries without committing the first?")
+        result = dict([(i, censor.censor_cached(i, self.player_id)) for i in range(self._record_update_watermark, len(state.recording))])
+        self._record_update_watermark = len(state.recording)
+        return result
+
+
+    def query_claim_territory(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> MoveClaimTerritory:
+        query = QueryClaimTerritory(update=self._get_record_update_dict(state, censor))
+        return self._query_move(query, MoveClaimTerritory, validator, censor)
+
+
+    def query_place_initial_troop(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> MovePlaceInitialTroop:
+        query = QueryPlaceInitialTroop(update=self._get_record_update_dict(state, censor))
+        return self._query_move(query, MovePlaceInitialTroop, validator, censor)
+
+
+    def query_attack(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> Union[MoveAttack, MoveAttackPass]:
+        query = QueryAttack(update=self._get_record_update_dict(state, censor))
+        return self._query_move_union(query, MoveAttack, MoveAttackPass, validator, censor)
+
+
+    def query_defend(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, move_attack_id: int) -> MoveDefend:
+        query = QueryDefend(move_attack_id=move_attack_id, update=self._get_record_update_dict(state, censor))
+        return self._query_move(query, MoveDefend, validator, censor)
+
+
+    def query_troops_after_attack(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, record_attack_id: int) -> MoveTroopsAfterAttack:
+        query = QueryTroopsAfterAttack(record_attack_id=record_attack_id, update=self._get_record_update_dict(state, censor))
+        return self._query_move(query, MoveTroopsAfterAttack, validator, censor)
+
+
+    def query_distribute_troops(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, cause: Union[Literal["turn_started"], Literal["player_eliminated"]]) -> MoveDistributeTroops:
+        query = QueryDistributeTroops(cause=cause, update=self._get_record_update_dict(state, censor))
+        return self._query_move(query, MoveDistributeTroops, validator, censor)
+
+
+    def query_redeem_cards(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, cause: Union[Literal["turn_started"], Literal["player_eliminated"]]) -> MoveRedeemCards:
+        query = QueryRedeemCards(cause=cause, update=self._get_record_update_dict(state, censor))
+        return self._query_move(query, MoveRedeemCards, validator, censor)
+
+
+    def query_fortify(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> Union[MoveFortify, MoveFortifyPass]:
+        query = QueryFortify(update=self._get_record_update_dict(state, censor))
+        return self._query_move_union(query, MoveFortify, MoveFortifyPass, validator, censor)
@@ -0,0 +1,48 @@
+from typing import Callable, Type, Union, cast, final
+
+from risk_engine.censoring.censor_record import CensorRecord
+from risk_engine.connection.base_connection import BaseConnection, T1, T2
+from risk_engine.exceptions import InvalidMessageException, InvalidMoveException
+from risk_engine.validation.move_validator import MoveValidator
+from risk_shared.queries.query_type import QueryType
+from risk_shared.records.types.move_type import MoveType
+
+
+BotCallable = Callable[[QueryType], MoveType]
+
+
+@final
+class LocalPlayerConnection(BaseConnection):
+    """Drop-in replacement for PlayerConnection which calls a python callable in the engine process
+    instead of talking to a submission over FIFO pipes.
+
+    The callable receives exactly the query a submission would receive (with the censored record update),
+    but as model objects rather than JSON, and must return the move object. There are no time limits.
+
+    Nothing is copied, the records in the update are the engine's own (censored records are shared between
+    players) and the move is committed as it is returned, so bots must treat both as read-only.
+    """
+
+    def __init__(self, player_id: int, bot: BotCallable):
+        super().__init__(player_id)
+        self._bot = bot
+
+
+    def _query_move(self, query: QueryType, response_type: Type[T1], validator: MoveValidator, censor: CensorRecord) -> T1:
+        return cast(T1, self._call_bot(query, (response_type,), validator))
+
+
+    def _query_move_union(self, query: QueryType, response_type_1: Type[T1], response_type_2: Type[T2], validator: MoveValidator, censor: CensorRecord) -> Union[T1, T2]:
+        return cast(Union[T1, T2], self._call_bot(query, (response_type_1, response_type_2), validator))
+
+
+    def _call_bot(self, query: QueryType, response_types: tuple[Type[MoveType], ...], validator: MoveValidator) -> MoveType:
+        move = self._bot(query)
+        if type(move) not in response_types:
+            raise InvalidMessageException(self.player_id, "You sent an invalid message to the game engine.", [f"Expected one of {[x.__name__ for x in response_types]}, got {type(move).__name__}."])
+
+        try:
+            validator.validate(move, query, self.player_id)
+        except ValueError as e:
+            raise InvalidMoveException(self.player_id, str(e), move)
+        return move
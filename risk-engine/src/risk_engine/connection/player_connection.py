@@ -1,43 +1,25 @@
-from io import TextIOWrapper
-import itertools
+import errno
 import json
-import math
+import os
 import random
-from signal import SIGALRM, alarm, signal
-from time import time
-from typing import Callable, Literal, Optional, ParamSpec, Type, TypeVar, Union, final
+from time import monotonic_ns, sleep
+from typing import Callable, Optional, ParamSpec, Type, TypeVar, Union, cast, final
 
 from risk_engine.censoring.censor_record import CensorRecord
 from risk_engine.game.state_mutator import StateMutator
 from risk_engine.validation.move_validator import MoveValidator
 from pydantic import TypeAdapter, ValidationError
 
-from risk_engine.config.ioconfig import CORE_DIRECTORY, CUMULATIVE_TIMEOUT_SECONDS, MAX_CHARACTERS_READ, OPEN_PIPE_TIMEOUT_SECONDS, READ_CHUNK_SIZE, TIMEOUT_SECONDS
+from risk_engine.config.ioconfig import CORE_DIRECTORY, CUMULATIVE_TIMEOUT_SECONDS, MAX_CHARACTERS_READ, OPEN_PIPE_TIMEOUT_SECONDS, TIMEOUT_SECONDS
+from risk_engine.connection.base_connection import BaseConnection
 from risk_engine.exceptions import BrokenPipeException, CumulativeTimeoutException, InvalidMoveException, PlayerException, InvalidMessageException, TimeoutException
 from risk_engine.game.engine_state import EngineState
 from risk_shared.models.player_model import PlayerModel
+from risk_shared.protocol import compact
+from risk_shared.protocol.framing import ENCODING_COMPACT, ENCODING_JSON, ENCODINGS, PROTOCOL_FIELD, PROTOCOL_VERSION, FrameReader, FramingError, encode_binary_frame, encode_legacy_frame, write_all
 from risk_shared.queries.query_type import QueryType
-from risk_shared.records.moves.move_attack_pass import MoveAttackPass
-from risk_shared.records.moves.move_fortify_pass import MoveFortifyPass
-from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
 from risk_shared.records.types.move_type import MoveType
 from risk_shared.queries.base_query import BaseQuery
-from risk_shared.queries.query_claim_territory import QueryClaimTerritory
-from risk_shared.queries.query_defend import QueryDefend
-from risk_shared.queries.query_place_initial_troop import QueryPlaceInitialTroop
-from risk_shared.queries.query_attack import QueryAttack
-from risk_shared.queries.query_distribute_troops import QueryDistributeTroops
-from risk_shared.queries.query_redeem_cards import QueryRedeemCards
-from risk_shared.queries.query_fortify import QueryFortify
-from risk_shared.queries.query_troops_after_attack import QueryTroopsAfterAttack
-from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
-from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
-from risk_shared.records.moves.move_defend import MoveDefend
-from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
-from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
-from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
-from risk_shared.records.moves.move_fortify import MoveFortify
-from risk_shared.records.moves.move_attack import MoveAttack
 from risk_shared.records.record_start_game import RecordStartGame
 
 # Performance boost on deserializing unions.
@@ -50,6 +32,50 @@ class InvalidMoveError(ValueError):
         self.invalid_move = move
 
 
+def dump_query(query: QueryType, censor: CensorRecord, player_id: int, encoding: int, advertise: bool = False) -> str:
+    """Serialises a query, if advertise is set a JSON query also advertises the protocol version, see
+    risk_shared.protocol.framing.
+    """
+    # The update is spliced in from the censor's cache of serialised records, instead of serialising every
+    # record again for every query.
+    if encoding == ENCODING_COMPACT:
+        update = ",".join(f'"{i}":{censor.censor_compact(i, player_id)}' for i in query.update.keys())
+        return compact.dumps_model(query, {"update": "{" + update + "}"})
+
+    update = ",".join(f'"{i}":{censor.censor_json(i, player_id)}' for i in query.update.keys())
+    protocol = f',"{PROTOCOL_FIELD}":{PROTOCOL_VERSION}' if advertise else ""
+    return query.model_dump_json(exclude={"update"})[:-1] + protocol + ',"update":{' + update + "}}"
+
+
+def load_move(data: str, encoding: int, response_types: tuple[Type[MoveType], ...], player_id: int) -> MoveType:
+    """Parses a move, raising pydantic's ValidationError or InvalidMessageException if it is malformed or not one
+    of the response types.
+    """
+    if encoding == ENCODING_COMPACT:
+        try:
+            move = compact.loads(data)
+        except ValidationError:
+            raise
+        except ValueError as e:
+            raise InvalidMessageException(player_id, "You sent an invalid message to the game engine.", [str(e)])
+
+        if type(move) not in response_types:
+            raise InvalidMessageException(player_id, "You sent an invalid message to the game engine.", [f"Expected one of {[x.__name__ for x in response_types]}, got {type(move).__name__}."])
+        return move
+
+    if len(response_types) == 1:
+        return response_types[0].model_validate_json(data)
+
+    types = frozenset([x.__name__ for x in response_types])
+    if types in cached_type_adapters:
+        adapter = cached_type_adapters[types]
+    else:
+        cached_type_adapters[types] = TypeAdapter(Union[response_types]) # type: ignore
+        adapter = cached_type_adapters[types]
+
+    return adapter.validate_json(data)
+
+
 P = ParamSpec("P")
 T1 = TypeVar("T1")
 def handle_sigpipe(fn: Callable[P, T1]) -> Callable[P, T1]:
@@ -90,6 +116,9 @@ def handle_invalid(fn: Callable[P, T1]) -> Callable[P, T1]:
 
 def time_limited(error_message: str = "You took too long to respond.", initial=False):
     """Decorator to trigger ban if the player takes too long to respond.
+
+    Sets a monotonic deadline on the connection, which every read and write on the player's pipes waits
+    against, rather than using SIGALRM, so connections can be used from any thread.
     """
 
     def dfn1(fn: Callable[P, T1]):
@@ -99,20 +128,23 @@ def time_limited(error_message: str = "You took too long to respond.", initial=F
             if len(args) >= 2 and isinstance(args[1], BaseQuery):
                 query = args[1]   # type: ignore
 
-            def on_timeout_alarm(*_):
-                raise TimeoutException(self.player_id, error_message, query)
-            signal(SIGALRM, on_timeout_alarm)
-
-            alarm(OPEN_PIPE_TIMEOUT_SECONDS if initial else TIMEOUT_SECONDS)
-            start = time()
-
-            result = fn(*args, **kwargs)
-
-            end = time()
-            alarm(0) 
+            time_limit_ns = (OPEN_PIPE_TIMEOUT_SECONDS if initial else TIMEOUT_SECONDS) * 1_000_000_000
+            cumulative_time_remaining_ns = CUMULATIVE_TIMEOUT_SECONDS * 1_000_000_000 - self._cumulative_time_ns
+            start = monotonic_ns()
+            self._deadline_ns = start + min(time_limit_ns, cumulative_time_remaining_ns)
+
+            try:
+                result = fn(*args, **kwargs)
+            except TimeoutError:
+                self._cumulative_time_ns += monotonic_ns() - start
+                if time_limit_ns <= cumulative_time_remaining_ns:
+                    raise TimeoutException(self.player_id, error_message, query)
+                raise CumulativeTimeoutException(self.player_id, error_message, query)
+            finally:
+                self._deadline_ns = None
 
-            self._cumulative_time += end - start
-            if self._cumulative_time > CUMULATIVE_TIMEOUT_SECONDS:
+            self._cumulative_time_ns += monotonic_ns() - start
+            if self._cumulative_time_ns > CUMULATIVE_TIMEOUT_SECONDS * 1_000_000_000:
                 raise CumulativeTimeoutException(self.player_id, error_message, query)
             
             return result
@@ -125,60 +157,77 @@ def time_limited(error_message: str = "You took too long to respond.", initial=F
 T2 = TypeVar("T2", bound=MoveType)
 T3 = TypeVar("T3", bound=MoveType)
 @final
-class PlayerConnection():
+class PlayerConnection(BaseConnection):
+    """Talks to a submission over its FIFO pipes.
+    """
 
     def __init__(self, player_id: int):
-        self.player_id: int = player_id
-        self._to_engine_pipe: TextIOWrapper
-        self._from_engine_pipe: TextIOWrapper
-        self._cumulative_time: float = 0
-        self._record_update_watermark: int = 0
+        super().__init__(player_id)
+        self._to_engine_fd: int
+        self._from_engine_fd: int
+        self._reader: FrameReader
+        self._binary_framing: bool = False
+        self._encoding: int = ENCODING_JSON
+        self._cumulative_time_ns: int = 0
+        self._deadline_ns: Optional[int] = None
 
         self._open_pipes()
 
 
     @time_limited("You didn't open 'to_engine' for writing or 'from_engine.pipe' for reading in time.", initial=True)
     def _open_pipes(self):
-        self._to_engine_pipe = open(f"{CORE_DIRECTORY}/submission{self.player_id}/io/to_engine.pipe", "r")
-        self._from_engine_pipe = open(f"{CORE_DIRECTORY}/submission{self.player_id}/io/from_engine.pipe", "w")
+        # Opening a FIFO non-blocking for reading succeeds immediately, but opening it for writing fails until
+        # the other end has been opened for reading, so we retry that until the deadline.
+        self._to_engine_fd = os.open(f"{CORE_DIRECTORY}/submission{self.player_id}/io/to_engine.pipe", os.O_RDONLY | os.O_NONBLOCK)
+        while True:
+            try:
+                self._from_engine_fd = os.open(f"{CORE_DIRECTORY}/submission{self.player_id}/io/from_engine.pipe", os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                if self._deadline_ns is not None and monotonic_ns() >= self._deadline_ns:
+                    raise TimeoutError
+                sleep(0.001)
+
+        self._reader = FrameReader(self._to_engine_fd, MAX_CHARACTERS_READ)
 
 
     def _send(self, data: str) -> None:
-        self._from_engine_pipe.write(str(len(data)) + ",")
-        self._from_engine_pipe.write(data)
-        self._from_engine_pipe.flush()
-
+        # We only switch to binary framing once the player has shown they understand it.
+        if self._binary_framing:
+            write_all(self._from_engine_fd, encode_binary_frame(data.encode(), self._encoding), self._deadline_ns)
+        else:
+            write_all(self._from_engine_fd, encode_legacy_frame(data), self._deadline_ns)
 
-    def _receive(self) -> str:
 
-        # Read size of message.
-        buffer = bytearray()
-        while len(buffer) < math.floor(math.log10(MAX_CHARACTERS_READ)) + 1 and (len(buffer) == 0 or buffer[-1] != ord(",")):
-            buffer.extend(self._to_engine_pipe.read(1).encode())
+    def _receive(self) -> tuple[int, str]:
+        try:
+            binary_framing, encoding, data = self._reader.read(self._deadline_ns)
+        except FramingError as e:
+            raise InvalidMessageException(player_id=self.player_id, error_message=str(e))
+        except EOFError:
+            raise BrokenPipeException(self.player_id, "You closed 'to_engine.pipe'.", None)
 
-        if buffer[-1] == ord(","):
-            size = int(buffer[0:-1].decode())
-        else:
-            raise InvalidMessageException(player_id=self.player_id, error_message=f"You send a message with a malformed message size.")
-        
-        if size > MAX_CHARACTERS_READ:
-            raise InvalidMessageException(player_id=self.player_id, error_message=f"You send a message that was too long, {size} > {MAX_CHARACTERS_READ} maximum.")
-        
-        # Read message.
-        buffer = bytearray()
-        while len(buffer) < size:
-            buffer.extend(bytearray(self._to_engine_pipe.read(min((size - len(buffer)), READ_CHUNK_SIZE)).encode()))
+        if encoding not in ENCODINGS:
+            raise InvalidMessageException(player_id=self.player_id, error_message=f"You send a message with an unknown encoding {encoding}.")
 
-        return buffer.decode()
+        self._binary_framing = self._binary_framing or binary_framing
+        self._encoding = encoding
+        try:
+            return (encoding, data.decode())
+        except UnicodeDecodeError:
+            raise InvalidMessageException(player_id=self.player_id, error_message="You send a message which was not valid UTF-8.")
 
 
     @handle_invalid
     @handle_sigpipe
     @time_limited()
-    def _query_move(self, query: QueryType, response_type: Type[T2], validator: MoveValidator) -> T2:
-        self._send(query.model_dump_json())
+    def _query_move(self, query: QueryType, response_type: Type[T2], validator: MoveValidator, censor: CensorRecord) -> T2:
+        self._send(dump_query(query, censor, self.player_id, self._encoding, advertise=not self._binary_framing))
 
-        move = response_type.model_validate_json(self._receive())
+        encoding, data = self._receive()
+        move = cast(T2, load_move(data, encoding, (response_type,), self.player_id))
         try:
             validator.validate(move, query, self.player_id)
         except ValueError as e:
@@ -189,17 +238,11 @@ class PlayerConnection():
     @handle_invalid
     @handle_sigpipe
     @time_limited()
-    def _query_move_union(self, query: QueryType, response_type_1: Type[T2], response_type_2: Type[T3], validator: MoveValidator) -> Union[T2, T3]:
-        self._send(query.model_dump_json())
+    def _query_move_union(self, query: QueryType, response_type_1: Type[T2], response_type_2: Type[T3], validator: MoveValidator, censor: CensorRecord) -> Union[T2, T3]:
+        self._send(dump_query(query, censor, self.player_id, self._encoding, advertise=not self._binary_framing))
 
-        types = frozenset([response_type_1.__name__, response_type_2.__name__])
-        if types in cached_type_adapters:
-            adapter = cached_type_adapters[types]
-        else:
-            cached_type_adapters[types] = TypeAdapter(Union[response_type_1, response_type_2])
-            adapter = cached_type_adapters[types]
-        
-        move = adapter.validate_json(self._receive())
+        encoding, data = self._receive()
+        move = cast(Union[T2, T3], load_move(data, encoding, (response_type_1, response_type_2), self.player_id))
         try:
             validator.validate(move, query, self.player_id)
         except ValueError as e:
@@ -207,54 +250,6 @@ class PlayerConnection():
         return move
 
 
-    def _get_record_update_dict(self, state: EngineState, censor: CensorRecord):
-        if self._record_update_watermark >= len(state.recording):
-            raise RuntimeError("Record update watermark out of sync with state, did you try to send two queries without committing the first?")
-        result = dict([(i, censor.censor(x, self.player_id)) for i, x in itertools.islice(enumerate(state.recording), self._record_update_watermark, None)])
-        self._record_update_watermark = len(state.recording)
-        return result
-
-
-    def query_claim_territory(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> MoveClaimTerritory:
-        query = QueryClaimTerritory(update=self._get_record_update_dict(state, censor))
-        return self._query_move(query, MoveClaimTerritory, validator)
-
-
-    def query_place_initial_troop(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> MovePlaceInitialTroop:
-        query = QueryPlaceInitialTroop(update=self._get_record_update_dict(state, censor))
-        return self._query_move(query, MovePlaceInitialTroop, validator)
-
-
-    def query_attack(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> Union[MoveAttack, MoveAttackPass]:
-        query = QueryAttack(update=self._get_record_update_dict(state, censor))
-        return self._query_move_union(query, MoveAttack, MoveAttackPass, validator)
-
-
-    def query_defend(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, move_attack_id: int) -> MoveDefend:
-        query = QueryDefend(move_attack_id=move_attack_id, update=self._get_record_update_dict(state, censor))
-        return self._query_move(query, MoveDefend, validator)
-    
-
-    def query_troops_after_attack(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, record_attack_id: int) -> MoveTroopsAfterAttack:
-        query = QueryTroopsAfterAttack(record_attack_id=record_attack_id, update=self._get_record_update_dict(state, censor))
-        return self._query_move(query, MoveTroopsAfterAttack, validator)
-        
-
-    def query_distribute_troops(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, cause: Union[Literal["turn_started"], Literal["player_eliminated"]]) -> MoveDistributeTroops:
-        query = QueryDistributeTroops(cause=cause, update=self._get_record_update_dict(state, censor))
-        return self._query_move(query, MoveDistributeTroops, validator) 
-    
-
-    def query_redeem_cards(self, state: EngineState, validator: MoveValidator, censor: CensorRecord, cause: Union[Literal["turn_started"], Literal["player_eliminated"]]) -> MoveRedeemCards:
-        query = QueryRedeemCards(cause=cause, update=self._get_record_update_dict(state, censor))
-        return self._query_move(query, MoveRedeemCards, validator) 
-    
-
-    def query_fortify(self, state: EngineState, validator: MoveValidator, censor: CensorRecord) -> Union[MoveFortify, MoveFortifyPass]:
-        query = QueryFortify(update=self._get_record_update_dict(state, censor))
-        return self._query_move_union(query, MoveFortify, MoveFortifyPass, validator) 
-
-
 if __name__ == "__main__":
     state = EngineState()
     mutator = StateMutator(state)
@@ -271,6 +266,6 @@ if __name__ == "__main__":
     try:
         response = connection.query_claim_territory(state, validator, censor)
         mutator.commit(response)
-        print(state.territories)
+        print(state.board.get_territory_models())
     except PlayerException as e:
         raise e
\ No newline at end of file
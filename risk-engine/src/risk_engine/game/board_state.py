@@ -0,0 +1,39 @@
+from array import array
+from typing import Iterable, Optional
+
+from risk_shared.models.territory_model import TerritoryModel
+
+UNOCCUPIED = -1
+
+
+class BoardState():
+    """The troops and occupier of every territory, stored as flat arrays indexed by territory id so that
+    every mutation is a plain array write. TerritoryModels are only built at the serialisation boundary,
+    by `get_territory_models`.
+
+    Troops are stored as 32 bit integers rather than 16 bit, because card set bonuses grow without bound and
+    a long game can stack more than 32767 troops on one territory.
+    """
+
+    def __init__(self, territory_ids: Iterable[int]):
+        self.territory_ids: frozenset[int] = frozenset(territory_ids)
+        size = max(self.territory_ids) + 1
+        self.troops: array = array("i", [0] * size)
+        self.occupiers: array = array("b", [UNOCCUPIED] * size)
+
+
+    def __contains__(self, territory: int) -> bool:
+        return territory in self.territory_ids
+
+
+    def get_occupier(self, territory: int) -> Optional[int]:
+        occupier = self.occupiers[territory]
+        return None if occupier == UNOCCUPIED else occupier
+
+
+    def get_territory_model(self, territory: int) -> TerritoryModel:
+        return TerritoryModel(territory_id=territory, occupier=self.get_occupier(territory), troops=self.troops[territory])
+
+
+    def get_territory_models(self) -> dict[int, TerritoryModel]:
+        return dict([(x, self.get_territory_model(x)) for x in sorted(self.territory_ids)])
\ No newline at end of file
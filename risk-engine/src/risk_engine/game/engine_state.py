@@ -1,24 +1,70 @@
+import copy
 import json
+import random
+from typing import Any, Optional
 from risk_engine.config.gameconfig import NUM_PLAYERS, NUM_STARTING_TROOPS
+from risk_engine.game.board_state import UNOCCUPIED, BoardState
 from risk_engine.config.ioconfig import CORE_DIRECTORY
-from risk_shared.maps.map import Map
+from risk_shared.maps.map import Map, territories_to_mask
 from risk_shared.maps import earth
+from risk_shared.maps.zobrist import ZobristKeys
 from risk_shared.models.card_model import CardModel
 from risk_shared.models.player_model import PlayerModel
-from risk_shared.models.territory_model import TerritoryModel
 from risk_shared.records.types.record_type import RecordType
 
+# Fields which never change once the state is created. Everything else changes as records are committed, so
+# it is part of a snapshot, apart from the recording itself which snapshots leave to the caller.
+_STATIC_FIELDS = {"map", "cards", "territory_continent", "zobrist_keys", "seed", "recording"}
+
 class EngineState():
-    def __init__(self):
-        with open(f"{CORE_DIRECTORY}/input/catalog.json", "r") as f:
-            catalog = json.load(f)
+    def __init__(self, catalog: Optional[list[dict[str, Any]]] = None, seed: Optional[int] = None):
+        if catalog is None:
+            with open(f"{CORE_DIRECTORY}/input/catalog.json", "r") as f:
+                catalog = json.load(f)
 
         self.map: Map = earth.create_map()
         self.cards: dict[int, CardModel] = dict([(i, card) for i, card in earth.create_cards().items()])
         self.deck: list[CardModel] = []
         self.discarded_deck: list[CardModel] = list(self.cards.values())
         self.players: dict[int, PlayerModel] = dict([(x, PlayerModel(player_id=x, team_id=catalog[x]["team_id"], troops_remaining=NUM_STARTING_TROOPS, alive=True, cards=[], must_place_territory_bonus=[])) for x in range(NUM_PLAYERS)])
-        self.territories: dict[int, TerritoryModel] = dict([(x, TerritoryModel(territory_id=x, occupier=None, troops=0)) for x in self.map.get_vertices()])
+        self.board: BoardState = BoardState(self.map.get_vertices())
         self.card_sets_redeemed: int = 0
         self.turn_order: list[int] = [x.player_id for x in self.players.values()]
-        self.recording: list[RecordType] = []
\ No newline at end of file
+        self.recording: list[RecordType] = []
+
+        # Derived counters, these are maintained by the StateMutator so the game loop doesn't need to scan
+        # every player or territory to check whether a phase is over.
+        self.alive_player_count: int = len(self.players)
+        self.unclaimed_territory_count: int = len(self.board.territory_ids)
+        self.players_with_troops_remaining_count: int = len(list(filter(lambda x: x.troops_remaining > 0, self.players.values())))
+
+        # Ownership index, also maintained by the StateMutator whenever a territory changes occupier.
+        self.territory_continent: dict[int, int] = dict([(territory, continent) for continent, territories in self.map.get_continents().items() for territory in territories])
+        self.territories_owned_by: dict[int, set[int]] = dict([(x, set()) for x in self.players.keys()])
+        self.continent_territories_owned_by: dict[int, dict[int, int]] = dict([(x, dict([(continent, 0) for continent in self.map.get_continents().keys()])) for x in self.players.keys()])
+
+        # The same index as bitsets (bit v is set if territory v is owned) for risk_shared.rules.legal_moves,
+        # unclaimed territories are kept under UNOCCUPIED.
+        self.territory_masks: dict[int, int] = dict([(x, 0) for x in self.players.keys()])
+        self.territory_masks[UNOCCUPIED] = territories_to_mask(self.board.territory_ids)
+
+        # Zobrist hash of every territory's occupier and troops, also maintained by the StateMutator.
+        self.zobrist_keys: ZobristKeys = self.map.get_zobrist_keys()
+        self.zobrist_hash: int = self.zobrist_keys.hash([(x, self.board.occupiers[x], self.board.troops[x]) for x in self.board.territory_ids])
+
+        # All randomness in the game (turn order, dice and deck order) comes from this generator, so a game can be
+        # replayed exactly from its seed.
+        self.seed: int = seed if seed is not None else random.randrange(2**32)
+        self.random: random.Random = random.Random(self.seed)
+
+
+    def snapshot(self) -> dict[str, Any]:
+        """A copy of every field which changes as records are committed, except the recording, which can be
+        put back with restore. New fields are included automatically unless they are listed as static.
+        """
+        return copy.deepcopy(dict([(x, y) for x, y in vars(self).items() if x not in _STATIC_FIELDS]))
+
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        for field, value in copy.deepcopy(snapshot).items():
+            setattr(self, field, value)
@@ -1,7 +1,6 @@
 
 
 
-import random
 from typing import cast
 from risk_engine.exceptions import BrokenPipeException, CumulativeTimeoutException, InvalidMessageException, InvalidMoveException, PlayerException, TimeoutException
 from risk_engine.game.engine_state import EngineState
@@ -24,7 +23,7 @@ def record_attack_factory(state: EngineState, move_attack_id: int, move_defend_i
     defending_troops = move_defend_obj.defending_troops
 
     def roll():
-        return random.randint(1, 6)
+        return state.random.randint(1, 6)
     
     attacking_rolls = sorted([roll() for _ in range(attacking_troops)])
     defending_rolls = sorted([roll() for _ in range(defending_troops)])
@@ -33,10 +32,9 @@ def record_attack_factory(state: EngineState, move_attack_id: int, move_defend_i
     attacking_troops_lost = battles_won_by_attacker.count(False)
     defending_troops_lost = battles_won_by_attacker.count(True)
 
-    defending_territory = state.territories[move_attack_obj.defending_territory]
-    territory_conquered = defending_troops_lost == defending_territory.troops
+    territory_conquered = defending_troops_lost == state.board.troops[move_attack_obj.defending_territory]
 
-    defender_eliminated = territory_conquered and len(list(filter(lambda x: x.occupier == move_defend_obj.move_by_player, state.territories.values()))) == 1
+    defender_eliminated = territory_conquered and len(state.territories_owned_by[move_defend_obj.move_by_player]) == 1
 
     return RecordAttack(move_attack_id=move_attack_id, move_defend_id=move_defend_id, attacking_troops_lost=attacking_troops_lost, defending_troops_lost=defending_troops_lost, territory_conquered=territory_conquered, defender_eliminated=defender_eliminated)
 
@@ -67,17 +65,17 @@ def record_player_eliminated_factory(state: EngineState, record_attack_id: int,
 
 
 def record_start_turn_factory(state: EngineState, player: int) -> 'RecordStartTurn':
-    player_territories = [territory_id for territory_id, territory in state.territories.items() if territory.occupier == player]
-    territory_bonus = max(3, len(player_territories) // 3)
+    territories_held = len(state.territories_owned_by[player])
+    territory_bonus = max(3, territories_held // 3)
 
     continents_held = []
     continent_bonus = 0
     for continent, territories in state.map.get_continents().items():
-        if all(territory_id in player_territories for territory_id in territories):
+        if state.continent_territories_owned_by[player][continent] == len(territories):
             continents_held.append(continent)
             continent_bonus += state.map.get_continent_bonus(continent)
 
-    return RecordStartTurn(player=player, continents_held=continents_held, territories_held=len(player_territories), continent_bonus=continent_bonus, territory_bonus=territory_bonus)
+    return RecordStartTurn(player=player, continents_held=continents_held, territories_held=territories_held, continent_bonus=continent_bonus, territory_bonus=territory_bonus)
 
 
 def record_drew_card_factory(state: EngineState, player: int) -> 'RecordDrewCard':
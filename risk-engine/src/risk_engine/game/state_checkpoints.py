@@ -0,0 +1,90 @@
+import math
+from bisect import bisect_right
+from typing import Any, Iterator, Optional
+
+from risk_engine.game.engine_state import EngineState
+from risk_engine.game.state_mutator import StateMutator
+from risk_shared.records.record_drew_card import RecordDrewCard
+from risk_shared.records.record_start_game import RecordStartGame
+from risk_shared.records.types.record_type import RecordType
+
+
+def create_replay_state(recording: list[RecordType]) -> EngineState:
+    """A fresh EngineState for the game in a recording, for its records to be replayed into.
+    """
+    record_start_game = recording[0] if len(recording) > 0 else None
+    if not isinstance(record_start_game, RecordStartGame):
+        raise ValueError("Recording must start with a RecordStartGame.")
+    return EngineState(catalog=[{ "team_id": x.team_id } for x in record_start_game.players], seed=record_start_game.seed)
+
+
+def replay_record(state: EngineState, mutator: StateMutator, i: int, record: RecordType) -> None:
+    """Commits record i of a recording to a state which has been replayed up to record i - 1.
+    """
+    # Some records are committed by the mutator itself when it applies the record before them (e.g.
+    # RecordRedeemedCards), those are already in the replayed recording and must not be applied twice.
+    if i < len(state.recording):
+        if state.recording[i] != record:
+            raise RuntimeError(f"Replayed record {i} does not match the recording.")
+        return
+
+    # The card drawn is taken off the deck by record_drew_card_factory rather than the mutator.
+    if isinstance(record, RecordDrewCard):
+        state.deck.remove(next(filter(lambda x: x.card_id == record.card.card_id, state.deck)))
+
+    mutator.commit(record)
+
+
+def replay(recording: list[RecordType]) -> Iterator[EngineState]:
+    """Replays a recording from the start, yielding the state just after each record is committed. The same
+    state is yielded every time, so it must be copied to be kept.
+    """
+    state = create_replay_state(recording)
+    mutator = StateMutator(state)
+    for i, record in enumerate(recording):
+        replay_record(state, mutator, i, record)
+        yield state
+
+
+class StateCheckpoints():
+    """A side index of EngineState snapshots taken every `interval` records of a finished recording, so the
+    state after any record can be rebuilt by replaying at most `interval` records from the nearest snapshot,
+    rather than replaying from RecordStartGame. The interval defaults to sqrt(len(recording)), which balances
+    the memory used by the snapshots against the replay length.
+
+    The order of the deck isn't part of the recording, so a rebuilt state has the right cards in the deck
+    and discarded deck, but not necessarily in the order the engine drew them.
+    """
+
+    def __init__(self, recording: list[RecordType], interval: Optional[int] = None):
+        self.recording = recording
+        self.interval = interval if interval is not None else max(1, math.isqrt(len(recording)))
+        self._checkpoint_indices: list[int] = []
+        self._checkpoints: list[dict[str, Any]] = []
+        self._checkpoint_recording_lengths: list[int] = []
+
+        for i, state in enumerate(replay(recording)):
+            if i % self.interval == 0:
+                self._checkpoint_indices.append(i)
+                self._checkpoints.append(state.snapshot())
+                self._checkpoint_recording_lengths.append(len(state.recording))
+
+
+    def get_state(self, i: int) -> EngineState:
+        """Rebuilds the EngineState as it was just after record i was committed.
+        """
+        if not 0 <= i < len(self.recording):
+            raise IndexError(f"Record {i} out of range for recording of length {len(self.recording)}.")
+
+        checkpoint = bisect_right(self._checkpoint_indices, i) - 1
+        start = self._checkpoint_indices[checkpoint]
+
+        state = create_replay_state(self.recording)
+        state.restore(self._checkpoints[checkpoint])
+        state.recording = self.recording[:self._checkpoint_recording_lengths[checkpoint]]
+
+        mutator = StateMutator(state)
+        for j in range(start + 1, i + 1):
+            replay_record(state, mutator, j, self.recording[j])
+
+        return state
\ No newline at end of file
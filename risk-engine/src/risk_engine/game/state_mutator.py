@@ -1,6 +1,7 @@
-import random
-from typing import TypeGuard, cast
+from typing import Optional, TypeGuard, cast
+from risk_engine.game.board_state import UNOCCUPIED
 from risk_engine.game.engine_state import EngineState
+from risk_engine.output.recording_writer import RecordingWriter
 from risk_shared.records.moves.move_attack import MoveAttack
 from risk_shared.records.moves.move_attack_pass import MoveAttackPass
 from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
@@ -27,12 +28,47 @@ from risk_shared.records.types.record_type import RecordType
 
 class StateMutator():
 
-    def __init__(self, state: EngineState):
+    def __init__(self, state: EngineState, writer: Optional[RecordingWriter] = None):
         self.state = state
+        self.writer = writer
+
+
+    def _set_occupier(self, territory: int, player: int) -> None:
+        previous_occupier = self.state.board.occupiers[territory]
+        continent = self.state.territory_continent[territory]
+
+        if previous_occupier != UNOCCUPIED:
+            self.state.territories_owned_by[previous_occupier].discard(territory)
+            self.state.continent_territories_owned_by[previous_occupier][continent] -= 1
+
+        self.state.board.occupiers[territory] = player
+        self.state.territories_owned_by[player].add(territory)
+        self.state.continent_territories_owned_by[player][continent] += 1
+
+        bit = 1 << territory
+        self.state.territory_masks[previous_occupier] &= ~bit
+        self.state.territory_masks[player] |= bit
+        self.state.zobrist_hash ^= self.state.zobrist_keys.get_occupier_change(territory, previous_occupier, player)
+
+
+    def _add_troops(self, territory: int, troops: int) -> None:
+        previous_troops = self.state.board.troops[territory]
+        self.state.board.troops[territory] = previous_troops + troops
+        self.state.zobrist_hash ^= self.state.zobrist_keys.get_troops_change(territory, previous_troops, previous_troops + troops)
+
+
+    def _set_troops_remaining(self, player: int, troops_remaining: int) -> None:
+        player_model = self.state.players[player]
+        self.state.players_with_troops_remaining_count += (troops_remaining > 0) - (player_model.troops_remaining > 0)
+        player_model.troops_remaining = troops_remaining
 
     def commit(self, record: RecordType):
         self.state.recording.append(record)
 
+        # Write the record out before applying it, since applying it can commit further records.
+        if self.writer is not None:
+            self.writer.write(len(self.state.recording) - 1, record)
+
         match record:
             case MoveAttack() as r:
                 self._commit_move_attack(r)
@@ -91,10 +127,10 @@ class StateMutator():
     def _commit_move_claim_territory(self, r: MoveClaimTerritory) -> None:
         player = self.state.players[r.move_by_player]
         
-        claimed_territory = self.state.territories[r.territory]
-        claimed_territory.occupier = r.move_by_player
-        claimed_territory.troops = 1
-        player.troops_remaining -= 1
+        self._set_occupier(r.territory, r.move_by_player)
+        self._add_troops(r.territory, 1 - self.state.board.troops[r.territory])
+        self.state.unclaimed_territory_count -= 1
+        self._set_troops_remaining(r.move_by_player, player.troops_remaining - 1)
 
 
     def _commit_move_defend(self, r: MoveDefend) -> None:
@@ -105,19 +141,19 @@ class StateMutator():
         player = self.state.players[r.move_by_player]
 
         # The player must have placed all their troops.
-        player.troops_remaining = 0
+        self._set_troops_remaining(r.move_by_player, 0)
 
         # Reset the matching territories.
         player.must_place_territory_bonus = []
 
         # Distribute the troops.
         for territory, troops in r.distributions.items():
-            self.state.territories[territory].troops += troops
+            self._add_troops(territory, troops)
 
 
     def _commit_move_fortify(self, r: MoveFortify) -> None:
-        self.state.territories[r.source_territory].troops -= r.troop_count
-        self.state.territories[r.target_territory].troops += r.troop_count
+        self._add_troops(r.source_territory, -r.troop_count)
+        self._add_troops(r.target_territory, r.troop_count)
 
 
     def _commit_move_fortify_pass(self, r: MoveFortifyPass) -> None:
@@ -125,8 +161,8 @@ class StateMutator():
 
 
     def _commit_move_place_initial_troop(self, r: MovePlaceInitialTroop) -> None:
-        self.state.territories[r.territory].troops += 1
-        self.state.players[r.move_by_player].troops_remaining -= 1
+        self._add_troops(r.territory, 1)
+        self._set_troops_remaining(r.move_by_player, self.state.players[r.move_by_player].troops_remaining - 1)
 
 
     def _commit_move_redeem_cards(self, r: MoveRedeemCards) -> None:
@@ -151,11 +187,11 @@ class StateMutator():
         def remove_none(x) -> TypeGuard[int]:
             return x != None
         
-        matching_territories = set(filter(remove_none, [self.state.cards[card].territory_id for card in all_cards])) & set(map(lambda x: x.territory_id, filter(lambda x: x.occupier == r.move_by_player, self.state.territories.values())))
+        matching_territories = set(filter(remove_none, [self.state.cards[card].territory_id for card in all_cards])) & self.state.territories_owned_by[r.move_by_player]
         matching_territory_bonus = 2 if len(matching_territories) > 0 else 0
 
         # Modify the player.
-        self.state.players[r.move_by_player].troops_remaining += total_set_bonus + matching_territory_bonus
+        self._set_troops_remaining(r.move_by_player, self.state.players[r.move_by_player].troops_remaining + total_set_bonus + matching_territory_bonus)
         self.state.players[r.move_by_player].must_place_territory_bonus = list(matching_territories)
         self.state.players[r.move_by_player].cards = list(filter(lambda x: x.card_id not in set(all_cards), self.state.players[r.move_by_player].cards))
 
@@ -173,8 +209,8 @@ class StateMutator():
         move_attack_id = record_attack.move_attack_id
         move_attack = cast(MoveAttack, self.state.recording[move_attack_id])
         
-        self.state.territories[move_attack.attacking_territory].troops -= r.troop_count
-        self.state.territories[move_attack.defending_territory].troops += r.troop_count
+        self._add_troops(move_attack.attacking_territory, -r.troop_count)
+        self._add_troops(move_attack.defending_territory, r.troop_count)
 
 
     def _commit_record_attack(self, r: RecordAttack) -> None:
@@ -183,11 +219,11 @@ class StateMutator():
         attacking_territory = move_attack.attacking_territory
         defending_territory = move_attack.defending_territory
 
-        self.state.territories[attacking_territory].troops -= r.attacking_troops_lost
-        self.state.territories[defending_territory].troops -= r.defending_troops_lost
+        self._add_troops(attacking_territory, -r.attacking_troops_lost)
+        self._add_troops(defending_territory, -r.defending_troops_lost)
 
         if r.territory_conquered:
-            self.state.territories[defending_territory].occupier = move_attack.move_by_player
+            self._set_occupier(defending_territory, move_attack.move_by_player)
 
 
     def _commit_record_banned(self, r: RecordBanned) -> None:
@@ -201,6 +237,7 @@ class StateMutator():
     def _commit_record_player_eliminated(self, r: RecordPlayerEliminated) -> None:
         # The player is eliminated.
         self.state.players[r.player].alive = False
+        self.state.alive_player_count -= 1
 
         # Their cards are surrendered.
         record_attack = cast(RecordAttack, self.state.recording[r.record_attack_id])
@@ -217,7 +254,7 @@ class StateMutator():
             raise RuntimeError("Shuffled cards before deck was empty.")
 
         self.state.deck = self.state.discarded_deck
-        random.shuffle(self.state.deck)
+        self.state.random.shuffle(self.state.deck)
         self.state.discarded_deck = []
 
 
@@ -226,7 +263,7 @@ class StateMutator():
 
 
     def _commit_record_start_turn(self, r: RecordStartTurn) -> None:
-        self.state.players[r.player].troops_remaining += r.territory_bonus + r.continent_bonus
+        self._set_troops_remaining(r.player, self.state.players[r.player].troops_remaining + r.territory_bonus + r.continent_bonus)
 
 
     def _commit_record_territory_conquered(self, r: RecordTerritoryConquered) -> None:
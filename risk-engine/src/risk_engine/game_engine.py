@@ -1,6 +1,5 @@
-import random
 import shutil
-from typing import Tuple
+from typing import Any, Callable, Generator, Optional, Tuple
 from collections import deque
 
 from risk_engine.censoring.censor_record import CensorRecord
@@ -13,6 +12,7 @@ from risk_engine.game.engine_state import EngineState
 from risk_engine.game.state_mutator import StateMutator
 from risk_engine.output.game_result import GameBanResult, GameCancelledResult, GameSuccessResult
 from risk_engine.output.recording_inspector import RecordingInspector
+from risk_engine.output.recording_writer import RecordingWriter
 from risk_engine.validation.move_validator import MoveValidator
 from risk_shared.models.player_model import PlayerModel
 from risk_shared.records.moves.move_attack_pass import MoveAttackPass
@@ -22,43 +22,38 @@ from risk_shared.records.record_start_game import RecordStartGame
 from risk_shared.records.record_territory_conquered import RecordTerritoryConquered
 from risk_shared.records.record_winner import RecordWinner
 
-def get_next_turn(state: EngineState, connections: dict[int, PlayerConnection], turn_order: deque[int]) -> Tuple[PlayerModel, PlayerConnection]:
+# A query the rules need answered, as the id of the player to ask and a function which makes the query on that
+# player's connection. The rules of the game are written once, as generators which yield queries and are sent
+# back each player's move, so the same rules can be driven by blocking connections (GameEngine) or by asyncio
+# connections (AsyncGameEngine), whose query methods are awaited.
+Query = Tuple[int, Callable[[Any], Any]]
+Rules = Generator[Query, Any, None]
+
+
+def get_next_turn(state: EngineState, turn_order: deque[int]) -> PlayerModel:
         player_id = turn_order.pop()
         player = state.players[player_id]
-        connection = connections[player_id]
 
         while not player.alive:
             player_id = turn_order.pop()
             player = state.players[player_id]
-            connection = connections[player_id]
         
         turn_order.appendleft(player_id)
-        return (player, connection)
+        return player
+
 
+class BaseGameEngine():
+    """The state and rules of a game, without any way of talking to the players, see GameEngine.
+    """
 
-class GameEngine:
-    def __init__(self, print_recording_interactive: bool=False):
-        self.state = EngineState()
+    def __init__(self, print_recording_interactive: bool=False, catalog: Optional[list[dict[str, Any]]]=None, seed: Optional[int]=None, binary_recording: bool=False):
+        self.state = EngineState(catalog, seed)
         self.mutator = StateMutator(self.state)
         self.validator = MoveValidator(self.state)
         self.censor = CensorRecord(self.state)
-        self.connections: dict[int, PlayerConnection]
         self.print_recording_interactive = print_recording_interactive
-
-    def start(self):
-        try:
-            self._connect()
-            self._run_game()
-        except PlayerException as e:
-            record = record_banned_factory(e)
-            self.mutator.commit(record)
-        finally:
-            self._finish()
-        
-
-
-    def _connect(self):
-        self.connections = dict([(x, PlayerConnection(player_id=x)) for x in self.state.players.keys()])
+        self.core_directory = CORE_DIRECTORY
+        self.binary_recording = binary_recording
 
 
     def _finish(self):
@@ -67,26 +62,23 @@ class GameEngine:
         inspector = RecordingInspector(self.state.recording)
         result = inspector.get_result()
 
-        with open(f"{CORE_DIRECTORY}/output/results.json", "w") as f:
+        with open(f"{self.core_directory}/output/results.json", "w") as f:
             f.write(result.model_dump_json())
 
-        # Write the game log.
-        with open(f"{CORE_DIRECTORY}/output/game.json", "w") as f:
-            f.write(inspector.get_recording_json())
+        # The game log and the visualiser differentials were streamed out as the game was played.
+        if self.mutator.writer is not None:
+            self.mutator.writer.close()
 
-        # Write the visualiser forward and backwards differential logs.
-        forwards_differential, backwards_differential = inspector.get_visualiser_forwards_backwards_differential_json()
-        with open(f"{CORE_DIRECTORY}/output/visualiser_forwards_differential.json", "w") as f:
-            f.write(forwards_differential)
-        
-        with open(f"{CORE_DIRECTORY}/output/visualiser_backwards_differential.json", "w") as f:
-            f.write(backwards_differential)
+        # Optionally write the columnar recording, see risk_shared.output.binary_recording.
+        if self.binary_recording:
+            with open(f"{self.core_directory}/output/game.bin", "wb") as f:
+                f.write(inspector.get_recording_binary())
 
         def copy_stdout_stderr_player(player: int):
-            stderr_path = f"{CORE_DIRECTORY}/submission{player}/io/submission.err"
-            stderr_path_new = f"{CORE_DIRECTORY}/output/submission_{player}.err"
-            stdout_path = f"{CORE_DIRECTORY}/submission{player}/io/submission.log"
-            stdout_path_new = f"{CORE_DIRECTORY}/output/submission_{player}.log"
+            stderr_path = f"{self.core_directory}/submission{player}/io/submission.err"
+            stderr_path_new = f"{self.core_directory}/output/submission_{player}.err"
+            stdout_path = f"{self.core_directory}/submission{player}/io/submission.log"
+            stdout_path_new = f"{self.core_directory}/output/submission_{player}.log"
 
             try:
                 shutil.copy(stderr_path, stderr_path_new, follow_symlinks=False)
@@ -115,13 +107,13 @@ class GameEngine:
                 pass
 
 
-    def _run_game(self):
+    def _play_game(self) -> Rules:
         
         # Emit RecordStartGame.
         turn_order = list(self.state.players.keys())
-        random.shuffle(turn_order)
+        self.state.random.shuffle(turn_order)
         self.state.turn_order = turn_order
-        record_start_game = RecordStartGame(turn_order=self.state.turn_order.copy(), players=[PlayerModel.model_validate(x.model_dump()) for x in self.state.players.values()])
+        record_start_game = RecordStartGame(turn_order=self.state.turn_order.copy(), players=[PlayerModel.model_validate(x.model_dump()) for x in self.state.players.values()], seed=self.state.seed)
         self.mutator.commit(record_start_game)
 
         # Emit RecordShuffledCards.
@@ -129,13 +121,13 @@ class GameEngine:
         self.mutator.commit(record_shuffled_cards)
 
         # Run the initial phases.
-        self._start_claim_territories_phase()
-        self._start_place_initial_troops_phase()
+        yield from self._start_claim_territories_phase()
+        yield from self._start_place_initial_troops_phase()
 
         # Run the main game.
         turn_order = deque(self.state.turn_order.copy())
         cancelled = False
-        while len(list(filter(lambda x: x.alive == True, self.state.players.values()))) > 1:
+        while self.state.alive_player_count > 1:
             if self.print_recording_interactive: 
                 print(f"[engine] recording match: {len(self.state.recording)}", flush=True)
 
@@ -143,14 +135,14 @@ class GameEngine:
                 cancelled = True
                 break
             
-            player, connection = get_next_turn(self.state, self.connections, turn_order)
+            player = get_next_turn(self.state, turn_order)
 
-            self._troop_phase(player, connection)
-            self._attack_phase(player, connection)
+            yield from self._troop_phase(player)
+            yield from self._attack_phase(player)
 
             # Don't bother with fortify phase if game has already ended.
-            if len(list(filter(lambda x: x.alive == True, self.state.players.values()))) > 1:
-                self._fortify_phase(player, connection)
+            if self.state.alive_player_count > 1:
+                yield from self._fortify_phase(player)
 
         # If the game was terminated due to taking too long, cancel the match.
         if cancelled:
@@ -165,44 +157,44 @@ class GameEngine:
 
 
 
-    def _start_claim_territories_phase(self):
+    def _start_claim_territories_phase(self) -> Rules:
         turn_order = deque(self.state.turn_order.copy())
 
-        while len(list(filter(lambda x: x.occupier == None, self.state.territories.values()))) > 0:
-            player, connection = get_next_turn(self.state, self.connections, turn_order)
-            response = connection.query_claim_territory(self.state, self.validator, self.censor)
+        while self.state.unclaimed_territory_count > 0:
+            player = get_next_turn(self.state, turn_order)
+            response = yield (player.player_id, lambda x: x.query_claim_territory(self.state, self.validator, self.censor))
             self.mutator.commit(response)
 
 
-    def _start_place_initial_troops_phase(self):
+    def _start_place_initial_troops_phase(self) -> Rules:
         turn_order = deque(self.state.turn_order.copy())
 
-        while len(list(filter(lambda x: x.troops_remaining > 0, self.state.players.values()))) > 0:
-            player, connection = get_next_turn(self.state, self.connections, turn_order)
+        while self.state.players_with_troops_remaining_count > 0:
+            player = get_next_turn(self.state, turn_order)
 
             if player.troops_remaining == 0:
                 continue
 
-            response = connection.query_place_initial_troop(self.state, self.validator, self.censor)
+            response = yield (player.player_id, lambda x: x.query_place_initial_troop(self.state, self.validator, self.censor))
             self.mutator.commit(response)
 
 
-    def _troop_phase(self, player: PlayerModel, connection: PlayerConnection):
+    def _troop_phase(self, player: PlayerModel) -> Rules:
         
         # Emit a RecordStartTurn.
         record = record_start_turn_factory(self.state, player.player_id)
         self.mutator.commit(record)
 
         # Let the player redeem cards.
-        response = connection.query_redeem_cards(self.state, self.validator, self.censor, cause="turn_started")
+        response = yield (player.player_id, lambda x: x.query_redeem_cards(self.state, self.validator, self.censor, cause="turn_started"))
         self.mutator.commit(response)
 
         # Let the player distribute troops.
-        response = connection.query_distribute_troops(self.state, self.validator, self.censor, cause="turn_started")
+        response = yield (player.player_id, lambda x: x.query_distribute_troops(self.state, self.validator, self.censor, cause="turn_started"))
         self.mutator.commit(response)
 
 
-    def _attack_phase(self, player: PlayerModel, connection: PlayerConnection):
+    def _attack_phase(self, player: PlayerModel) -> Rules:
 
         conquered_territory = False
         abort_early = False
@@ -214,7 +206,7 @@ class GameEngine:
                 break
 
             # Get the attack move.
-            attack = connection.query_attack(self.state, self.validator, self.censor)
+            attack = yield (player.player_id, lambda x: x.query_attack(self.state, self.validator, self.censor))
             self.mutator.commit(attack)
             move_attack_id = len(self.state.recording) - 1
 
@@ -222,12 +214,12 @@ class GameEngine:
             if isinstance(attack, MoveAttackPass):
                 break
             
-            defending_player = self.state.territories[attack.defending_territory].occupier
+            defending_player = self.state.board.get_occupier(attack.defending_territory)
             if defending_player == None:
                 raise RuntimeError("Tried to attack unoccupied territory.")
 
             # Get the defend move.
-            defend = self.connections[defending_player].query_defend(self.state, self.validator, self.censor, move_attack_id)
+            defend = yield (defending_player, lambda x: x.query_defend(self.state, self.validator, self.censor, move_attack_id))
             self.mutator.commit(defend)
             move_defend_id = len(self.state.recording) - 1
 
@@ -249,21 +241,21 @@ class GameEngine:
                 self.mutator.commit(record)
 
                 # Abort early if game just finished.
-                if len(list(filter(lambda x: x.alive == True, self.state.players.values()))) == 1:
+                if self.state.alive_player_count == 1:
                     abort_early = True
                     break
 
             # If a territory was conquered, the attacking player can move troops.
             if record_attack.territory_conquered:
-                response = connection.query_troops_after_attack(self.state, self.validator, self.censor, record_attack_id)
+                response = yield (player.player_id, lambda x: x.query_troops_after_attack(self.state, self.validator, self.censor, record_attack_id))
                 self.mutator.commit(response)
 
             # If a player was eliminated and the attacking player now has more than 6 cards, they get to redeem and then place troops.
             if record_attack.defender_eliminated and len(player.cards) > 6:
-                response = connection.query_redeem_cards(self.state, self.validator, self.censor, cause="player_eliminated")
+                response = yield (player.player_id, lambda x: x.query_redeem_cards(self.state, self.validator, self.censor, cause="player_eliminated"))
                 self.mutator.commit(response)
 
-                response = connection.query_distribute_troops(self.state, self.validator, self.censor, cause="player_eliminated")
+                response = yield (player.player_id, lambda x: x.query_distribute_troops(self.state, self.validator, self.censor, cause="player_eliminated"))
                 self.mutator.commit(response)
 
         # If the player conquered any territories this turn, they draw a card.
@@ -277,7 +269,42 @@ class GameEngine:
             self.mutator.commit(record)
 
 
-    def _fortify_phase(self, player: PlayerModel, connection: PlayerConnection):
-        response = connection.query_fortify(self.state, self.validator, self.censor)
+    def _fortify_phase(self, player: PlayerModel) -> Rules:
+        response = yield (player.player_id, lambda x: x.query_fortify(self.state, self.validator, self.censor))
         self.mutator.commit(response)
+
+
+class GameEngine(BaseGameEngine):
+    """Runs a game against submissions over their FIFO pipes, blocking on one player at a time.
+    """
+
+    def __init__(self, print_recording_interactive: bool=False, catalog: Optional[list[dict[str, Any]]]=None, seed: Optional[int]=None, binary_recording: bool=False):
+        super().__init__(print_recording_interactive, catalog, seed, binary_recording)
+        self.connections: dict[int, PlayerConnection]
+
+    def start(self):
+        self.mutator.writer = RecordingWriter(f"{self.core_directory}/output", self.state.recording)
+        try:
+            self._connect()
+            self._run_game()
+        except PlayerException as e:
+            record = record_banned_factory(e)
+            self.mutator.commit(record)
+        finally:
+            self._finish()
+        
+
+
+    def _connect(self):
+        self.connections = dict([(x, PlayerConnection(player_id=x)) for x in self.state.players.keys()])
+
+
+    def _run_game(self):
+        rules = self._play_game()
+        try:
+            player_id, query = next(rules)
+            while True:
+                player_id, query = rules.send(query(self.connections[player_id]))
+        except StopIteration:
+            pass
         
\ No newline at end of file
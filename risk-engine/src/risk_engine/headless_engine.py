@@ -0,0 +1,54 @@
+from typing import Any, Optional, Union
+
+from risk_engine.config.gameconfig import NUM_PLAYERS
+from risk_engine.connection.local_connection import BotCallable, LocalPlayerConnection
+from risk_engine.exceptions import PlayerException
+from risk_engine.game.record_factory import record_banned_factory
+from risk_engine.game_engine import GameEngine
+from risk_engine.output.game_result import GameBanResult, GameCancelledResult, GameCrashedResult, GameSuccessResult
+from risk_engine.output.recording_inspector import RecordingInspector
+
+
+class HeadlessGameEngine(GameEngine):
+    """Runs a match entirely inside the current process against python callables, without
+    FIFO pipes, JSON serialisation, subprocesses or any files being written.
+    """
+
+    def __init__(self, bots: list[BotCallable], catalog: Optional[list[dict[str, Any]]]=None, seed: Optional[int]=None):
+        if len(bots) != NUM_PLAYERS:
+            raise ValueError(f"Total players in the match must be {NUM_PLAYERS}.")
+
+        if catalog is None:
+            catalog = [{ "team_id": i } for i in range(NUM_PLAYERS)]
+
+        super().__init__(print_recording_interactive=False, catalog=catalog, seed=seed)
+        self.bots = bots
+        self.result: Union[GameBanResult, GameSuccessResult, GameCancelledResult, GameCrashedResult]
+
+
+    def start(self):
+        try:
+            self._connect()
+            self._run_game()
+        except PlayerException as e:
+            record = record_banned_factory(e)
+            self.mutator.commit(record)
+        finally:
+            self._finish()
+
+        return self.result
+
+
+    def _connect(self):
+        self.connections = dict([(x, LocalPlayerConnection(player_id=x, bot=self.bots[x])) for x in self.state.players.keys()]) # type: ignore
+
+
+    def _finish(self):
+        self.result = RecordingInspector(self.state.recording).get_result()
+
+
+def run_headless_match(bots: list[BotCallable], catalog: Optional[list[dict[str, Any]]]=None, seed: Optional[int]=None) -> Union[GameBanResult, GameSuccessResult, GameCancelledResult, GameCrashedResult]:
+    """Plays a single match between the given bots in-process and returns the result, the full
+    recording is available on `HeadlessGameEngine.state.recording` if it is needed.
+    """
+    return HeadlessGameEngine(bots, catalog, seed).start()
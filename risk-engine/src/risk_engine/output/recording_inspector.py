@@ -1,22 +1,14 @@
 
 
-from typing import Tuple, Union, cast
+from typing import Callable, Tuple, Union, cast
 
 from pydantic import RootModel
 from risk_engine.output.game_result import GameBanResult, GameCancelledResult, GameCrashedResult, GameSuccessResult
-from risk_shared.maps import earth
-from risk_shared.models.territory_model import TerritoryModel
-from risk_shared.records.moves.move_attack import MoveAttack
-from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
-from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
-from risk_shared.records.moves.move_fortify import MoveFortify
-from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
-from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
-from risk_shared.records.record_attack import RecordAttack
+from risk_engine.output.visualiser_differential import VisualiserDifferential, dump_differential
+from risk_shared.output.binary_recording import dump_binary_recording
 from risk_shared.records.record_banned import RecordBanned
 from risk_shared.records.record_cancelled import RecordCancelled
 from risk_shared.records.record_player_eliminated import RecordPlayerEliminated
-from risk_shared.records.record_start_game import RecordStartGame
 from risk_shared.records.record_winner import RecordWinner
 from risk_shared.records.types.record_type import RecordType
 
@@ -40,140 +32,67 @@ class RecordingInspector():
 
 
     def get_result(self) -> Union[GameBanResult, GameSuccessResult, GameCancelledResult, GameCrashedResult]:
+        return self._get_result(self._get_ranking)
+
+
+    def _get_result(self, get_ranking: Callable[[], list[int]]) -> Union[GameBanResult, GameSuccessResult, GameCancelledResult, GameCrashedResult]:
         match self.recording[-1]:
             case RecordCancelled() as x:
                 return GameCancelledResult(reason=x.reason)
             case RecordBanned() as x:
                 return GameBanResult(ban_type=x.ban_type, player=x.player, reason=x.reason)
             case RecordWinner() as x:
-                return GameSuccessResult(ranking=self._get_ranking())
+                return GameSuccessResult(ranking=get_ranking())
             case _:
                 return GameCrashedResult(reason="Game engine crashed.")
             
 
     def get_recording_json(self) -> str:
         return RootModel(self.recording).model_dump_json()
-    
-
-    def get_visualiser_forwards_backwards_differential_json(self) -> Tuple[str, str]:
-        
-        earth_map = earth.create_map()
-        territories = dict([(x, TerritoryModel(territory_id=x, occupier=None, troops=0)) for x in earth_map.get_vertices()])
 
-        forwards_differential: list[Tuple[int, list[TerritoryModel]]] = []
-        backwards_differential: list[Tuple[int, list[TerritoryModel]]] = []
 
+    def get_recording_binary(self) -> bytes:
+        return dump_binary_recording(self.recording)
+    
 
+    def get_visualiser_forwards_backwards_differential_json(self) -> Tuple[str, str]:
+        differential = VisualiserDifferential(self.recording)
+        forwards_differential: list[str] = []
+        backwards_differential: list[str] = []
         for i, record in enumerate(self.recording):
-            match record:
-                case RecordStartGame() as r:
-                    backwards_differential.append((i, []))
-
-                case MoveClaimTerritory() as r:
-                    territory_old = territories[r.territory].model_copy()
-                    territory_new = territory_old.model_copy()
-
-                    territory_new.occupier = r.move_by_player
-                    territory_new.troops = 1
-
-                    backwards_differential.append((i, [territory_old]))
-                    forwards_differential.append((i, [territory_new]))
-
-                    territories[territory_new.territory_id] = territory_new
-
-
-                case MoveDistributeTroops() as r:
-                    territories_old = [territories[territory].model_copy() for territory in r.distributions.keys()]
-                    territories_new = dict([(territory.territory_id, territory.model_copy()) for territory in territories_old])
-
-                    for key, value in r.distributions.items():
-                        territories_new[key].troops += value
-
-                    backwards_differential.append((i, territories_old))
-                    forwards_differential.append((i, list(territories_new.values())))
-
-                    for territory in territories_new.values():
-                        territories[territory.territory_id] = territory
-
-
-                case MoveFortify() as r:
-                    source_territory_old = territories[r.source_territory].model_copy()
-                    target_territory_old = territories[r.target_territory].model_copy()
-                    source_territory_new = source_territory_old.model_copy()
-                    target_territory_new = target_territory_old.model_copy()
+            self._step_differentials(differential, i, record, forwards_differential, backwards_differential)
 
-                    source_territory_new.troops -= r.troop_count
-                    target_territory_new.troops += r.troop_count
+        return ("[" + ",".join(forwards_differential) + "]", "[" + ",".join(backwards_differential) + "]")
 
-                    backwards_differential.append((i, [source_territory_old, target_territory_old]))
-                    forwards_differential.append((i, [source_territory_new, target_territory_new]))
 
-                    territories[source_territory_new.territory_id] = source_territory_new
-                    territories[target_territory_new.territory_id] = target_territory_new
+    def _step_differentials(self, differential: VisualiserDifferential, i: int, record: RecordType, forwards_differential: list[str], backwards_differential: list[str]) -> None:
+        forwards, backwards = differential.step(i, record)
+        if forwards is not None:
+            forwards_differential.append(dump_differential(forwards))
+        if backwards is not None:
+            backwards_differential.append(dump_differential(backwards))
 
 
-                case MovePlaceInitialTroop() as r:
-                    territory_old = territories[r.territory].model_copy()
-                    territory_new = territory_old.model_copy()
+    def get_output(self) -> Tuple[Union[GameBanResult, GameSuccessResult, GameCancelledResult, GameCrashedResult], str, str, str]:
+        """Computes the result, the recording json and the visualiser forwards and backwards differentials
+        in a single pass over the recording, returned in that order. The engine streams these out as the game
+        is played (see RecordingWriter), this rebuilds them all at once from a finished recording. Callers
+        which only want some of them should use the individual methods instead.
+        """
+        differential = VisualiserDifferential(self.recording)
 
-                    territory_new.troops += 1
-
-                    backwards_differential.append((i, [territory_old]))
-                    forwards_differential.append((i, [territory_new]))
-
-                    territories[territory_new.territory_id] = territory_new
-
-
-                case MoveTroopsAfterAttack() as r:
-                    record_attack = cast(RecordAttack, self.recording[r.record_attack_id])
-                    move_attack = cast(MoveAttack, self.recording[record_attack.move_attack_id])
-
-                    attacking_territory_old = territories[move_attack.attacking_territory].model_copy()
-                    defending_territory_old = territories[move_attack.defending_territory].model_copy()
-                    attacking_territory_new = attacking_territory_old.model_copy()
-                    defending_territory_new = defending_territory_old.model_copy()
-
-                    attacking_territory_new.troops -= r.troop_count
-                    defending_territory_new.troops += r.troop_count
-
-                    backwards_differential.append((i, [attacking_territory_old, defending_territory_old]))
-                    forwards_differential.append((i, [attacking_territory_new, defending_territory_new]))
-                    
-                    territories[attacking_territory_new.territory_id] = attacking_territory_new
-                    territories[defending_territory_new.territory_id] = defending_territory_new
-
-
-                case RecordAttack() as r:
-                    move_attack = cast(MoveAttack, self.recording[r.move_attack_id])
-
-                    attacking_territory_old = territories[move_attack.attacking_territory].model_copy()
-                    defending_territory_old = territories[move_attack.defending_territory].model_copy()
-                    attacking_territory_new = attacking_territory_old.model_copy()
-                    defending_territory_new = defending_territory_old.model_copy()
-
-                    attacking_territory_new.troops -= r.attacking_troops_lost
-                    defending_territory_new.troops -= r.defending_troops_lost
-
-                    if r.territory_conquered:
-                        defending_territory_new.occupier = move_attack.move_by_player
-
-                    backwards_differential.append((i, [attacking_territory_old, defending_territory_old]))
-                    forwards_differential.append((i, [attacking_territory_new, defending_territory_new]))
-
-                    territories[attacking_territory_new.territory_id] = attacking_territory_new
-                    territories[defending_territory_new.territory_id] = defending_territory_new
-
-
-                case RecordBanned() as r:
-                    forwards_differential.append((i, []))
-
-
-                case RecordCancelled() as r:
-                    forwards_differential.append((i, []))
+        ranking: list[int] = []
+        records: list[str] = []
+        forwards_differential: list[str] = []
+        backwards_differential: list[str] = []
 
+        for i, record in enumerate(self.recording):
+            match record.record_type:
+                case "record_player_eliminated" | "record_winner":
+                    ranking.append(cast(Union[RecordPlayerEliminated, RecordWinner], record).player)
 
-                case RecordWinner() as r:
-                    forwards_differential.append((i, []))
+            records.append(record.model_dump_json())
+            self._step_differentials(differential, i, record, forwards_differential, backwards_differential)
 
-        
-        return (RootModel(forwards_differential).model_dump_json(), RootModel(backwards_differential).model_dump_json())
\ No newline at end of file
+        result = self._get_result(lambda: ranking[::-1])
+        return (result, "[" + ",".join(records) + "]", "[" + ",".join(forwards_differential) + "]", "[" + ",".join(backwards_differential) + "]")
\ No newline at end of file
@@ -0,0 +1,56 @@
+import os
+from typing import BinaryIO
+
+from risk_engine.output.visualiser_differential import VisualiserDifferential, dump_differential
+from risk_shared.records.types.record_type import RecordType
+
+
+class _JsonArrayFile():
+    """A JSON array that is appended to one element at a time. The closing bracket is written after every
+    element and then overwritten by the next one, so the file on disk is always a complete array.
+    """
+
+    def __init__(self, path: str):
+        self.file: BinaryIO = open(path, "wb")
+        self.file.write(b"[]")
+        self.file.seek(-1, os.SEEK_CUR)
+        self.empty = True
+
+
+    def append(self, data: str) -> None:
+        self.file.write((data if self.empty else "," + data).encode() + b"]")
+        self.file.seek(-1, os.SEEK_CUR)
+        self.empty = False
+
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class RecordingWriter():
+    """Streams the game log and the visualiser differentials to the output directory as each record is
+    committed, instead of serialising the whole recording at the end of the game. Every file is valid
+    JSON after each record, so a crashed engine still leaves a usable partial log.
+    """
+
+    def __init__(self, output_directory: str, recording: list[RecordType]):
+        self.differential = VisualiserDifferential(recording)
+        self.game = _JsonArrayFile(f"{output_directory}/game.json")
+        self.forwards = _JsonArrayFile(f"{output_directory}/visualiser_forwards_differential.json")
+        self.backwards = _JsonArrayFile(f"{output_directory}/visualiser_backwards_differential.json")
+
+
+    def write(self, i: int, record: RecordType) -> None:
+        self.game.append(record.model_dump_json())
+
+        forwards, backwards = self.differential.step(i, record)
+        if forwards is not None:
+            self.forwards.append(dump_differential(forwards))
+        if backwards is not None:
+            self.backwards.append(dump_differential(backwards))
+
+
+    def close(self) -> None:
+        self.game.close()
+        self.forwards.close()
+        self.backwards.close()
\ No newline at end of file
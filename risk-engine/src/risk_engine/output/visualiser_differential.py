@@ -0,0 +1,95 @@
+from typing import Optional, Tuple, cast
+
+from risk_shared.maps import earth
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
+from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
+from risk_shared.records.moves.move_fortify import MoveFortify
+from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
+from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
+from risk_shared.records.record_attack import RecordAttack
+from risk_shared.records.types.record_type import RecordType
+
+# A differential is the record index and the (territory_id, occupier, troops) of each territory it touched,
+# kept as plain tuples rather than TerritoryModels since there are tens of thousands of them per game.
+TerritoryTuple = Tuple[int, Optional[int], int]
+Differential = Tuple[int, list[TerritoryTuple]]
+
+
+def dump_differential(differential: Differential) -> str:
+    """Serialises a single differential the same way RootModel would serialise it with TerritoryModels.
+    """
+    i, territories = differential
+    return f"[{i},[" + ",".join(f'{{"territory_id":{t},"occupier":{"null" if o is None else o},"troops":{n}}}' for t, o, n in territories) + "]]"
+
+
+class VisualiserDifferential():
+    """Builds the visualiser's forwards and backwards differentials one record at a time, so that they can
+    be written out as the game is played.
+    """
+
+    def __init__(self, recording: list[RecordType]):
+        self.recording = recording
+        territories = earth.create_map().get_vertices()
+        self.occupiers: list[Optional[int]] = [None] * (max(territories) + 1)
+        self.troops: list[int] = [0] * (max(territories) + 1)
+
+
+    def _apply(self, i: int, changes: list[Tuple[int, Optional[int], int]]) -> Tuple[Differential, Differential]:
+        # Changes are (territory_id, new occupier, change in troops).
+        occupiers, troops = self.occupiers, self.troops
+        backwards = [(t, occupiers[t], troops[t]) for t, _, _ in changes]
+        for t, occupier, delta in changes:
+            occupiers[t] = occupier
+            troops[t] += delta
+        forwards = [(t, occupiers[t], troops[t]) for t, _, _ in changes]
+        return ((i, forwards), (i, backwards))
+
+
+    def step(self, i: int, record: RecordType) -> Tuple[Optional[Differential], Optional[Differential]]:
+        """Returns the (forwards, backwards) differentials for the i-th record, either can be None if the
+        record doesn't appear in that differential.
+        """
+        occupiers = self.occupiers
+
+        # Dispatch on record_type rather than class patterns, isinstance checks against pydantic models are slow
+        # enough to dominate this loop.
+        match record.record_type:
+            case "record_start_game":
+                return (None, (i, []))
+
+            case "move_claim_territory":
+                r = cast(MoveClaimTerritory, record)
+                return self._apply(i, [(r.territory, r.move_by_player, 1 - self.troops[r.territory])])
+
+            case "move_distribute_troops":
+                r = cast(MoveDistributeTroops, record)
+                return self._apply(i, [(t, occupiers[t], x) for t, x in r.distributions.items()])
+
+            case "move_fortify":
+                r = cast(MoveFortify, record)
+                return self._apply(i, [(r.source_territory, occupiers[r.source_territory], -r.troop_count), (r.target_territory, occupiers[r.target_territory], r.troop_count)])
+
+            case "move_place_initial_troop":
+                r = cast(MovePlaceInitialTroop, record)
+                return self._apply(i, [(r.territory, occupiers[r.territory], 1)])
+
+            case "move_troops_after_attack":
+                r = cast(MoveTroopsAfterAttack, record)
+                record_attack = cast(RecordAttack, self.recording[r.record_attack_id])
+                move_attack = cast(MoveAttack, self.recording[record_attack.move_attack_id])
+                attacking, defending = move_attack.attacking_territory, move_attack.defending_territory
+                return self._apply(i, [(attacking, occupiers[attacking], -r.troop_count), (defending, occupiers[defending], r.troop_count)])
+
+            case "record_attack":
+                r = cast(RecordAttack, record)
+                move_attack = cast(MoveAttack, self.recording[r.move_attack_id])
+                attacking, defending = move_attack.attacking_territory, move_attack.defending_territory
+                defending_occupier = move_attack.move_by_player if r.territory_conquered else occupiers[defending]
+                return self._apply(i, [(attacking, occupiers[attacking], -r.attacking_troops_lost), (defending, defending_occupier, -r.defending_troops_lost)])
+
+            case "record_banned" | "record_cancelled" | "record_winner":
+                return ((i, []), None)
+
+            case _:
+                return (None, None)
\ No newline at end of file
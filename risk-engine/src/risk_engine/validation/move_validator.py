@@ -1,5 +1,5 @@
-from collections import defaultdict
 from typing import cast
+from risk_engine.game.board_state import UNOCCUPIED
 from risk_engine.game.engine_state import EngineState
 from risk_shared.models.card_model import CardModel
 from risk_shared.queries.base_query import BaseQuery
@@ -20,6 +20,7 @@ from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
 from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
 from risk_shared.records.record_attack import RecordAttack
 from risk_shared.records.types.move_type import MoveType
+from risk_shared.rules.legal_moves import get_max_attacking_troops, is_card_set, is_legal_attack, is_legal_fortify
 
 
 class MoveValidator():
@@ -65,16 +66,23 @@ class MoveValidator():
         defending_territory = r.defending_territory
         attacking_troops = r.attacking_troops
 
-        if not attacking_territory in self.state.territories:
+        # Legal attacks are a membership test against the player's territory bitsets, the checks below only
+        # find out why an illegal attack is illegal.
+        if attacking_territory in self.state.board and defending_territory in self.state.board \
+                and is_legal_attack(self.state.map, self.state.territory_masks[player], attacking_territory, defending_territory) \
+                and 1 <= attacking_troops <= get_max_attacking_troops(self.state.board.troops[attacking_territory]):
+            return
+
+        if not attacking_territory in self.state.board:
             raise ValueError(f"No territory exists with territory_id {attacking_territory}.")
         
-        if not defending_territory in self.state.territories:
+        if not defending_territory in self.state.board:
             raise ValueError(f"No territory exists with territory_id {defending_territory}.")
         
-        if self.state.territories[attacking_territory].occupier != player:
+        if self.state.board.occupiers[attacking_territory] != player:
             raise ValueError(f"You don't occupy this territory.")
         
-        if self.state.territories[defending_territory].occupier == player:
+        if self.state.board.occupiers[defending_territory] == player:
             raise ValueError(f"You are attacking your own territory.")
         
         if not self.state.map.is_adjacent(defending_territory, attacking_territory):
@@ -83,8 +91,8 @@ class MoveValidator():
         if not 1 <= attacking_troops <= 3:
             raise ValueError(f"You must commit between 1 and 3 troops for the attack, you committed {attacking_troops}.")
         
-        if attacking_troops > self.state.territories[attacking_territory].troops - 1:
-            raise ValueError(f"You do not have enough troops, you tried to commit {attacking_troops} troops but only have {self.state.territories[attacking_territory].troops}. Remember 1 troop must remain on the attacking territory.")
+        if attacking_troops > self.state.board.troops[attacking_territory] - 1:
+            raise ValueError(f"You do not have enough troops, you tried to commit {attacking_troops} troops but only have {self.state.board.troops[attacking_territory]}. Remember 1 troop must remain on the attacking territory.")
 
 
     def _validate_move_attack_pass(self, r: MoveAttackPass, query: BaseQuery, player: int) -> None:
@@ -92,10 +100,13 @@ class MoveValidator():
 
 
     def _validate_move_claim_territory(self, r: MoveClaimTerritory, query: BaseQuery, player: int) -> None:
-        if not r.territory in self.state.territories:
+        if r.territory in self.state.board and (self.state.territory_masks[UNOCCUPIED] >> r.territory) & 1:
+            return
+
+        if not r.territory in self.state.board:
             raise ValueError(f"You tried to claim a nonexistant territory with id {r.territory}.")
         
-        if self.state.territories[r.territory].occupier != None:
+        if self.state.board.occupiers[r.territory] != UNOCCUPIED:
             raise ValueError(f"You tried to claim a territory that is already claimed.")  
 
 
@@ -107,22 +118,22 @@ class MoveValidator():
         move_attack_obj = cast(MoveAttack, self.state.recording[r.move_attack_id])
         
         defending_territory = move_attack_obj.defending_territory
-        if self.state.territories[defending_territory].occupier != r.move_by_player:
+        if self.state.board.occupiers[defending_territory] != r.move_by_player:
             raise RuntimeError("Wrong player is defending.")
 
         if not 1 <= r.defending_troops <= 2:
             raise ValueError(f"You must commit 1 or 2 troops for the defence.")
-        if self.state.territories[defending_territory].troops < r.defending_troops:
+        if self.state.board.troops[defending_territory] < r.defending_troops:
             raise ValueError(f"You tried to defend with more troops then you had occupying the defending territory.")
 
 
     def _validate_move_distribute_troops(self, r: MoveDistributeTroops, query: BaseQuery, player: int) -> None:
         query = cast(QueryDistributeTroops, query)
         for territory in r.distributions:
-            if not territory in self.state.territories:
+            if not territory in self.state.board:
                 raise ValueError(f"You tried to distribute troops to a nonexistant territory with id {territory}.")
             
-            if self.state.territories[territory].occupier != player:
+            if self.state.board.occupiers[territory] != player:
                 raise ValueError(f"You don't occupy the territory with id {territory}.")  
         
         if any(map(lambda x: x <= 0, r.distributions.values())):
@@ -144,22 +155,27 @@ class MoveValidator():
 
 
     def _validate_move_fortify(self, r: MoveFortify, query: BaseQuery, player: int) -> None:
-        if not r.source_territory in self.state.territories:
+        if r.source_territory in self.state.board and r.target_territory in self.state.board \
+                and is_legal_fortify(self.state.map, self.state.territory_masks[player], r.source_territory, r.target_territory) \
+                and 0 <= r.troop_count <= self.state.board.troops[r.source_territory] - 1:
+            return
+
+        if not r.source_territory in self.state.board:
             raise ValueError(f"Your source territory with id {r.source_territory} does not exist.")
 
-        if not r.target_territory in self.state.territories:
+        if not r.target_territory in self.state.board:
             raise ValueError(f"Your target territory with id {r.source_territory} does not exist.")
         
-        if self.state.territories[r.source_territory].occupier != player:
+        if self.state.board.occupiers[r.source_territory] != player:
             raise ValueError(f"You don't occupy the source territory.")
 
-        if self.state.territories[r.target_territory].occupier != player:
+        if self.state.board.occupiers[r.target_territory] != player:
             raise ValueError(f"You don't occupy the target territory.")
 
         if not self.state.map.is_adjacent(r.source_territory, r.target_territory):
             raise ValueError(f"Your target territory {r.target_territory} is not adjacent to your source territory {r.source_territory}.")
         
-        if not 0 <= r.troop_count <= self.state.territories[r.source_territory].troops - 1:
+        if not 0 <= r.troop_count <= self.state.board.troops[r.source_territory] - 1:
             raise ValueError(f"You tried to move {r.troop_count} troops, you must move between zero and the number of troops in the source territory, subtracting one troop which must be left behind.")
 
 
@@ -168,10 +184,10 @@ class MoveValidator():
 
 
     def _validate_move_place_initial_troop(self, r: MovePlaceInitialTroop, query: BaseQuery, player: int) -> None:
-        if not r.territory in self.state.territories:
+        if not r.territory in self.state.board:
             raise ValueError(f"You tried to claim a nonexistant territory with id {r.territory}.")
         
-        if self.state.territories[r.territory].occupier != player:
+        if self.state.board.occupiers[r.territory] != player:
             raise ValueError(f"You don't occupy this territory.")  
 
 
@@ -186,14 +202,7 @@ class MoveValidator():
                     raise ValueError(f"You tried to redeem a nonexistant card with id {i}")
             cards: list[CardModel] = [self.state.cards[i] for i in card_set]
 
-            cards_by_symbol = defaultdict(lambda: 0)
-            for card in cards:
-                cards_by_symbol[card.symbol] += 1
-
-            is_matching_set = len(cards_by_symbol) == 1 and "Wildcard" not in cards_by_symbol
-            is_one_of_each_set = len(cards_by_symbol) == 3 and "Wildcard" not in cards_by_symbol
-            is_wildcard_set = "Wildcard" in cards_by_symbol
-            if not (is_matching_set or is_one_of_each_set or is_wildcard_set):
+            if not is_card_set([card.symbol for card in cards]):
                 raise ValueError(f"You tried to redeem a set of cards {cards[0].symbol}, {cards[1].symbol}, {cards[2].symbol}, which is not a set.")
 
         def check_owns_cards(cards):
@@ -236,7 +245,7 @@ class MoveValidator():
         if not minimum_troops_moved <= r.troop_count:
             raise ValueError("You must move troops from the attacking territory to the defending territory after a successful attack, depending on how many troops were committed and how many died.")
         
-        if not r.troop_count <= self.state.territories[move_attack.attacking_territory].troops - 1:
+        if not r.troop_count <= self.state.board.troops[move_attack.attacking_territory] - 1:
             raise ValueError(f"You tried to move too many troops from territory {move_attack.attacking_territory}.")
 
 
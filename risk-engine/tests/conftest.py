@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Callable, Optional, cast
+
+import pytest
+from pydantic import RootModel
+
+from risk_engine.config.gameconfig import NUM_PLAYERS
+from risk_shared.protocol import compact
+from risk_shared.records.base_move import BaseMove
+from risk_shared.records.record_start_game import RecordStartGame
+from risk_shared.records.types.record_type import RecordType
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+
+# A submission which answers each query with the next of the moves in the file it is given, one JSON move per
+# line, opening the pipes the same way the helper does.
+SUBMISSION = """
+import os
+import sys
+
+from risk_shared.protocol.framing import FrameReader, encode_legacy_frame, write_all
+
+with open(sys.argv[1], "r") as f:
+    moves = f.read().splitlines()
+
+to_engine = os.open("./io/to_engine.pipe", os.O_WRONLY)
+from_engine = os.open("./io/from_engine.pipe", os.O_RDONLY)
+reader = FrameReader(from_engine, 1000000)
+for move in moves:
+    reader.read()
+    write_all(to_engine, encode_legacy_frame(move))
+"""
+
+RunEngine = Callable[[str, list[RecordType], list[str], dict[str, str]], tuple[subprocess.CompletedProcess, Optional[list[RecordType]]]]
+
+
+def load_recording(path: str) -> list[RecordType]:
+    with open(path, "r") as f:
+        return [compact.loads(x) for x in f]
+
+
+@pytest.fixture(scope="session")
+def recordings() -> list[list[RecordType]]:
+    """Finished games stored one compact record per line, shared by every test. They were played between
+    risk_helper.random_bot.RandomBots, which attack whenever they can, so they include card redemptions,
+    eliminations, a reshuffled deck and a winner. game_<seed>.jsonl was played by HeadlessGameEngine seeded
+    with <seed>, with the bot in seat x seeded with 5 * <seed> + x.
+    """
+    return [load_recording(f"{DATA_DIRECTORY}/{x}") for x in sorted(os.listdir(DATA_DIRECTORY))]
+
+
+@pytest.fixture
+def run_engine() -> RunEngine:
+    """Runs `python -m risk_engine` with the given arguments and environment in a new sandbox directory, the
+    same layout tournament_simulator.py sets up, against submissions which make the moves of a recording.
+    Returns the finished engine process, and the recording it wrote if it wrote one.
+    """
+    def run(directory: str, recording: list[RecordType], args: list[str], env: dict[str, str]):
+        os.makedirs(f"{directory}/input")
+        os.makedirs(f"{directory}/output")
+        with open(f"{directory}/input/catalog.json", "w") as f:
+            f.write(json.dumps([{ "team_id": x.team_id } for x in cast(RecordStartGame, recording[0]).players]))
+
+        submissions = []
+        try:
+            for player in range(NUM_PLAYERS):
+                submission = f"{directory}/submission{player}"
+                os.makedirs(f"{submission}/io")
+                os.mkfifo(f"{submission}/io/to_engine.pipe")
+                os.mkfifo(f"{submission}/io/from_engine.pipe")
+                with open(f"{submission}/submission.py", "w") as f:
+                    f.write(SUBMISSION)
+                with open(f"{submission}/moves.jsonl", "w") as f:
+                    f.write("\n".join([x.model_dump_json() for x in recording if isinstance(x, BaseMove) and x.move_by_player == player]))
+                submissions.append(subprocess.Popen([sys.executable, "submission.py", "moves.jsonl"], cwd=submission, stderr=subprocess.DEVNULL))
+
+            engine = subprocess.run([sys.executable, "-m", "risk_engine", *args], cwd=directory, env=dict(os.environ, GAME_ENGINE_CORE_DIRECTORY=directory, **env), capture_output=True, text=True, timeout=600)
+        finally:
+            for submission in submissions:
+                submission.kill()
+                submission.wait()
+
+        if not os.path.exists(f"{directory}/output/game.json"):
+            return engine, None
+        with open(f"{directory}/output/game.json", "r") as f:
+            return engine, RootModel[list[RecordType]].model_validate_json(f.read()).root
+
+    return run
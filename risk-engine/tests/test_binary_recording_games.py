@@ -0,0 +1,15 @@
+from risk_engine.output.recording_inspector import RecordingInspector
+from risk_shared.output.binary_recording import BinaryRecording
+from risk_shared.records.record_start_turn import RecordStartTurn
+
+
+def test_round_trip_games(recordings):
+    for recording in recordings:
+        binary_recording = BinaryRecording(RecordingInspector(recording).get_recording_binary())
+        assert list(binary_recording) == recording
+
+        turns = [i for i, x in enumerate(recording) if isinstance(x, RecordStartTurn)]
+        assert binary_recording.turn_count == len(turns)
+        for turn in [0, len(turns) // 2, len(turns) - 1]:
+            end = turns[turn + 1] if turn + 1 < len(turns) else len(recording)
+            assert binary_recording.get_turn(turn) == recording[turns[turn]:end]
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+from typing import cast
+
+import pytest
+
+from risk_shared.records.record_start_game import RecordStartGame
+
+
+@pytest.mark.parametrize("args, env, error", [
+    (["--seed"], {}, "--seed is missing its value."),
+    (["--seed", "abc"], {}, "--seed must be an integer, got \"abc\"."),
+    ([], { "GAME_ENGINE_SEED": "1.5" }, "GAME_ENGINE_SEED must be an integer, got \"1.5\"."),
+])
+def test_bad_seed_prints_usage(tmp_path, args, env, error):
+    engine = subprocess.run([sys.executable, "-m", "risk_engine", *args], cwd=tmp_path, env=dict(os.environ, GAME_ENGINE_CORE_DIRECTORY=str(tmp_path), **env), capture_output=True, text=True, timeout=60)
+    assert engine.returncode == 2
+    assert engine.stderr.startswith(f"{error}\nUsage: python3 -m risk_engine")
+
+
+def test_same_seed_gives_same_recording(recordings, run_engine, tmp_path):
+    # The submissions make the same moves, so the engine must roll the same dice and shuffle the same deck for
+    # both games to finish with the same recording, whichever way the seed is given.
+    recording = recordings[0]
+    seed = str(cast(RecordStartGame, recording[0]).seed)
+
+    engine, from_argument = run_engine(f"{tmp_path}/argument", recording, ["--seed", seed], {})
+    assert engine.returncode == 0, engine.stderr
+    engine, from_environment = run_engine(f"{tmp_path}/environment", recording, [], { "GAME_ENGINE_SEED": seed })
+    assert engine.returncode == 0, engine.stderr
+
+    assert from_argument == from_environment == recording
+
+
+def test_seed_argument_overrides_environment(recordings, run_engine, tmp_path):
+    recording = recordings[0]
+    seed = str(cast(RecordStartGame, recording[0]).seed)
+    engine, from_argument = run_engine(str(tmp_path), recording, ["--seed", seed], { "GAME_ENGINE_SEED": "not a seed" })
+    assert engine.returncode == 0, engine.stderr
+    assert from_argument == recording
@@ -0,0 +1,42 @@
+from typing import cast
+
+from risk_engine.config.gameconfig import NUM_PLAYERS
+from risk_engine.headless_engine import HeadlessGameEngine
+from risk_shared.queries.query_type import QueryType
+from risk_shared.records.base_move import BaseMove
+from risk_shared.records.record_start_game import RecordStartGame
+from risk_shared.records.types.move_type import MoveType
+from risk_shared.records.types.record_type import RecordType
+
+
+class RecordedBot():
+    """Answers each query with the next of a player's moves from a recording.
+    """
+
+    def __init__(self, recording: list[RecordType], player: int):
+        self.moves = iter([x for x in recording if isinstance(x, BaseMove) and x.move_by_player == player])
+
+
+    def __call__(self, query: QueryType) -> MoveType:
+        return cast(MoveType, next(self.moves))
+
+
+def get_seed(recording: list[RecordType]) -> int:
+    return cast(int, cast(RecordStartGame, recording[0]).seed)
+
+
+def test_headless_engine_replays_recording(recordings):
+    # The engine's dice and shuffles come from its seed, so the same moves give the same game.
+    for recording in recordings:
+        engine = HeadlessGameEngine([RecordedBot(recording, x) for x in range(NUM_PLAYERS)], seed=get_seed(recording))
+        engine.start()
+        assert engine.state.recording == recording
+
+
+def test_pipe_engine_matches_headless_engine(recordings, run_engine, tmp_path):
+    # The recordings were played by the headless engine, so the engine talking to submissions over the FIFO
+    # pipes must record the same game when its submissions make the same moves.
+    recording = recordings[0]
+    engine, pipe_recording = run_engine(str(tmp_path), recording, ["--seed", str(get_seed(recording))], {})
+    assert engine.returncode == 0, engine.stderr
+    assert pipe_recording == recording
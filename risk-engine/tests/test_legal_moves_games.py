@@ -0,0 +1,62 @@
+import itertools
+from typing import Any, cast
+
+from risk_engine.game.board_state import UNOCCUPIED
+from risk_engine.game.engine_state import EngineState
+from risk_engine.game.state_checkpoints import replay
+from risk_engine.validation.move_validator import MoveValidator
+from risk_shared.maps.map import territories_to_mask
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
+from risk_shared.records.moves.move_fortify import MoveFortify
+from risk_shared.rules import legal_moves
+
+# The validator is asked about every pair of territories, so only every INTERVAL-th state is checked.
+INTERVAL = 499
+
+
+def is_accepted(validator: MoveValidator, move: Any, player: int) -> bool:
+    try:
+        validator.validate(move, cast(Any, None), player)
+        return True
+    except ValueError:
+        return False
+
+
+def get_brute_force_attacks(state: EngineState, player: int) -> set[tuple[int, int]]:
+    board = state.board
+    return set([(x, y) for x in board.territory_ids for y in state.map.get_adjacent_to(x)
+                if board.occupiers[x] == player and board.troops[x] >= 2 and board.occupiers[y] != player])
+
+
+def get_brute_force_fortifies(state: EngineState, player: int) -> set[tuple[int, int]]:
+    board = state.board
+    return set([(x, y) for x in board.territory_ids for y in state.map.get_adjacent_to(x)
+                if board.occupiers[x] == player and board.troops[x] >= 2 and board.occupiers[y] == player])
+
+
+def test_legal_moves_match_validator(recordings):
+    for recording in recordings:
+        for i, state in enumerate(replay(recording)):
+            if i % INTERVAL != 0:
+                continue
+
+            validator = MoveValidator(state)
+            territories = list(state.board.territory_ids)
+            movable_mask = territories_to_mask([x for x in territories if state.board.troops[x] >= 2])
+            for player in state.players.keys():
+                attacks = get_brute_force_attacks(state, player)
+                fortifies = get_brute_force_fortifies(state, player)
+                assert set(legal_moves.get_legal_attacks(state.map, state.territory_masks[player], movable_mask)) == attacks
+                assert set(legal_moves.get_legal_fortifies(state.map, state.territory_masks[player], movable_mask)) == fortifies
+
+                for x, y in itertools.product(territories, repeat=2):
+                    attack = MoveAttack(move_by_player=player, attacking_territory=x, defending_territory=y, attacking_troops=1)
+                    assert is_accepted(validator, attack, player) == ((x, y) in attacks), f"Attack {x} -> {y} after record {i}."
+                    fortify = MoveFortify(move_by_player=player, source_territory=x, target_territory=y, troop_count=1)
+                    assert is_accepted(validator, fortify, player) == ((x, y) in fortifies), f"Fortify {x} -> {y} after record {i}."
+
+                claims = legal_moves.get_legal_claims(state.territory_masks[UNOCCUPIED])
+                assert claims == sorted([x for x in territories if state.board.occupiers[x] == UNOCCUPIED])
+                for x in territories:
+                    assert is_accepted(validator, MoveClaimTerritory(move_by_player=player, territory=x), player) == (x in claims)
@@ -0,0 +1,37 @@
+import pytest
+from pydantic import ValidationError
+
+from risk_engine.connection.player_connection import load_move
+from risk_engine.exceptions import InvalidMessageException
+from risk_shared.protocol.framing import ENCODING_COMPACT, ENCODING_JSON
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_attack_pass import MoveAttackPass
+
+
+def test_compact_move():
+    move = load_move('["ma",1,2,3,3]', ENCODING_COMPACT, (MoveAttack, MoveAttackPass), 1)
+    assert move == MoveAttack(move_by_player=1, attacking_territory=2, defending_territory=3, attacking_troops=3)
+
+
+def test_compact_unexpected_move():
+    with pytest.raises(InvalidMessageException):
+        load_move('["map",1]', ENCODING_COMPACT, (MoveAttack,), 1)
+
+
+@pytest.mark.parametrize("data", [
+    '["ma",' + "[" * 900 + "]" * 900 + ",1,2,3]",
+    "[" * 5000 + "]" * 5000,
+    "not json",
+], ids=["nested_field", "nested_list", "not_json"])
+def test_compact_hostile_move(data: str):
+    with pytest.raises(InvalidMessageException):
+        load_move(data, ENCODING_COMPACT, (MoveAttack, MoveAttackPass), 1)
+
+
+@pytest.mark.parametrize("data", [
+    '{"record_type":"move_attack",' + '"x":' * 900 + "0" + "}" * 901,
+    "[" * 5000 + "]" * 5000,
+], ids=["nested_object", "nested_list"])
+def test_json_hostile_move(data: str):
+    with pytest.raises(ValidationError):
+        load_move(data, ENCODING_JSON, (MoveAttack, MoveAttackPass), 1)
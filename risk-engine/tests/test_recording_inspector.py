@@ -0,0 +1,39 @@
+import json
+from typing import cast
+
+from risk_engine.output.game_result import GameSuccessResult
+from risk_engine.output.recording_inspector import RecordingInspector
+from risk_engine.output.recording_writer import RecordingWriter
+from risk_shared.records.record_player_eliminated import RecordPlayerEliminated
+from risk_shared.records.record_winner import RecordWinner
+
+
+def test_get_output_matches_individual_outputs(recordings):
+    for recording in recordings:
+        inspector = RecordingInspector(recording)
+        result, recording_json, forwards, backwards = inspector.get_output()
+
+        assert result == inspector.get_result()
+        assert recording_json == inspector.get_recording_json()
+        assert (forwards, backwards) == inspector.get_visualiser_forwards_backwards_differential_json()
+
+
+def test_get_output_matches_streamed_output(recordings, tmp_path):
+    for recording in recordings:
+        writer = RecordingWriter(str(tmp_path), recording)
+        for i, record in enumerate(recording):
+            writer.write(i, record)
+        writer.close()
+
+        _, recording_json, forwards, backwards = RecordingInspector(recording).get_output()
+        assert json.loads((tmp_path / "game.json").read_text()) == json.loads(recording_json)
+        assert json.loads((tmp_path / "visualiser_forwards_differential.json").read_text()) == json.loads(forwards)
+        assert json.loads((tmp_path / "visualiser_backwards_differential.json").read_text()) == json.loads(backwards)
+
+
+def test_get_output_ranking(recordings):
+    for recording in recordings:
+        result, _, _, _ = RecordingInspector(recording).get_output()
+        eliminated = [x.player for x in recording if isinstance(x, RecordPlayerEliminated)]
+        assert isinstance(result, GameSuccessResult)
+        assert result.ranking == [cast(RecordWinner, recording[-1]).player] + eliminated[::-1]
@@ -0,0 +1,48 @@
+from typing import Any
+
+import pytest
+
+from risk_engine.game.engine_state import EngineState
+from risk_engine.game.state_checkpoints import StateCheckpoints, replay
+
+
+def get_fields(state: EngineState) -> dict[str, Any]:
+    # Every field rather than just the snapshot, so a field missing from snapshots shows up as a difference.
+    # The map and zobrist keys don't compare by value, and are never changed.
+    fields = dict([(x, y) for x, y in vars(state).items() if x not in ("map", "zobrist_keys")])
+    fields["random"] = state.random.getstate()
+    fields["board"] = (state.board.troops, state.board.occupiers)
+    return fields
+
+
+def test_checkpoints_match_full_replay(recordings):
+    for recording in recordings:
+        checkpoints = StateCheckpoints(recording)
+        interval = checkpoints.interval
+        for i, state in enumerate(replay(recording)):
+            # Every record just before and at a checkpoint, and a spread of records in between.
+            if i % interval in (0, 1, interval - 1) or i % 31 == 0 or i == len(recording) - 1:
+                assert get_fields(checkpoints.get_state(i)) == get_fields(state), f"State after record {i} differs."
+
+
+def test_restore_is_independent_of_snapshot():
+    state = EngineState(catalog=[{ "team_id": x } for x in range(5)], seed=0)
+    snapshot = state.snapshot()
+    assert "map" not in snapshot and "recording" not in snapshot
+
+    state.restore(snapshot)
+    state.board.troops[0] = 7
+    state.players[0].troops_remaining = 0
+
+    restored = EngineState(catalog=[{ "team_id": x } for x in range(5)], seed=0)
+    restored.restore(snapshot)
+    assert restored.board.troops[0] == 0
+    assert restored.players[0].troops_remaining != 0
+
+
+def test_get_state_out_of_range(recordings):
+    checkpoints = StateCheckpoints(recordings[0], interval=100)
+    with pytest.raises(IndexError):
+        checkpoints.get_state(len(recordings[0]))
+    with pytest.raises(IndexError):
+        checkpoints.get_state(-1)
@@ -0,0 +1,8 @@
+from risk_engine.game.state_checkpoints import replay
+
+
+def test_incremental_hash_matches_full_hash(recordings):
+    for recording in recordings:
+        for i, state in enumerate(replay(recording)):
+            full_hash = state.zobrist_keys.hash([(x, state.board.occupiers[x], state.board.troops[x]) for x in state.board.territory_ids])
+            assert state.zobrist_hash == full_hash, f"Hash differs after record {i}."
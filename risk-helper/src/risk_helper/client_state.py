@@ -1,10 +1,13 @@
 from collections import defaultdict
 from typing import Optional, Tuple, Union
 from risk_shared.maps import earth
+from risk_shared.maps.map import mask_to_territories, territories_to_mask
+from risk_shared.maps.zobrist import ZobristKeys
 from risk_shared.models.card_model import CardModel
 from risk_shared.models.player_model import PlayerModel, PublicPlayerModel
 from risk_shared.models.territory_model import TerritoryModel
 from risk_shared.records.types.record_type import RecordType
+from risk_shared.rules import legal_moves
 
 
 class ClientState():
@@ -22,6 +25,67 @@ class ClientState():
         self.new_records: int = 0
         self.me: PlayerModel
 
+        # Territory ownership as int bitsets (bit v is set if territory v is in the set), maintained by the
+        # StateMutator whenever a territory changes occupier. Unclaimed territories are kept under None.
+        self.all_territories_mask: int = territories_to_mask(self.map.get_vertices())
+        self.territory_masks: dict[Optional[int], int] = defaultdict(int)
+        self.territory_masks[None] = self.all_territories_mask
+
+        # Zobrist hash of every territory's occupier and troops, maintained by the StateMutator, to identify
+        # positions e.g. in a TranspositionTable.
+        self.zobrist_keys: ZobristKeys = self.map.get_zobrist_keys()
+        self.zobrist_hash: int = self.zobrist_keys.hash([(x.territory_id, x.occupier, x.troops) for x in self.territories.values()])
+
+        # Total troops on the territories of each player, maintained by the StateMutator.
+        self.troop_totals: dict[Optional[int], int] = defaultdict(int)
+
+        # Derived views which are computed on first use and then kept until the StateMutator changes the
+        # occupier of a territory they depend on, see territory_occupier_changed.
+        self._owned_cache: dict[Optional[int], list[int]] = {}
+        self._border_mask_cache: dict[int, int] = {}
+        self._frontier_mask_cache: dict[int, int] = {}
+        self._continents_held_cache: dict[int, list[int]] = {}
+
+
+    def fork(self) -> "ClientState":
+        """A copy of the state which can be mutated independently, e.g. to search hypothetical moves. Only the
+        mutable parts of the state are copied, the map, cards and past records are shared with this state.
+        """
+        fork = ClientState.__new__(ClientState)
+        fork.__dict__.update(self.__dict__)
+
+        fork.discarded_deck = list(self.discarded_deck)
+        fork.players = dict([(x, y.model_copy()) for x, y in self.players.items()])
+        fork.territories = dict([(x, y.model_copy()) for x, y in self.territories.items()])
+        fork.turn_order = list(self.turn_order)
+        fork.recording = list(self.recording)
+        if hasattr(self, "me"):
+            fork.me = self.me.model_copy()
+
+        fork.territory_masks = self.territory_masks.copy()
+        fork.troop_totals = self.troop_totals.copy()
+        fork._owned_cache = dict(self._owned_cache)
+        fork._border_mask_cache = dict(self._border_mask_cache)
+        fork._frontier_mask_cache = dict(self._frontier_mask_cache)
+        fork._continents_held_cache = dict(self._continents_held_cache)
+        return fork
+
+
+    def territory_occupier_changed(self, territory: int, previous_occupier: Optional[int], occupier: Optional[int]) -> None:
+        """Invalidates the derived views which depend on the occupier of `territory`, called by the StateMutator
+        after it has updated the ownership bitsets.
+        """
+        for player in [previous_occupier, occupier]:
+            self._owned_cache.pop(player, None)
+            if player is not None:
+                self._continents_held_cache.pop(player, None)
+
+        # A player's border and frontier can only change if they own the territory or one of its neighbours.
+        region = (1 << territory) | self.map.get_adjacent_mask(territory)
+        for cache in [self._border_mask_cache, self._frontier_mask_cache]:
+            for player in [x for x in cache.keys() if self.territory_masks[x] & region or x == previous_occupier]:
+                del cache[player]
+
 
     def get_card_set(self, cards: list[CardModel]) -> Optional[Tuple[CardModel, CardModel, CardModel]]:
         cards_by_symbol: dict[str, list[CardModel]] = defaultdict(list)
@@ -50,16 +114,92 @@ class ClientState():
 
 
     def get_territories_owned_by(self, player: Union[int, None]) -> list[int]:
-        return list([y.territory_id for y in filter(lambda x: x.occupier == player, self.territories.values())])
+        if player not in self._owned_cache:
+            self._owned_cache[player] = mask_to_territories(self.territory_masks[player])
+        return list(self._owned_cache[player])
+
+
+    def get_territories_owned_mask(self, player: Union[int, None]) -> int:
+        return self.territory_masks[player]
+
+
+    def get_border_mask(self, player: int) -> int:
+        """The territories owned by the player which are adjacent to a territory they don't own.
+        """
+        if player not in self._border_mask_cache:
+            owned = self.territory_masks[player]
+            self._border_mask_cache[player] = owned & self.map.get_neighbours_mask(self.all_territories_mask & ~owned)
+        return self._border_mask_cache[player]
+
+
+    def get_border_territories(self, player: int) -> list[int]:
+        return mask_to_territories(self.get_border_mask(player))
+
+
+    def get_frontier_mask(self, player: int) -> int:
+        """The territories the player doesn't own which are adjacent to a territory they do own.
+        """
+        if player not in self._frontier_mask_cache:
+            owned = self.territory_masks[player]
+            self._frontier_mask_cache[player] = self.map.get_neighbours_mask(owned) & ~owned
+        return self._frontier_mask_cache[player]
+
+
+    def get_continents_held(self, player: int) -> list[int]:
+        if player not in self._continents_held_cache:
+            owned = self.territory_masks[player]
+            self._continents_held_cache[player] = [continent for continent in self.map.get_continents().keys() if self.map.get_continent_mask(continent) & ~owned == 0]
+        return list(self._continents_held_cache[player])
+
+
+    def get_movable_mask(self, player: int) -> int:
+        """The territories owned by the player with at least 2 troops, i.e. which can attack or fortify.
+        """
+        return territories_to_mask([x for x in self.get_territories_owned_by(player) if self.territories[x].troops >= 2])
+
+
+    def get_legal_attacks(self, player: int) -> list[Tuple[int, int]]:
+        """Every (attacking_territory, defending_territory) pair the player can attack with.
+        """
+        return legal_moves.get_legal_attacks(self.map, self.territory_masks[player], self.get_movable_mask(player))
+
+
+    def get_legal_fortifies(self, player: int) -> list[Tuple[int, int]]:
+        """Every (source_territory, target_territory) pair the player can move troops between.
+        """
+        return legal_moves.get_legal_fortifies(self.map, self.territory_masks[player], self.get_movable_mask(player))
+
+
+    def get_legal_claims(self) -> list[int]:
+        return legal_moves.get_legal_claims(self.territory_masks[None])
+
+
+    def get_card_sets(self, cards: list[CardModel]) -> list[Tuple[CardModel, CardModel, CardModel]]:
+        """Every set of three of the cards which can be redeemed, unlike get_card_set which picks one.
+        """
+        return legal_moves.get_card_sets(cards)
+
+
+    def get_troops_total(self, player: int) -> int:
+        """The total number of troops on the territories the player occupies.
+        """
+        return self.troop_totals[player]
+
+
+    def get_continent_territory_count(self, player: int, continent: int) -> int:
+        """The number of territories in the continent owned by the player.
+        """
+        return (self.territory_masks[player] & self.map.get_continent_mask(continent)).bit_count()
     
     
     def get_all_border_territories(self, territories: list) -> list[int]:
-        return [territory for territory in territories if len(set(self.map.get_adjacent_to(territory)) - set(territories)) != 0]
+        territories_set = set(territories)
+        return [territory for territory in territories if not self.map.get_adjacent_set(territory) <= territories_set]
 
 
     def get_all_adjacent_territories(self, territories: list[int]) -> list[int]:
-        result = []
+        result: set[int] = set()
         for territory in territories:
-            result.extend(self.map.get_adjacent_to(territory))
+            result.update(self.map.get_adjacent_set(territory))
 
-        return list(set(result) - set(territories))
+        return list(result - set(territories))
@@ -1,55 +1,76 @@
-import math
+import os
 
-from pydantic import Field, RootModel, TypeAdapter
+from pydantic import BaseModel, Field, RootModel, TypeAdapter
+from risk_shared.protocol import compact
+from risk_shared.protocol.framing import ENCODING_COMPACT, ENCODING_JSON, PROTOCOL_FIELD, PROTOCOL_VERSION, FrameReader, FramingError, encode_binary_frame, encode_legacy_frame, write_all
+from risk_shared.queries.base_query import BaseQuery
 from risk_shared.queries.query_type import QueryType
 from risk_shared.records.types.move_type import MoveType
 
 MAX_CHARACTERS_READ = 1000000
-READ_CHUNK_SIZE = 1024
 
 class DiscriminatedTypeAdapter(RootModel):
     root: QueryType = Field(discriminator="query_type")
 
+class ProtocolAdvertisement(BaseModel):
+    version: int = Field(default=0, alias=PROTOCOL_FIELD)
+
 class Connection():
 
-    def __init__(self):
-        self._to_engine_pipe = open(f"./io/to_engine.pipe", "w")
-        self._from_engine_pipe = open(f"./io/from_engine.pipe", "r")
+    def __init__(self, binary_framing: bool = True, compact_encoding: bool = True):
+        self._to_engine_fd = os.open(f"./io/to_engine.pipe", os.O_WRONLY)
+        self._from_engine_fd = os.open(f"./io/from_engine.pipe", os.O_RDONLY)
+        self._reader = FrameReader(self._from_engine_fd, MAX_CHARACTERS_READ)
+
+        # We start in the legacy framing and JSON, and only switch to binary framing (and the compact encoding,
+        # which needs binary framing) if the engine's first query advertises that it understands them. Our
+        # first binary framed move then tells the engine to reply with binary framing too, and the engine
+        # replies in the encoding of our last move.
+        self._allow_binary_framing = binary_framing
+        self._allow_compact_encoding = binary_framing and compact_encoding
+        self._negotiated = False
+        self._binary_framing = False
+        self._encoding = ENCODING_JSON
 
     
     def _send(self, data: str) -> None:
-        self._to_engine_pipe.write(str(len(data)) + ",")
-        self._to_engine_pipe.write(data)
-        self._to_engine_pipe.flush()
+        if self._binary_framing:
+            write_all(self._to_engine_fd, encode_binary_frame(data.encode(), self._encoding))
+        else:
+            write_all(self._to_engine_fd, encode_legacy_frame(data))
 
     
-    def _receive(self) -> str:
-        
-        # Read size of message.
-        buffer = bytearray()
-        while len(buffer) < math.floor(math.log10(MAX_CHARACTERS_READ)) + 1 and (len(buffer) == 0 or buffer[-1] != ord(",")):
-            buffer.extend(self._from_engine_pipe.read(1).encode())
-
-        if buffer[-1] == ord(","):
-            size = int(buffer[0:-1].decode())
-        else:
-            print(buffer)
-            raise RuntimeError("Please send us a discord message with this error log.")
-        
-        if size > MAX_CHARACTERS_READ:
+    def _receive(self) -> tuple[int, str]:
+        try:
+            _, encoding, data = self._reader.read()
+        except (FramingError, EOFError):
             raise RuntimeError("Please send us a discord message with this error log.")
-        
-        # Read message.
-        buffer = bytearray()
-        while len(buffer) < size:
-            buffer.extend(bytearray(self._from_engine_pipe.read(min((size - len(buffer)), READ_CHUNK_SIZE)).encode()))
 
-        return buffer.decode()
+        return (encoding, data.decode())
     
 
     def get_next_query(self) -> QueryType:
-        return DiscriminatedTypeAdapter.model_validate_json(self._receive()).root
+        encoding, data = self._receive()
+        if encoding == ENCODING_COMPACT:
+            query = compact.loads(data)
+            if not isinstance(query, BaseQuery):
+                raise RuntimeError("Please send us a discord message with this error log.")
+            return query # type: ignore
+
+        if not self._negotiated:
+            self._negotiate(data)
+        return DiscriminatedTypeAdapter.model_validate_json(data).root
+
+
+    def _negotiate(self, data: str) -> None:
+        self._negotiated = True
+        if ProtocolAdvertisement.model_validate_json(data).version >= PROTOCOL_VERSION:
+            self._binary_framing = self._allow_binary_framing
+            self._encoding = ENCODING_COMPACT if self._allow_compact_encoding else ENCODING_JSON
 
 
     def send_move(self, move: MoveType):
-        self._send(move.model_dump_json())
\ No newline at end of file
+        if self._encoding == ENCODING_COMPACT:
+            self._send(compact.dumps(move))
+        else:
+            self._send(move.model_dump_json())
@@ -0,0 +1,113 @@
+import random
+from typing import Any, cast
+
+from risk_helper.client_state import ClientState
+from risk_helper.connection import Connection
+from risk_helper.state_mutator import StateMutator
+from risk_shared.queries.query_attack import QueryAttack
+from risk_shared.queries.query_claim_territory import QueryClaimTerritory
+from risk_shared.queries.query_defend import QueryDefend
+from risk_shared.queries.query_distribute_troops import QueryDistributeTroops
+from risk_shared.queries.query_fortify import QueryFortify
+from risk_shared.queries.query_place_initial_troop import QueryPlaceInitialTroop
+from risk_shared.queries.query_redeem_cards import QueryRedeemCards
+from risk_shared.queries.query_troops_after_attack import QueryTroopsAfterAttack
+from risk_shared.queries.query_type import QueryType
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_attack_pass import MoveAttackPass
+from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
+from risk_shared.records.moves.move_defend import MoveDefend
+from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
+from risk_shared.records.moves.move_fortify import MoveFortify
+from risk_shared.records.moves.move_fortify_pass import MoveFortifyPass
+from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
+from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
+from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
+from risk_shared.records.types.move_type import MoveType
+
+
+class RandomBot():
+    """Plays random legal moves from its own ClientState, attacking whenever it can, so games have eliminations
+    and usually a winner. It is seeded, so games between RandomBots are reproducible, e.g. for tests and
+    benchmarks. It is called with each query and returns its move, so it can be played in the engine's process
+    by risk_engine.headless_engine, or as a submission with main().
+    """
+
+    def __init__(self, seed: int):
+        self.state = ClientState()
+        self.mutator = StateMutator(self.state)
+        self.rng = random.Random(seed)
+
+
+    def __call__(self, query: QueryType) -> MoveType:
+        for i, record in query.update.items():
+            self.mutator.commit(i, record)
+
+        state = self.state
+        me = state.me.player_id
+        owned = state.get_territories_owned_by(me)
+
+        match query:
+            case QueryClaimTerritory():
+                return MoveClaimTerritory(move_by_player=me, territory=self.rng.choice(state.get_legal_claims()))
+
+            case QueryPlaceInitialTroop():
+                return MovePlaceInitialTroop(move_by_player=me, territory=self.rng.choice(owned))
+
+            case QueryRedeemCards() as q:
+                # Only redeem what we have to, which is down to four cards after eliminating a player.
+                sets = []
+                cards = list(state.me.cards)
+                while len(cards) >= (5 if q.cause == "player_eliminated" else 3):
+                    card_sets = state.get_card_sets(cards)
+                    if len(card_sets) == 0:
+                        break
+                    sets.append(tuple([x.card_id for x in card_sets[0]]))
+                    cards = [x for x in cards if x not in card_sets[0]]
+                return MoveRedeemCards(move_by_player=me, cause=q.cause, sets=sets)
+
+            case QueryDistributeTroops() as q:
+                bonus = state.me.must_place_territory_bonus
+                territory = bonus[0] if len(bonus) > 0 else self._get_frontline(owned)
+                return MoveDistributeTroops(move_by_player=me, cause=q.cause, distributions={ territory: state.me.troops_remaining })
+
+            case QueryAttack():
+                attacks = state.get_legal_attacks(me)
+                if len(attacks) == 0:
+                    return MoveAttackPass(move_by_player=me)
+                attacking_territory, defending_territory = max(attacks, key=lambda x: (state.territories[x[0]].troops, self.rng.random()))
+                return MoveAttack(move_by_player=me, attacking_territory=attacking_territory, defending_territory=defending_territory, attacking_troops=min(3, state.territories[attacking_territory].troops - 1))
+
+            case QueryTroopsAfterAttack() as q:
+                move_attack = cast(MoveAttack, state.recording[cast(Any, state.recording[q.record_attack_id]).move_attack_id])
+                return MoveTroopsAfterAttack(move_by_player=me, record_attack_id=q.record_attack_id, troop_count=state.territories[move_attack.attacking_territory].troops - 1)
+
+            case QueryDefend() as q:
+                move_attack = cast(MoveAttack, state.recording[q.move_attack_id])
+                return MoveDefend(move_by_player=me, move_attack_id=q.move_attack_id, defending_troops=min(2, state.territories[move_attack.defending_territory].troops))
+
+            case QueryFortify():
+                fortifies = state.get_legal_fortifies(me)
+                if len(fortifies) == 0 or self.rng.random() < 0.5:
+                    return MoveFortifyPass(move_by_player=me)
+                source_territory, target_territory = self.rng.choice(fortifies)
+                return MoveFortify(move_by_player=me, source_territory=source_territory, target_territory=target_territory, troop_count=state.territories[source_territory].troops - 1)
+
+            case _:
+                raise ValueError(f"RandomBot can't answer a {type(query).__name__}.")
+
+
+    def _get_frontline(self, owned: list[int]) -> int:
+        # Stack every troop on the strongest territory that borders an enemy, so attacks snowball.
+        me = self.state.me.player_id
+        frontline = [x for x in owned if any(self.state.territories[y].occupier != me for y in self.state.map.get_adjacent_to(x))]
+        return max(frontline or owned, key=lambda x: (self.state.territories[x].troops, self.rng.random()))
+
+
+def main(seed: int):
+    """Plays a RandomBot as a submission, over the engine's pipes.
+    """
+    connection = Connection()
+    bot = RandomBot(seed)
+    while True:
+        connection.send_move(bot(connection.get_next_query()))
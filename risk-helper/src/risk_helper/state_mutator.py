@@ -1,5 +1,6 @@
-from typing import TypeGuard, cast
+from typing import Any, Optional, TypeGuard, cast
 from risk_helper.client_state import ClientState
+from risk_shared.maps.map import mask_to_territories
 from risk_shared.records.moves.move_attack import MoveAttack
 from risk_shared.records.moves.move_attack_pass import MoveAttackPass
 from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
@@ -23,11 +24,87 @@ from risk_shared.records.record_winner import RecordWinner
 from risk_shared.records.types.record_type import RecordType
 
 
+# Undo log entries, see StateMutator.apply.
+_UNDO_RECORD = 0
+_UNDO_ATTRIBUTE = 1
+_UNDO_OCCUPIER = 2
+_UNDO_TROOPS = 3
+
+
 class StateMutator():
 
     def __init__(self, state: ClientState):
         self.state = state
 
+        # While records applied with `apply` are outstanding, every change to the state is logged with enough
+        # information to reverse it, so search can explore hypothetical moves without copying the state.
+        self._undo_log: list[tuple] = []
+        self._applied_count: int = 0
+
+
+    def apply(self, record: RecordType) -> None:
+        """Commits a hypothetical record, which can later be reverted with `undo`. Applies can be nested, and
+        are undone in the reverse order.
+        """
+        self._undo_log.append((_UNDO_RECORD,))
+        self._applied_count += 1
+        self.commit(len(self.state.recording), record)
+
+
+    def undo(self) -> None:
+        """Reverts the most recent `apply`.
+        """
+        if self._applied_count == 0:
+            raise RuntimeError("There is no applied record to undo.")
+
+        # The reversing changes are made with logging turned off.
+        applied_count = self._applied_count
+        self._applied_count = 0
+        while True:
+            entry = self._undo_log.pop()
+            if entry[0] == _UNDO_RECORD:
+                self.state.recording.pop()
+                break
+            elif entry[0] == _UNDO_ATTRIBUTE:
+                setattr(entry[1], entry[2], entry[3])
+            elif entry[0] == _UNDO_OCCUPIER:
+                self._set_occupier(entry[1], entry[2])
+            elif entry[0] == _UNDO_TROOPS:
+                self._add_troops(entry[1], -entry[2])
+        self._applied_count = applied_count - 1
+
+
+    def _set(self, obj: Any, attribute: str, value: Any) -> None:
+        if self._applied_count > 0:
+            self._undo_log.append((_UNDO_ATTRIBUTE, obj, attribute, getattr(obj, attribute)))
+        setattr(obj, attribute, value)
+
+
+    def _set_occupier(self, territory: int, player: Optional[int]) -> None:
+        territory_model = self.state.territories[territory]
+        previous_occupier = territory_model.occupier
+        bit = 1 << territory
+        self.state.territory_masks[previous_occupier] &= ~bit
+        self.state.territory_masks[player] |= bit
+        self.state.troop_totals[previous_occupier] -= territory_model.troops
+        self.state.troop_totals[player] += territory_model.troops
+        territory_model.occupier = player
+        self.state.zobrist_hash ^= self.state.zobrist_keys.get_occupier_change(territory, previous_occupier, player)
+        self.state.territory_occupier_changed(territory, previous_occupier, player)
+
+        if self._applied_count > 0:
+            self._undo_log.append((_UNDO_OCCUPIER, territory, previous_occupier))
+
+
+    def _add_troops(self, territory: int, troops: int) -> None:
+        territory_model = self.state.territories[territory]
+        territory_model.troops += troops
+        self.state.troop_totals[territory_model.occupier] += troops
+        self.state.zobrist_hash ^= self.state.zobrist_keys.get_troops_change(territory, territory_model.troops - troops, territory_model.troops)
+
+        if self._applied_count > 0:
+            self._undo_log.append((_UNDO_TROOPS, territory, troops))
+
 
     def commit(self, i: int, record: RecordType):
         if i != len(self.state.recording):
@@ -86,9 +163,9 @@ class StateMutator():
     
     def _update_public_player_model_to_me(self) -> None:
         player_id = self.state.me.player_id
-        self.state.me.alive = self.state.players[player_id].alive
-        self.state.me.troops_remaining = self.state.players[player_id].troops_remaining
-        self.state.me.must_place_territory_bonus = self.state.players[player_id].must_place_territory_bonus
+        self._set(self.state.me, "alive", self.state.players[player_id].alive)
+        self._set(self.state.me, "troops_remaining", self.state.players[player_id].troops_remaining)
+        self._set(self.state.me, "must_place_territory_bonus", self.state.players[player_id].must_place_territory_bonus)
             
 
     def _commit_move_attack(self, r: MoveAttack) -> None:
@@ -102,13 +179,12 @@ class StateMutator():
     def _commit_move_claim_territory(self, r: MoveClaimTerritory) -> None:
         player = self.state.players[r.move_by_player]
         
-        claimed_territory = self.state.territories[r.territory]
-        claimed_territory.occupier = r.move_by_player
-        claimed_territory.troops = 1
-        player.troops_remaining -= 1
+        self._set_occupier(r.territory, r.move_by_player)
+        self._add_troops(r.territory, 1 - self.state.territories[r.territory].troops)
+        self._set(player, "troops_remaining", player.troops_remaining - 1)
 
         if r.move_by_player == self.state.me.player_id:
-            self.state.me.troops_remaining = player.troops_remaining
+            self._set(self.state.me, "troops_remaining", player.troops_remaining)
 
 
     def _commit_move_defend(self, r: MoveDefend) -> None:
@@ -119,23 +195,23 @@ class StateMutator():
         player = self.state.players[r.move_by_player]
 
         # The player must have placed all their troops.
-        player.troops_remaining = 0
+        self._set(player, "troops_remaining", 0)
 
         # Reset the matching territories.
-        player.must_place_territory_bonus = []
+        self._set(player, "must_place_territory_bonus", [])
 
         # Distribute the troops.
         for territory, troops in r.distributions.items():
-            self.state.territories[territory].troops += troops
+            self._add_troops(territory, troops)
 
         if r.move_by_player == self.state.me.player_id:
-            self.state.me.troops_remaining = player.troops_remaining
-            self.state.me.must_place_territory_bonus = player.must_place_territory_bonus
+            self._set(self.state.me, "troops_remaining", player.troops_remaining)
+            self._set(self.state.me, "must_place_territory_bonus", player.must_place_territory_bonus)
 
 
     def _commit_move_fortify(self, r: MoveFortify) -> None:
-        self.state.territories[r.source_territory].troops -= r.troop_count
-        self.state.territories[r.target_territory].troops += r.troop_count
+        self._add_troops(r.source_territory, -r.troop_count)
+        self._add_troops(r.target_territory, r.troop_count)
 
 
     def _commit_move_fortify_pass(self, r: MoveFortifyPass) -> None:
@@ -143,11 +219,12 @@ class StateMutator():
 
 
     def _commit_move_place_initial_troop(self, r: MovePlaceInitialTroop) -> None:
-        self.state.territories[r.territory].troops += 1
-        self.state.players[r.move_by_player].troops_remaining -= 1
+        self._add_troops(r.territory, 1)
+        player = self.state.players[r.move_by_player]
+        self._set(player, "troops_remaining", player.troops_remaining - 1)
 
         if r.move_by_player == self.state.me.player_id:
-            self.state.me.troops_remaining = self.state.players[r.move_by_player].troops_remaining
+            self._set(self.state.me, "troops_remaining", player.troops_remaining)
 
 
     def _commit_move_redeem_cards(self, r: MoveRedeemCards) -> None:
@@ -162,7 +239,7 @@ class StateMutator():
         total_set_bonus = 0
         for _ in range(len(r.sets)):
             total_set_bonus += calculate_set_bonus(self.state.card_sets_redeemed)
-            self.state.card_sets_redeemed += 1
+            self._set(self.state, "card_sets_redeemed", self.state.card_sets_redeemed + 1)
 
         # Give the matching territory bonus if applicable.
         all_cards: list[int] = []
@@ -172,26 +249,26 @@ class StateMutator():
         def remove_none(x) -> TypeGuard[int]:
             return x != None
         
-        matching_territories = set(filter(remove_none, [self.state.cards[card].territory_id for card in all_cards])) & set(map(lambda x: x.territory_id, filter(lambda x: x.occupier == r.move_by_player, self.state.territories.values())))
+        matching_territories = set(filter(remove_none, [self.state.cards[card].territory_id for card in all_cards])) & set(mask_to_territories(self.state.territory_masks[r.move_by_player]))
         matching_territory_bonus = 2 if len(matching_territories) > 0 else 0
 
         # Modify the player.
         player = self.state.players[r.move_by_player]
-        player.troops_remaining += total_set_bonus + matching_territory_bonus
-        player.must_place_territory_bonus = list(matching_territories)
+        self._set(player, "troops_remaining", player.troops_remaining + total_set_bonus + matching_territory_bonus)
+        self._set(player, "must_place_territory_bonus", list(matching_territories))
         
         if r.move_by_player == self.state.me.player_id:
-            self.state.me.cards = list(filter(lambda x: x.card_id not in set(all_cards), self.state.me.cards))
+            self._set(self.state.me, "cards", list(filter(lambda x: x.card_id not in set(all_cards), self.state.me.cards)))
         else:
-            player.card_count -= len(all_cards)
+            self._set(player, "card_count", player.card_count - len(all_cards))
 
         # Place the redeemed cards in the discarded deck.
-        self.state.discarded_deck.extend([self.state.cards[i] for i in all_cards])
+        self._set(self.state, "discarded_deck", self.state.discarded_deck + [self.state.cards[i] for i in all_cards])
         
         # Update my model if this was me.
         if r.move_by_player == self.state.me.player_id:
-            self.state.me.troops_remaining = player.troops_remaining
-            self.state.me.must_place_territory_bonus = player.must_place_territory_bonus
+            self._set(self.state.me, "troops_remaining", player.troops_remaining)
+            self._set(self.state.me, "must_place_territory_bonus", player.must_place_territory_bonus)
 
 
     def _commit_move_troops_after_attack(self, r: MoveTroopsAfterAttack) -> None:
@@ -200,8 +277,8 @@ class StateMutator():
         move_attack_id = record_attack.move_attack_id
         move_attack = cast(MoveAttack, self.state.recording[move_attack_id])
         
-        self.state.territories[move_attack.attacking_territory].troops -= r.troop_count
-        self.state.territories[move_attack.defending_territory].troops += r.troop_count
+        self._add_troops(move_attack.attacking_territory, -r.troop_count)
+        self._add_troops(move_attack.defending_territory, r.troop_count)
 
 
     def _commit_record_attack(self, r: RecordAttack) -> None:
@@ -210,11 +287,11 @@ class StateMutator():
         attacking_territory = move_attack.attacking_territory
         defending_territory = move_attack.defending_territory
 
-        self.state.territories[attacking_territory].troops -= r.attacking_troops_lost
-        self.state.territories[defending_territory].troops -= r.defending_troops_lost
+        self._add_troops(attacking_territory, -r.attacking_troops_lost)
+        self._add_troops(defending_territory, -r.defending_troops_lost)
 
         if r.territory_conquered:
-            self.state.territories[defending_territory].occupier = move_attack.move_by_player
+            self._set_occupier(defending_territory, move_attack.move_by_player)
 
 
     def _commit_record_banned(self, r: RecordBanned) -> None:
@@ -225,20 +302,20 @@ class StateMutator():
         if r.player != self.state.me.player_id:
             raise RuntimeError("Please send us a discord message with this error log.")
         
-        self.state.me.cards.append(r.card)
+        self._set(self.state.me, "cards", self.state.me.cards + [r.card])
 
 
     def _commit_public_record_drew_card(self, r: PublicRecordDrewCard) -> None:
         if r.player == self.state.me.player_id:
             raise RuntimeError("Please send us a discord message with this error log.")
         
-        self.state.players[r.player].card_count += 1
-        self.state.deck_card_count -= 1
+        self._set(self.state.players[r.player], "card_count", self.state.players[r.player].card_count + 1)
+        self._set(self.state, "deck_card_count", self.state.deck_card_count - 1)
 
 
     def _commit_record_player_eliminated(self, r: RecordPlayerEliminated) -> None:
         # The player is eliminated.
-        self.state.players[r.player].alive = False
+        self._set(self.state.players[r.player], "alive", False)
 
         # Their cards are surrendered.
         record_attack = cast(RecordAttack, self.state.recording[r.record_attack_id])
@@ -247,12 +324,12 @@ class StateMutator():
         if move_attack.move_by_player != self.state.me.player_id:
             raise RuntimeError("Please send us a discord message with this error log.")
         
-        self.state.me.cards.extend(r.cards_surrendered)
+        self._set(self.state.me, "cards", self.state.me.cards + r.cards_surrendered)
 
     
     def _commit_public_record_player_eliminated(self, r: PublicRecordPlayerEliminated) -> None:
         # The player is eliminated.
-        self.state.players[r.player].alive = False
+        self._set(self.state.players[r.player], "alive", False)
 
         # Their cards are surrendered.
         record_attack = cast(RecordAttack, self.state.recording[r.record_attack_id])
@@ -261,7 +338,8 @@ class StateMutator():
         if move_attack.move_by_player == self.state.me.player_id:
             raise RuntimeError("Please send us a discord message with this error log.")
         
-        self.state.players[move_attack.move_by_player].card_count += r.cards_surrendered_count
+        attacker = self.state.players[move_attack.move_by_player]
+        self._set(attacker, "card_count", attacker.card_count + r.cards_surrendered_count)
         
         if r.player == self.state.me.player_id:
             raise RuntimeError("Please send us a discord message with this error log.")
@@ -272,8 +350,8 @@ class StateMutator():
 
 
     def _commit_record_shuffled_cards(self, r: RecordShuffledCards) -> None:
-        self.state.deck_card_count = len(self.state.discarded_deck)
-        self.state.discarded_deck = []
+        self._set(self.state, "deck_card_count", len(self.state.discarded_deck))
+        self._set(self.state, "discarded_deck", [])
 
 
     def _commit_record_start_game(self, r: RecordStartGame) -> None:
@@ -281,16 +359,19 @@ class StateMutator():
         
 
     def _commit_public_record_start_game(self, r: PublicRecordStartGame) -> None:
-        self.state.turn_order = list(r.turn_order).copy()
-        self.state.players = dict([(x.player_id, x) for x in r.players])
-        self.state.me = r.you
+        self._set(self.state, "turn_order", list(r.turn_order).copy())
+        # The players are changed as records are committed, so we keep our own copies rather than changing the
+        # record's, which an in-process engine shares with every player, see LocalPlayerConnection.
+        self._set(self.state, "players", dict([(x.player_id, x.model_copy(deep=True)) for x in r.players]))
+        self._set(self.state, "me", r.you.model_copy(deep=True))
 
 
     def _commit_record_start_turn(self, r: RecordStartTurn) -> None:
-        self.state.players[r.player].troops_remaining += r.territory_bonus + r.continent_bonus
+        player = self.state.players[r.player]
+        self._set(player, "troops_remaining", player.troops_remaining + r.territory_bonus + r.continent_bonus)
 
         if r.player == self.state.me.player_id:
-            self.state.me.troops_remaining = self.state.players[r.player].troops_remaining
+            self._set(self.state.me, "troops_remaining", player.troops_remaining)
 
 
     def _commit_record_territory_conquered(self, r: RecordTerritoryConquered) -> None:
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class TranspositionTable(Generic[V]):
+    """A bounded map from position hashes (e.g. ClientState.zobrist_hash, combined with whatever else the search
+    depends on, such as whose turn it is) to search results. Once full, the least recently used entry is
+    evicted, so the table can be kept across plies and across queries without growing without bound.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        if capacity < 1:
+            raise ValueError(f"Transposition table capacity must be at least 1, got {capacity}.")
+
+        self.capacity = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[int, V] = OrderedDict()
+
+
+    def get(self, key: int) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+
+    def put(self, key: int, value: V) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._entries
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
\ No newline at end of file
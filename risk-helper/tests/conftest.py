@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from risk_shared.protocol import compact
+from risk_shared.records.types.record_type import RecordType
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+
+
+def load_recording(path: str) -> list[RecordType]:
+    with open(path, "r") as f:
+        return [compact.loads(x) for x in f]
+
+
+@pytest.fixture(scope="session")
+def recordings() -> list[list[RecordType]]:
+    """Finished games as the winner saw them, stored one compact record per line, shared by every test.
+    Clients aren't sent records about themselves after they are eliminated or the RecordWinner, so the
+    winner's view is the complete game up to its last record. They are the games in risk-engine/tests/data,
+    censored for their winner.
+    """
+    return [load_recording(f"{DATA_DIRECTORY}/{x}") for x in sorted(os.listdir(DATA_DIRECTORY))]
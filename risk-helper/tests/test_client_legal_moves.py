@@ -0,0 +1,23 @@
+from risk_helper.client_state import ClientState
+from risk_helper.state_mutator import StateMutator
+
+
+def get_brute_force_moves(state: ClientState, player: int, same_occupier: bool) -> set[tuple[int, int]]:
+    territories = state.territories
+    return set([(x, y) for x in territories.keys() for y in state.map.get_adjacent_to(x)
+                if territories[x].occupier == player and territories[x].troops >= 2 and (territories[y].occupier == player) == same_occupier])
+
+
+def test_legal_moves_match_brute_force(recordings):
+    for records in recordings:
+        state = ClientState()
+        mutator = StateMutator(state)
+        for i, record in enumerate(records):
+            mutator.commit(i, record)
+            if i % 7 != 0:
+                continue
+
+            for player in state.players.keys():
+                assert set(state.get_legal_attacks(player)) == get_brute_force_moves(state, player, False), f"Attacks differ after record {i}."
+                assert set(state.get_legal_fortifies(player)) == get_brute_force_moves(state, player, True), f"Fortifies differ after record {i}."
+            assert state.get_legal_claims() == sorted([x for x, y in state.territories.items() if y.occupier is None])
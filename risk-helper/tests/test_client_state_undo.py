@@ -0,0 +1,68 @@
+from typing import Any
+
+import pytest
+
+from risk_helper.client_state import ClientState
+from risk_helper.state_mutator import StateMutator
+
+# How many records are applied hypothetically at a time, and how often.
+DEPTH = 8
+INTERVAL = 53
+
+
+def get_fields(state: ClientState) -> dict[str, Any]:
+    players = list(state.players.keys())
+    return {
+        "territories": dict([(x, (y.occupier, y.troops)) for x, y in state.territories.items()]),
+        "players": dict([(x, y.model_dump()) for x, y in state.players.items()]),
+        "me": state.me.model_dump(),
+        "deck_card_count": state.deck_card_count,
+        "discarded_deck": list(state.discarded_deck),
+        "card_sets_redeemed": state.card_sets_redeemed,
+        "turn_order": list(state.turn_order),
+        "recording": list(state.recording),
+        "territory_masks": dict([(x, y) for x, y in state.territory_masks.items() if y != 0]),
+        "troop_totals": dict([(x, y) for x, y in state.troop_totals.items() if y != 0]),
+        "zobrist_hash": state.zobrist_hash,
+
+        # The derived views are cached, so these also check the caches are invalidated when changes are undone.
+        "owned": dict([(x, state.get_territories_owned_by(x)) for x in players + [None]]),
+        "borders": dict([(x, state.get_border_mask(x)) for x in players]),
+        "frontiers": dict([(x, state.get_frontier_mask(x)) for x in players]),
+        "continents": dict([(x, state.get_continents_held(x)) for x in players]),
+        "attacks": dict([(x, state.get_legal_attacks(x)) for x in players]),
+    }
+
+
+def test_apply_undo_and_fork(recordings):
+    for records in recordings:
+        state = ClientState()
+        mutator = StateMutator(state)
+
+        for i, record in enumerate(records):
+            if i > 0 and i % INTERVAL == 0:
+                before = get_fields(state)
+                fork = state.fork()
+                fork_mutator = StateMutator(fork)
+
+                applied = records[i:i + DEPTH]
+                for x in applied:
+                    mutator.apply(x)
+                after = get_fields(state)
+                assert get_fields(fork) == before, f"Applying records after {i} changed a fork."
+
+                for x in applied:
+                    fork_mutator.apply(x)
+                assert get_fields(fork) == after, f"Applying records after {i} to a fork gave a different state."
+
+                for _ in applied:
+                    mutator.undo()
+                assert get_fields(state) == before, f"Undoing records after {i} didn't restore the state."
+
+            mutator.commit(i, record)
+
+
+def test_undo_without_apply():
+    mutator = StateMutator(ClientState())
+    with pytest.raises(RuntimeError):
+        mutator.undo()
@@ -0,0 +1,12 @@
+from risk_helper.client_state import ClientState
+from risk_helper.state_mutator import StateMutator
+
+
+def test_incremental_hash_matches_full_hash(recordings):
+    for records in recordings:
+        state = ClientState()
+        mutator = StateMutator(state)
+        for i, record in enumerate(records):
+            mutator.commit(i, record)
+            full_hash = state.zobrist_keys.hash([(x.territory_id, x.occupier, x.troops) for x in state.territories.values()])
+            assert state.zobrist_hash == full_hash, f"Hash differs after record {i}."
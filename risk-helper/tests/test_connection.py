@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+
+import pytest
+
+from risk_helper.connection import Connection
+from risk_shared.protocol.framing import ENCODING_COMPACT, ENCODING_JSON, PROTOCOL_FIELD, PROTOCOL_VERSION, FrameReader, encode_legacy_frame
+from risk_shared.queries.query_attack import QueryAttack
+from risk_shared.records.moves.move_attack_pass import MoveAttackPass
+
+
+@pytest.fixture
+def pipes(tmp_path, monkeypatch):
+    """A helper Connection, with the engine's ends of its pipes.
+    """
+    os.mkdir(tmp_path / "io")
+    os.mkfifo(tmp_path / "io" / "to_engine.pipe")
+    os.mkfifo(tmp_path / "io" / "from_engine.pipe")
+    monkeypatch.chdir(tmp_path)
+
+    connections = []
+    to_engine = os.open(tmp_path / "io" / "to_engine.pipe", os.O_RDONLY | os.O_NONBLOCK)
+    thread = threading.Thread(target=lambda: connections.append(Connection()))
+    thread.start()
+    from_engine = os.open(tmp_path / "io" / "from_engine.pipe", os.O_WRONLY)
+    thread.join()
+    os.set_blocking(to_engine, True)
+
+    yield connections[0], to_engine, from_engine
+    os.close(to_engine)
+    os.close(from_engine)
+
+
+def _exchange(pipes, advertise: bool) -> tuple[bool, int]:
+    connection, to_engine, from_engine = pipes
+    # The first query is always sent with the legacy framing and JSON, an engine which supports binary framing
+    # advertises its protocol version in it.
+    query = json.loads(QueryAttack(update={}).model_dump_json())
+    if advertise:
+        query[PROTOCOL_FIELD] = PROTOCOL_VERSION
+    os.write(from_engine, encode_legacy_frame(json.dumps(query)))
+    assert connection.get_next_query() == QueryAttack(update={})
+
+    connection.send_move(MoveAttackPass(move_by_player=0))
+    binary_framing, encoding, _ = FrameReader(to_engine, 4096).read()
+    return (binary_framing, encoding)
+
+
+def test_upgrades_when_advertised(pipes):
+    assert _exchange(pipes, advertise=True) == (True, ENCODING_COMPACT)
+
+
+def test_legacy_without_advertisement(pipes):
+    # An engine from before binary framing never advertises it, so the helper must keep to the legacy framing.
+    assert _exchange(pipes, advertise=False) == (False, ENCODING_JSON)
@@ -0,0 +1,31 @@
+import pytest
+
+from risk_helper.transposition_table import TranspositionTable
+
+
+def test_evicts_least_recently_used():
+    table: TranspositionTable[str] = TranspositionTable(2)
+    table.put(1, "a")
+    table.put(2, "b")
+    assert table.get(1) == "a"
+
+    table.put(3, "c")
+    assert 2 not in table
+    assert 1 in table and 3 in table
+    assert len(table) == 2
+
+
+def test_counts_hits_and_misses():
+    table: TranspositionTable[int] = TranspositionTable()
+    table.put(1, 10)
+    assert table.get(1) == 10
+    assert table.get(2) is None
+    assert (table.hits, table.misses) == (1, 1)
+
+    table.clear()
+    assert len(table) == 0 and (table.hits, table.misses) == (0, 0)
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
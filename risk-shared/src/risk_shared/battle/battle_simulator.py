@@ -0,0 +1,97 @@
+from typing import Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from risk_shared.battle.battle_table import MAX_ATTACKING_DICE, MAX_DEFENDING_DICE, get_roll_loss_probabilities
+
+
+class BattleSimulation():
+    """The final stacks of `samples` simulated battles for each of n starting (attackers, defenders) stacks,
+    as (n, samples) arrays.
+    """
+
+    def __init__(self, attackers: np.ndarray, defenders: np.ndarray, attackers_remaining: np.ndarray, defenders_remaining: np.ndarray):
+        self.attackers = attackers
+        self.defenders = defenders
+        self.attackers_remaining = attackers_remaining
+        self.defenders_remaining = defenders_remaining
+
+
+    @property
+    def samples(self) -> int:
+        return self.attackers_remaining.shape[1]
+
+
+    def get_win_probabilities(self) -> np.ndarray:
+        """The fraction of battles for each stack in which the territory was conquered.
+        """
+        return (self.defenders_remaining == 0).mean(axis=1)
+
+
+    def get_expected_attackers_remaining(self) -> np.ndarray:
+        return self.attackers_remaining.mean(axis=1)
+
+
+    def get_expected_defenders_remaining(self) -> np.ndarray:
+        return self.defenders_remaining.mean(axis=1)
+
+
+    def get_attackers_remaining_histogram(self) -> np.ndarray:
+        """An (n, max(attackers) + 1) array, where [i, k] counts the battles for stack i ending with k attackers.
+        """
+        return _get_histogram(self.attackers_remaining, int(self.attackers.max(initial=0)) + 1)
+
+
+    def get_defenders_remaining_histogram(self) -> np.ndarray:
+        """An (n, max(defenders) + 1) array, where [i, k] counts the battles for stack i ending with k defenders.
+        """
+        return _get_histogram(self.defenders_remaining, int(self.defenders.max(initial=0)) + 1)
+
+
+def _get_histogram(remaining: np.ndarray, width: int) -> np.ndarray:
+    rows = np.arange(remaining.shape[0])[:, None] * width
+    return np.bincount((rows + remaining).ravel(), minlength=remaining.shape[0] * width).reshape(remaining.shape[0], width)
+
+
+def simulate_battles(attackers: npt.ArrayLike, defenders: npt.ArrayLike, stop_at: Union[int, npt.ArrayLike] = 0, samples: int = 1000, rng: Optional[np.random.Generator] = None) -> BattleSimulation:
+    """Simulates `samples` battles for every pair of attackers and defenders at once, with the same odds as
+    the dice rolled by risk_engine.game.record_factory, with the most dice each side can roll.
+
+    Attackers are the troops committed to the attack, not counting the troop left behind on the attacking
+    territory. Each battle continues until the territory is conquered or the attackers are down to `stop_at`
+    (per stack or for all of them), so the default of 0 fights to the end.
+    """
+    attackers = np.asarray(attackers, dtype=np.int64).ravel()
+    defenders = np.asarray(defenders, dtype=np.int64).ravel()
+    if attackers.shape != defenders.shape:
+        raise ValueError(f"Got {len(attackers)} attacking stacks but {len(defenders)} defending stacks.")
+    if (attackers < 0).any() or (defenders < 0).any():
+        raise ValueError("Stacks must not be negative.")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    a = np.repeat(attackers, samples)
+    d = np.repeat(defenders, samples)
+    stop = np.repeat(np.broadcast_to(np.asarray(stop_at, dtype=np.int64), attackers.shape), samples)
+
+    # Rather than rolling and sorting every die, each roll draws how many troops the attacker loses from the
+    # exact distribution for the dice rolled, which is the same distribution at one random number per roll.
+    cumulative = np.ones((MAX_ATTACKING_DICE + 1, MAX_DEFENDING_DICE + 1, MAX_DEFENDING_DICE))
+    for x in range(1, MAX_ATTACKING_DICE + 1):
+        for y in range(1, MAX_DEFENDING_DICE + 1):
+            probabilities = np.cumsum(get_roll_loss_probabilities(x, y))[:-1]
+            cumulative[x, y, :len(probabilities)] = probabilities
+
+    # Only the battles which are still going are rolled each round, so the work shrinks as battles end.
+    active = np.flatnonzero((a > stop) & (d > 0))
+    while len(active) > 0:
+        attacking_dice = np.minimum(a[active], MAX_ATTACKING_DICE)
+        defending_dice = np.minimum(d[active], MAX_DEFENDING_DICE)
+
+        attacker_lost = (rng.random(len(active))[:, None] >= cumulative[attacking_dice, defending_dice]).sum(axis=1)
+        a[active] -= attacker_lost
+        d[active] -= np.minimum(attacking_dice, defending_dice) - attacker_lost
+
+        active = active[(a[active] > stop[active]) & (d[active] > 0)]
+
+    return BattleSimulation(attackers, defenders, a.reshape(-1, samples), d.reshape(-1, samples))
\ No newline at end of file
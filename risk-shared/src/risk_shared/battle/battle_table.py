@@ -0,0 +1,167 @@
+import functools
+import itertools
+import os
+import tempfile
+from fractions import Fraction
+from typing import Optional
+
+import numpy as np
+
+
+# Battles are assumed to be fought to the end with the most dice each side can roll, i.e. min(attackers, 3)
+# against min(defenders, 2), as in risk_engine.game.record_factory. "Attackers" is the number of troops
+# committed to the attack, not counting the troop which must stay behind on the attacking territory.
+MAX_ATTACKING_DICE = 3
+MAX_DEFENDING_DICE = 2
+DEFAULT_LIMIT = 64
+
+# Bump this if the layout of the table changes, so stale files on disk are recomputed rather than loaded.
+_FILE_VERSION = 1
+
+
+@functools.cache
+def get_roll_loss_probabilities(attacking_dice: int, defending_dice: int) -> tuple[float, ...]:
+    """The probability that the attacker loses 0, 1, ... min(attacking_dice, defending_dice) troops in a
+    single roll, by enumerating every roll. The defender loses the rest.
+    """
+    comparisons = min(attacking_dice, defending_dice)
+    counts = [0] * (comparisons + 1)
+    for roll in itertools.product(range(1, 7), repeat=attacking_dice + defending_dice):
+        attacking_rolls = sorted(roll[:attacking_dice], reverse=True)
+        defending_rolls = sorted(roll[attacking_dice:], reverse=True)
+        counts[sum(1 for x, y in zip(attacking_rolls, defending_rolls) if x <= y)] += 1
+
+    total = 6 ** (attacking_dice + defending_dice)
+    return tuple([float(Fraction(x, total)) for x in counts])
+
+
+class BattleTable():
+    """The exact outcome distribution of every battle between 0..limit attackers and 0..limit defenders.
+
+    The distributions are stored as one array `outcomes[a, d, limit + r]`, the probability that a battle
+    between a attackers and d defenders ends with r > 0 attackers or -r > 0 defenders remaining. They are
+    computed by a dynamic programming recurrence over a + d, every roll removes one or two troops so each
+    anti-diagonal only depends on the two before it, and all the battles on an anti-diagonal are computed
+    together.
+    """
+
+    def __init__(self, outcomes: np.ndarray):
+        self.outcomes = outcomes
+        self.limit: int = outcomes.shape[0] - 1
+
+
+    @classmethod
+    def compute(cls, limit: int) -> "BattleTable":
+        if limit < 1:
+            raise ValueError(f"Battle table limit must be at least 1, got {limit}.")
+
+        size = limit + 1
+        attackers, defenders = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+        attacking_dice = np.minimum(attackers, MAX_ATTACKING_DICE)
+        defending_dice = np.minimum(defenders, MAX_DEFENDING_DICE)
+        comparisons = np.minimum(attacking_dice, defending_dice)
+
+        # loss_probabilities[m, a, d] is the probability the attacker loses m troops in the next roll of battle (a, d).
+        loss_probabilities = np.zeros((MAX_DEFENDING_DICE + 1, size, size))
+        for x in range(1, MAX_ATTACKING_DICE + 1):
+            for y in range(1, MAX_DEFENDING_DICE + 1):
+                cells = (attacking_dice == x) & (defending_dice == y)
+                for m, p in enumerate(get_roll_loss_probabilities(x, y)):
+                    loss_probabilities[m][cells] = p
+
+        outcomes = np.zeros((size, size, 2 * limit + 1))
+        outcomes[np.arange(1, size), 0, limit + np.arange(1, size)] = 1
+        outcomes[0, np.arange(1, size), limit - np.arange(1, size)] = 1
+
+        for s in range(2, 2 * limit + 1):
+            a = np.arange(max(1, s - limit), min(limit, s - 1) + 1)
+            d = s - a
+            for m in range(MAX_DEFENDING_DICE + 1):
+                p = loss_probabilities[m, a, d]
+                # Outcomes which can't happen from (a, d) have p = 0, their indices are clipped to stay in the table.
+                next_a = np.maximum(a - m, 0)
+                next_d = np.clip(d - (comparisons[a, d] - m), 0, limit)
+                outcomes[a, d] += p[:, None] * outcomes[next_a, next_d]
+
+        return cls(outcomes)
+
+
+    def _check(self, attackers: int, defenders: int) -> None:
+        if not (0 <= attackers <= self.limit and 0 <= defenders <= self.limit):
+            raise IndexError(f"Battle ({attackers}, {defenders}) is outside of the table limit {self.limit}.")
+
+
+    def get_win_probability(self, attackers: int, defenders: int) -> float:
+        """The probability that the attacker wins, i.e. conquers the territory.
+        """
+        self._check(attackers, defenders)
+        return float(self.outcomes[attackers, defenders, self.limit + 1:].sum())
+
+
+    def get_attackers_remaining_distribution(self, attackers: int, defenders: int) -> np.ndarray:
+        """Index k is the probability that the battle ends with k attackers remaining, where k = 0 is a loss.
+        """
+        self._check(attackers, defenders)
+        distribution = self.outcomes[attackers, defenders, self.limit:self.limit + attackers + 1].copy()
+        distribution[0] = self.outcomes[attackers, defenders, :self.limit + 1].sum()
+        return distribution
+
+
+    def get_defenders_remaining_distribution(self, attackers: int, defenders: int) -> np.ndarray:
+        """Index k is the probability that the battle ends with k defenders remaining, where k = 0 is a loss.
+        """
+        self._check(attackers, defenders)
+        distribution = self.outcomes[attackers, defenders, self.limit - defenders:self.limit + 1][::-1].copy()
+        distribution[0] = self.outcomes[attackers, defenders, self.limit:].sum()
+        return distribution
+
+
+    def get_expected_attackers_remaining(self, attackers: int, defenders: int) -> float:
+        distribution = self.get_attackers_remaining_distribution(attackers, defenders)
+        return float(np.dot(distribution, np.arange(len(distribution))))
+
+
+    def get_expected_defenders_remaining(self, attackers: int, defenders: int) -> float:
+        distribution = self.get_defenders_remaining_distribution(attackers, defenders)
+        return float(np.dot(distribution, np.arange(len(distribution))))
+
+
+def get_cache_directory() -> str:
+    """Battle tables are memoized under $RISK_SHARED_CACHE, falling back to the system temporary directory.
+    """
+    return os.environ.get("RISK_SHARED_CACHE", os.path.join(tempfile.gettempdir(), "risk_shared"))
+
+
+# Tables which have already been loaded or computed by this process, by limit.
+_loaded_tables: dict[int, BattleTable] = {}
+
+
+def get_battle_table(limit: int = DEFAULT_LIMIT, cache_directory: Optional[str] = None) -> BattleTable:
+    """Returns a table covering battles of up to `limit` attackers and defenders. The table is computed on the
+    first call and memoized to disk, so later processes only need to load it. If the cache directory isn't
+    writable (e.g. inside the submission sandbox) the table is only kept in memory.
+    """
+    for loaded_limit, table in _loaded_tables.items():
+        if loaded_limit >= limit:
+            return table
+
+    if cache_directory is None:
+        cache_directory = get_cache_directory()
+    path = os.path.join(cache_directory, f"battle_table_v{_FILE_VERSION}_{limit}.npy")
+
+    try:
+        table = BattleTable(np.load(path))
+    except (OSError, ValueError):
+        table = BattleTable.compute(limit)
+        try:
+            os.makedirs(cache_directory, exist_ok=True)
+            # Written to a temporary file first so another process never loads a partially written table.
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as f:
+                np.save(f, table.outcomes)
+            os.replace(temporary_path, path)
+        except OSError:
+            pass
+
+    _loaded_tables[limit] = table
+    return table
\ No newline at end of file
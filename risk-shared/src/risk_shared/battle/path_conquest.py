@@ -0,0 +1,83 @@
+import functools
+from typing import Optional, Sequence
+
+import numpy as np
+
+from risk_shared.battle.battle_table import BattleTable, get_battle_table
+
+
+class PathConquest():
+    """Exact odds of conquering a path of territories one after another, e.g. a warpath planned by a bot.
+
+    The attacker starts with `attackers` troops available to attack the first territory (not counting the
+    troop left behind on the source). Each battle is fought to the end, and after every conquest one troop
+    is left behind on the conquered territory and the survivors move on to attack the next one.
+
+    The distribution over troops available after each prefix of the path is memoized, so scoring many
+    candidate paths which share prefixes (as the paths found by a depth first search do) only convolves each
+    distinct prefix once.
+    """
+
+    def __init__(self, table: Optional[BattleTable] = None, cache_size: Optional[int] = 65536):
+        self.table = table if table is not None else get_battle_table()
+        self._get_available_distribution = functools.lru_cache(maxsize=cache_size)(self._compute_available_distribution)
+
+
+    def _compute_available_distribution(self, attackers: int, defenders: tuple[int, ...]) -> tuple[np.ndarray, float]:
+        """Returns (available, survived) for the path `defenders`, where available[k] is the probability the whole
+        path was conquered with k troops left to attack with after leaving one behind, and survived is the
+        probability the whole path was conquered.
+        """
+        if len(defenders) == 0:
+            available = np.zeros(attackers + 1)
+            available[attackers] = 1
+            return (available, 1.0)
+
+        previous, _ = self._get_available_distribution(attackers, defenders[:-1])
+        if not 0 <= defenders[-1] <= self.table.limit:
+            raise IndexError(f"Battle ({attackers}, {defenders[-1]}) is outside of the table limit {self.table.limit}.")
+
+        # survivors[j] is the probability of conquering the last territory with j + 1 troops, so after leaving
+        # one behind j are available, which makes the shift free.
+        limit = self.table.limit
+        survivors = previous @ self.table.outcomes[:len(previous), defenders[-1], limit + 1:limit + len(previous)]
+        return (survivors, float(survivors.sum()))
+
+
+    def _get(self, attackers: int, defenders: Sequence[int]) -> tuple[np.ndarray, float]:
+        if not 0 <= attackers <= self.table.limit:
+            raise IndexError(f"Battle ({attackers}, {defenders[0] if len(defenders) > 0 else 0}) is outside of the table limit {self.table.limit}.")
+        return self._get_available_distribution(attackers, tuple(defenders))
+
+
+    def get_conquest_probability(self, attackers: int, defenders: Sequence[int]) -> float:
+        """The probability of conquering every territory on the path.
+        """
+        return self._get(attackers, defenders)[1]
+
+
+    def get_survivors_distribution(self, attackers: int, defenders: Sequence[int]) -> np.ndarray:
+        """Index k is the probability that the path is conquered with k troops on the last territory, where
+        k = 0 is the probability that the attack stalls somewhere along the path.
+        """
+        available, survived = self._get(attackers, defenders)
+        if len(defenders) == 0:
+            return available.copy()
+        return np.concatenate(([1 - survived], available))
+
+
+    def get_expected_survivors(self, attackers: int, defenders: Sequence[int]) -> float:
+        """The expected number of troops on the last territory, counting a stalled attack as 0.
+        """
+        distribution = self.get_survivors_distribution(attackers, defenders)
+        return float(np.dot(distribution, np.arange(len(distribution))))
+
+
+    def get_conquest_probabilities(self, attackers: int, paths: Sequence[Sequence[int]]) -> list[float]:
+        """Scores a batch of candidate paths from the same attacking stack.
+        """
+        return [self.get_conquest_probability(attackers, x) for x in paths]
+
+
+    def clear_cache(self) -> None:
+        self._get_available_distribution.cache_clear()
\ No newline at end of file
@@ -1,3 +1,57 @@
+from collections import deque
+from typing import Iterable
+
+from risk_shared.maps.zobrist import ZobristKeys
+
+
+class MapTables():
+    """Lookup tables derived from a map's graph. Territory sets are represented as int bitsets, where bit v is
+    set if territory v is in the set.
+    """
+
+    def __init__(self, edges: dict[int, list[int]], continents: dict[int, list[int]]):
+        size = max(edges.keys()) + 1
+
+        self.adjacent_sets: list[frozenset[int]] = [frozenset(edges.get(v, [])) for v in range(size)]
+        self.adjacent_masks: list[int] = [territories_to_mask(x) for x in self.adjacent_sets]
+        self.continent_masks: dict[int, int] = dict([(x, territories_to_mask(y)) for x, y in continents.items()])
+
+        # All pairs shortest path lengths by a breadth first search from every territory, -1 if unreachable.
+        self.distances: list[list[int]] = []
+        for source in range(size):
+            distances = [-1] * size
+            distances[source] = 0
+            queue = deque([source])
+            while len(queue) > 0:
+                v = queue.popleft()
+                for u in self.adjacent_sets[v]:
+                    if distances[u] == -1:
+                        distances[u] = distances[v] + 1
+                        queue.append(u)
+            self.distances.append(distances)
+
+        self.zobrist_keys: ZobristKeys = ZobristKeys(range(size))
+
+
+# The tables only depend on the graph, so they are built once per distinct graph and shared by every Map
+# created from it (e.g. every call to earth.create_map()).
+_cached_tables: dict[tuple, MapTables] = {}
+
+
+def territories_to_mask(territories: Iterable[int]) -> int:
+    mask = 0
+    for territory in territories:
+        mask |= 1 << territory
+    return mask
+
+
+def mask_to_territories(mask: int) -> list[int]:
+    territories = []
+    while mask:
+        lowest = mask & -mask
+        territories.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return territories
 
 
 class Map():
@@ -10,6 +64,11 @@ class Map():
         self._continent_bonuses: dict[int, int] = continent_bonuses
         self._edges: dict[int, list[int]] = edges
 
+        key = (tuple(sorted((x, tuple(sorted(y))) for x, y in edges.items())), tuple(sorted((x, tuple(sorted(y))) for x, y in continents.items())))
+        if key not in _cached_tables:
+            _cached_tables[key] = MapTables(edges, continents)
+        self._tables = _cached_tables[key]
+
     def get_vertices(self):
         return self._vertices.values()
     
@@ -28,8 +87,48 @@ class Map():
     def get_adjacent_to(self, v: int):
         return self._edges[v]
     
+    def _check_vertex(self, v: int) -> None:
+        # The tables are lists indexed by territory id, so without this a negative id would wrap around and
+        # an id past the end would raise IndexError, rather than the KeyError of the edges dict.
+        if v not in self._edges:
+            raise KeyError(v)
+
     def is_adjacent(self, v1: int, v2: int):
-        return v2 in self._edges[v1]
+        self._check_vertex(v1)
+        return v2 in self._tables.adjacent_sets[v1]
+
+    def get_adjacent_set(self, v: int) -> frozenset[int]:
+        self._check_vertex(v)
+        return self._tables.adjacent_sets[v]
+
+    def get_adjacent_mask(self, v: int) -> int:
+        self._check_vertex(v)
+        return self._tables.adjacent_masks[v]
+
+    def get_neighbours_mask(self, mask: int) -> int:
+        """The bitset of every territory adjacent to some territory in the bitset `mask`, which can include
+        territories in `mask` itself.
+        """
+        adjacent_masks = self._tables.adjacent_masks
+        result = 0
+        while mask:
+            lowest = mask & -mask
+            result |= adjacent_masks[lowest.bit_length() - 1]
+            mask ^= lowest
+        return result
+
+    def get_continent_mask(self, continent: int) -> int:
+        return self._tables.continent_masks[continent]
+
+    def get_distance(self, v1: int, v2: int) -> int:
+        """The fewest moves between two territories, or -1 if there is no path between them.
+        """
+        self._check_vertex(v1)
+        self._check_vertex(v2)
+        return self._tables.distances[v1][v2]
+
+    def get_zobrist_keys(self) -> ZobristKeys:
+        return self._tables.zobrist_keys
     
     def _check_graph_validity(self):
         for vertex, edges in self._edges.items():
@@ -0,0 +1,63 @@
+import random
+from typing import Iterable, Optional
+
+
+# Troop counts up to EXACT_TROOPS are hashed exactly, larger stacks are bucketed by their power of two, e.g.
+# 16-31 troops share a bucket, up to the last bucket which holds every stack above that.
+EXACT_TROOPS = 15
+TROOP_BUCKETS = 24
+
+# Occupiers are player ids, plus None (or the engine's -1) for an unclaimed territory.
+MAX_PLAYERS = 16
+
+# The keys are generated from a fixed seed, so the engine, every client and every process agree on the hash
+# of a position, and hashes can be stored between queries.
+_SEED = 0x5EED_2157
+
+
+def get_troop_bucket(troops: int) -> int:
+    if troops <= EXACT_TROOPS:
+        return troops
+    return min(EXACT_TROOPS - 4 + troops.bit_length(), TROOP_BUCKETS - 1)
+
+
+class ZobristKeys():
+    """Random 64 bit keys for the (occupier, troop bucket) of every territory. The hash of a board is the XOR
+    of the keys of every territory's occupier and troop bucket, so it can be updated incrementally when a
+    single territory changes, by XORing out the old key and XORing in the new one.
+    """
+
+    def __init__(self, territory_ids: Iterable[int]):
+        size = max(territory_ids) + 1
+        rng = random.Random(_SEED)
+        self.occupier_keys: list[list[int]] = [[rng.getrandbits(64) for _ in range(MAX_PLAYERS + 1)] for _ in range(size)]
+        self.troop_keys: list[list[int]] = [[rng.getrandbits(64) for _ in range(TROOP_BUCKETS)] for _ in range(size)]
+
+
+    def get_occupier_key(self, territory: int, occupier: Optional[int]) -> int:
+        return self.occupier_keys[territory][0 if occupier is None or occupier < 0 else occupier + 1]
+
+
+    def get_troops_key(self, territory: int, troops: int) -> int:
+        return self.troop_keys[territory][get_troop_bucket(troops)]
+
+
+    def get_occupier_change(self, territory: int, previous_occupier: Optional[int], occupier: Optional[int]) -> int:
+        """The value to XOR into a hash when the territory changes occupier.
+        """
+        return self.get_occupier_key(territory, previous_occupier) ^ self.get_occupier_key(territory, occupier)
+
+
+    def get_troops_change(self, territory: int, previous_troops: int, troops: int) -> int:
+        """The value to XOR into a hash when the territory's troops change, 0 if they stay in the same bucket.
+        """
+        return self.get_troops_key(territory, previous_troops) ^ self.get_troops_key(territory, troops)
+
+
+    def hash(self, territories: Iterable[tuple[int, Optional[int], int]]) -> int:
+        """Hashes a whole board from (territory, occupier, troops) for every territory.
+        """
+        result = 0
+        for territory, occupier, troops in territories:
+            result ^= self.get_occupier_key(territory, occupier) ^ self.get_troops_key(territory, troops)
+        return result
\ No newline at end of file
@@ -0,0 +1,179 @@
+import json
+import mmap
+import struct
+from typing import Any, Iterator, Type, Union
+
+from pydantic import BaseModel
+from risk_shared.protocol import compact
+from risk_shared.records.record_start_turn import RecordStartTurn
+from risk_shared.records.types.record_type import RecordType
+
+
+# The binary recording is a columnar alternative to game.json, which can be indexed without decoding the
+# whole file. All integers are little endian. The layout is
+#
+#     header      magic b"RREC", format version (u16), reserved (u16), record count N (u32), turn count T (u32)
+#     types       N x u8, the index of the record's tag in the version's RECORD_TAGS, with PACKED_FLAG set if the payload is packed integers
+#     offsets     (N + 1) x u32, the start of each record's payload, relative to the start of the payload section
+#     turns       T x u32, the index of the RecordStartTurn which starts each turn
+#     payload     the records
+#
+# Each record's payload is its compact encoding (see risk_shared.protocol.compact) without the tag, either as
+# i32s if every field is an integer (which is most records, e.g. attacks and defends) or otherwise as compact JSON.
+MAGIC = b"RREC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+PACKED_FLAG = 0x80
+
+# The type column indexes into the tag table of the recording's format version. The tables are pinned here
+# rather than taken from compact.TAGS so reordering the compact tags can't change the meaning of recordings
+# already on disk. A new record type, or a change to the fields of an existing one, needs a new VERSION with
+# its own table, recordings of older versions stay readable as long as their records still decode.
+RECORD_TAGS_BY_VERSION: dict[int, list[str]] = {
+    1: ["ma", "map", "mc", "md", "mdt", "mf", "mfp", "mp", "mr", "mt",
+        "ra", "rb", "rc", "rd", "prd", "re", "pre", "rr", "rs", "rg", "prg", "rt", "rtc", "rw"],
+}
+RECORD_TAGS: list[str] = RECORD_TAGS_BY_VERSION[VERSION]
+
+_TAG_INDEX: dict[str, int] = dict([(x, i) for i, x in enumerate(RECORD_TAGS)])
+
+
+class BinaryRecordingError(ValueError):
+    pass
+
+
+def dump_binary_recording(recording: list[RecordType]) -> bytes:
+    types = bytearray()
+    offsets: list[int] = []
+    turns: list[int] = []
+    payload = bytearray()
+
+    for i, record in enumerate(recording):
+        tag, *fields = compact.to_compact(record)
+        if tag not in _TAG_INDEX:
+            raise BinaryRecordingError(f"Record type {record.record_type} has no tag in binary recording version {VERSION}.")
+        offsets.append(len(payload))
+
+        if isinstance(record, RecordStartTurn):
+            turns.append(i)
+
+        if all(type(x) in (int, bool) for x in fields):
+            types.append(_TAG_INDEX[tag] | PACKED_FLAG)
+            payload += struct.pack(f"<{len(fields)}i", *fields)
+        else:
+            types.append(_TAG_INDEX[tag])
+            payload += json.dumps(fields, separators=(",", ":")).encode()
+
+    offsets.append(len(payload))
+
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, 0, len(recording), len(turns)),
+        bytes(types),
+        struct.pack(f"<{len(offsets)}I", *offsets),
+        struct.pack(f"<{len(turns)}I", *turns),
+        bytes(payload),
+    ])
+
+
+class BinaryRecording():
+    """Random access into a binary recording, records are only decoded when they are asked for, so reading
+    a single turn out of a long game doesn't require parsing the rest of it.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        self._data = data
+        if len(data) < HEADER.size:
+            raise BinaryRecordingError("Binary recording is truncated.")
+
+        magic, version, _, self._record_count, self._turn_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise BinaryRecordingError("Not a binary recording.")
+        if version not in RECORD_TAGS_BY_VERSION:
+            raise BinaryRecordingError(f"Unsupported binary recording version {version}.")
+        self._version: int = version
+        self._record_tags = RECORD_TAGS_BY_VERSION[version]
+
+        self._types_offset = HEADER.size
+        self._offsets_offset = self._types_offset + self._record_count
+        self._turns_offset = self._offsets_offset + 4 * (self._record_count + 1)
+        self._payload_offset = self._turns_offset + 4 * self._turn_count
+
+
+    @classmethod
+    def open(cls, path: str) -> "BinaryRecording":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+    def __len__(self) -> int:
+        return self._record_count
+
+
+    def __iter__(self) -> Iterator[RecordType]:
+        for i in range(self._record_count):
+            yield self[i]
+
+
+    def _check_index(self, i: int) -> int:
+        if i < 0:
+            i += self._record_count
+        if not 0 <= i < self._record_count:
+            raise IndexError(f"Record {i} out of range for recording of length {self._record_count}.")
+        return i
+
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+
+    def _get_tag(self, type_byte: int) -> str:
+        index = type_byte & ~PACKED_FLAG
+        if index >= len(self._record_tags):
+            raise BinaryRecordingError(f"Unknown record type {index} for binary recording version {self._version}.")
+        return self._record_tags[index]
+
+
+    def get_record_model(self, i: int) -> Type[BaseModel]:
+        """The type of the i-th record, without decoding it.
+        """
+        return compact.TAGS[self._get_tag(self._data[self._types_offset + self._check_index(i)])]
+
+
+    def __getitem__(self, i: int) -> RecordType:
+        i = self._check_index(i)
+        type_byte = self._data[self._types_offset + i]
+        start, end = struct.unpack_from("<II", self._data, self._offsets_offset + 4 * i)
+        start += self._payload_offset
+        end += self._payload_offset
+
+        fields: list[Any]
+        if type_byte & PACKED_FLAG:
+            fields = list(struct.unpack_from(f"<{(end - start) // 4}i", self._data, start))
+        else:
+            fields = json.loads(bytes(self._data[start:end]))
+
+        return compact.from_compact([self._get_tag(type_byte)] + fields)
+
+
+    @property
+    def turn_count(self) -> int:
+        return self._turn_count
+
+
+    def get_turn_range(self, turn: int) -> range:
+        """The record indices of the given turn, from its RecordStartTurn up to the next one.
+        """
+        if not 0 <= turn < self._turn_count:
+            raise IndexError(f"Turn {turn} out of range for recording with {self._turn_count} turns.")
+
+        start = struct.unpack_from("<I", self._data, self._turns_offset + 4 * turn)[0]
+        if turn + 1 < self._turn_count:
+            end = struct.unpack_from("<I", self._data, self._turns_offset + 4 * (turn + 1))[0]
+        else:
+            end = self._record_count
+        return range(start, end)
+
+
+    def get_turn(self, turn: int) -> list[RecordType]:
+        return [self[i] for i in self.get_turn_range(turn)]
\ No newline at end of file
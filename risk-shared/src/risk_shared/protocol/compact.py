@@ -0,0 +1,165 @@
+import json
+from typing import Any, Type
+
+from pydantic import BaseModel
+from risk_shared.models.card_model import CardModel
+from risk_shared.models.player_model import PlayerModel, PublicPlayerModel
+from risk_shared.models.territory_model import TerritoryModel
+from risk_shared.queries.query_attack import QueryAttack
+from risk_shared.queries.query_claim_territory import QueryClaimTerritory
+from risk_shared.queries.query_defend import QueryDefend
+from risk_shared.queries.query_distribute_troops import QueryDistributeTroops
+from risk_shared.queries.query_fortify import QueryFortify
+from risk_shared.queries.query_place_initial_troop import QueryPlaceInitialTroop
+from risk_shared.queries.query_redeem_cards import QueryRedeemCards
+from risk_shared.queries.query_troops_after_attack import QueryTroopsAfterAttack
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_attack_pass import MoveAttackPass
+from risk_shared.records.moves.move_claim_territory import MoveClaimTerritory
+from risk_shared.records.moves.move_defend import MoveDefend
+from risk_shared.records.moves.move_distribute_troops import MoveDistributeTroops
+from risk_shared.records.moves.move_fortify import MoveFortify
+from risk_shared.records.moves.move_fortify_pass import MoveFortifyPass
+from risk_shared.records.moves.move_place_initial_troop import MovePlaceInitialTroop
+from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
+from risk_shared.records.moves.move_troops_after_attack import MoveTroopsAfterAttack
+from risk_shared.records.record_attack import RecordAttack
+from risk_shared.records.record_banned import RecordBanned
+from risk_shared.records.record_cancelled import RecordCancelled
+from risk_shared.records.record_drew_card import PublicRecordDrewCard, RecordDrewCard
+from risk_shared.records.record_player_eliminated import PublicRecordPlayerEliminated, RecordPlayerEliminated
+from risk_shared.records.record_redeemed_cards import RecordRedeemedCards
+from risk_shared.records.record_shuffled_cards import RecordShuffledCards
+from risk_shared.records.record_start_game import PublicRecordStartGame, RecordStartGame
+from risk_shared.records.record_start_turn import RecordStartTurn
+from risk_shared.records.record_territory_conquered import RecordTerritoryConquered
+from risk_shared.records.record_winner import RecordWinner
+
+
+# The compact encoding is JSON, but every model is written as an array of its field values in declaration order,
+# prefixed with a short type tag, rather than as an object of field names. The record_type and query_type
+# discriminator fields are implied by the tag so they are left out. For example the MoveAttack
+#
+#     {"record_type": "move_attack", "move_by_player": 1, "attacking_territory": 2, "defending_territory": 3, "attacking_troops": 3}
+#
+# is written as ["ma",1,2,3,3].
+#
+# A plain list whose first element is a string is prefixed with the empty tag "" so that it can't be confused
+# with a model. All dictionary keys in the protocol are integers, and are converted back on decoding.
+#
+# No message in the protocol is nested more than a few levels deep, so anything nested deeper than MAX_DEPTH
+# is rejected rather than decoded recursively.
+MAX_DEPTH = 32
+
+TAGS: dict[str, Type[BaseModel]] = {
+    "c": CardModel,
+    "p": PlayerModel,
+    "pp": PublicPlayerModel,
+    "t": TerritoryModel,
+
+    "qa": QueryAttack,
+    "qc": QueryClaimTerritory,
+    "qd": QueryDefend,
+    "qdt": QueryDistributeTroops,
+    "qf": QueryFortify,
+    "qp": QueryPlaceInitialTroop,
+    "qr": QueryRedeemCards,
+    "qt": QueryTroopsAfterAttack,
+
+    "ma": MoveAttack,
+    "map": MoveAttackPass,
+    "mc": MoveClaimTerritory,
+    "md": MoveDefend,
+    "mdt": MoveDistributeTroops,
+    "mf": MoveFortify,
+    "mfp": MoveFortifyPass,
+    "mp": MovePlaceInitialTroop,
+    "mr": MoveRedeemCards,
+    "mt": MoveTroopsAfterAttack,
+
+    "ra": RecordAttack,
+    "rb": RecordBanned,
+    "rc": RecordCancelled,
+    "rd": RecordDrewCard,
+    "prd": PublicRecordDrewCard,
+    "re": RecordPlayerEliminated,
+    "pre": PublicRecordPlayerEliminated,
+    "rr": RecordRedeemedCards,
+    "rs": RecordShuffledCards,
+    "rg": RecordStartGame,
+    "prg": PublicRecordStartGame,
+    "rt": RecordStartTurn,
+    "rtc": RecordTerritoryConquered,
+    "rw": RecordWinner,
+}
+
+_MODEL_TAGS: dict[Type[BaseModel], str] = dict([(y, x) for x, y in TAGS.items()])
+_IMPLIED_FIELDS = frozenset(["record_type", "query_type"])
+_FIELDS: dict[Type[BaseModel], list[str]] = dict([(model, [x for x in model.model_fields.keys() if x not in _IMPLIED_FIELDS]) for model in TAGS.values()])
+
+
+def to_compact(value: Any) -> Any:
+    """Converts a value into the plain python structure of its compact encoding.
+    """
+    match value:
+        case BaseModel():
+            model = type(value)
+            return [_MODEL_TAGS[model]] + [to_compact(getattr(value, field)) for field in _FIELDS[model]]
+        case list() | tuple():
+            result = [to_compact(x) for x in value]
+            if len(result) > 0 and isinstance(result[0], str):
+                result.insert(0, "")
+            return result
+        case dict():
+            return dict([(str(x), to_compact(y)) for x, y in value.items()])
+        case _:
+            return value
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(to_compact(value), separators=(",", ":"))
+
+
+def dumps_model(value: BaseModel, encoded_fields: dict[str, str]) -> str:
+    """Like dumps, but the fields in encoded_fields are taken as already encoded compact JSON.
+    """
+    model = type(value)
+    fields = [json.dumps(_MODEL_TAGS[model])] + [encoded_fields[field] if field in encoded_fields else dumps(getattr(value, field)) for field in _FIELDS[model]]
+    return "[" + ",".join(fields) + "]"
+
+
+def from_compact(value: Any, depth: int = 0) -> Any:
+    """Inverse of to_compact, models are validated as they are rebuilt, so a malformed message raises
+    a pydantic ValidationError (or a ValueError for an unknown tag or a value nested too deeply).
+    """
+    if depth > MAX_DEPTH:
+        raise ValueError(f"Values can't be nested more than {MAX_DEPTH} deep.")
+
+    match value:
+        case [str() as tag, *fields]:
+            if tag == "":
+                return [from_compact(x, depth + 1) for x in fields]
+            if tag not in TAGS:
+                raise ValueError(f"Unknown type tag '{tag}'.")
+
+            model = TAGS[tag]
+            model_fields = _FIELDS[model]
+            if len(fields) != len(model_fields):
+                raise ValueError(f"Expected {len(model_fields)} fields for '{tag}', got {len(fields)}.")
+            return model.model_validate(dict(zip(model_fields, [from_compact(x, depth + 1) for x in fields])))
+        case list():
+            return [from_compact(x, depth + 1) for x in value]
+        case dict():
+            return dict([(int(x), from_compact(y, depth + 1)) for x, y in value.items()])
+        case _:
+            return value
+
+
+def loads(data: str) -> Any:
+    # json.loads is recursive too, so a message can be nested deeply enough to exhaust the stack before
+    # from_compact gets to check its depth.
+    try:
+        value = json.loads(data)
+    except RecursionError:
+        raise ValueError(f"Values can't be nested more than {MAX_DEPTH} deep.")
+    return from_compact(value)
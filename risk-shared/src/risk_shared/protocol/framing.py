@@ -0,0 +1,207 @@
+import codecs
+import math
+import os
+import select
+import struct
+import sys
+import time
+from typing import Optional
+
+
+# Messages between the engine and submissions are framed in one of two ways.
+#
+# Legacy framing is the message length in characters as ASCII digits, a comma, then the message, e.g. '5,hello'.
+#
+# Binary framing is a fixed width header of a magic byte, an encoding byte and the message length in bytes
+# as a big-endian unsigned 32 bit integer, followed by the message. The magic byte can never be an ASCII digit,
+# so the framing of a message can be told apart from its first byte.
+#
+# The engine always starts in legacy framing, and switches to binary framing for a player once that player has
+# sent it a binary framed message, so old submissions keep working unchanged. Likewise the engine replies in
+# whichever encoding the player last sent a message in.
+#
+# Until then, every query the engine sends carries an extra PROTOCOL_FIELD set to PROTOCOL_VERSION, to advertise
+# that it understands binary framing and the compact encoding. Submissions which don't know about it ignore the
+# extra field, and submissions only switch once they have seen it, so new submissions keep working against an
+# old engine too.
+PROTOCOL_FIELD = "protocol"
+PROTOCOL_VERSION = 1
+
+BINARY_FRAME_MAGIC = 0xFF
+BINARY_FRAME_HEADER = struct.Struct("!BBI")
+
+ENCODING_JSON = 0
+ENCODING_COMPACT = 1 # See risk_shared.protocol.compact.
+ENCODINGS = frozenset([ENCODING_JSON, ENCODING_COMPACT])
+
+READ_SIZE = 65536
+
+
+class FramingError(ValueError):
+    pass
+
+
+def encode_legacy_frame(data: str) -> bytes:
+    return (str(len(data)) + "," + data).encode()
+
+
+def encode_binary_frame(data: bytes, encoding: int = ENCODING_JSON) -> bytes:
+    return BINARY_FRAME_HEADER.pack(BINARY_FRAME_MAGIC, encoding, len(data)) + data
+
+
+def wait_for_fd(fd: int, deadline_ns: Optional[int], write: bool = False) -> None:
+    """Waits until fd is ready to read (or write), raising TimeoutError if the monotonic deadline passes first.
+    With no deadline this returns immediately, and the following read or write is expected to block.
+    """
+    if deadline_ns is None:
+        return
+
+    timeout_ns = deadline_ns - time.monotonic_ns()
+    if timeout_ns <= 0:
+        raise TimeoutError
+
+    # poll has no limit on fd numbers but doesn't work on FIFOs on macOS, so only use it on Linux.
+    if sys.platform == "linux":
+        poller = select.poll()
+        poller.register(fd, select.POLLOUT if write else select.POLLIN)
+        ready = len(poller.poll(math.ceil(timeout_ns / 1_000_000))) > 0
+    else:
+        readable, writable, _ = select.select([] if write else [fd], [fd] if write else [], [], timeout_ns / 1_000_000_000)
+        ready = len(readable) > 0 or len(writable) > 0
+
+    if not ready:
+        raise TimeoutError
+
+
+def write_all(fd: int, data: bytes, deadline_ns: Optional[int] = None) -> None:
+    view = memoryview(data)
+    while len(view) > 0:
+        wait_for_fd(fd, deadline_ns, write=True)
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            continue
+        view = view[written:]
+
+
+def read_some(fd: int, size: int, deadline_ns: Optional[int] = None) -> bytes:
+    while True:
+        wait_for_fd(fd, deadline_ns)
+        try:
+            return os.read(fd, size)
+        except BlockingIOError:
+            continue
+
+
+class FrameDecoder():
+    """Splits a stream of bytes into framed messages, without doing any IO itself, so it can be driven by
+    blocking reads (FrameReader) or by an event loop.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._max_digits = math.floor(math.log10(max_size)) + 1
+        self._buffer = bytearray()
+
+        # State of a partially read legacy framed message, whose size is in characters rather than bytes.
+        self._legacy_size: Optional[int] = None
+        self._legacy_decoder = codecs.getincrementaldecoder("utf-8")(errors="surrogateescape")
+        self._legacy_text = ""
+
+
+    def feed(self, data: bytes) -> None:
+        self._buffer.extend(data)
+
+
+    def next(self) -> Optional[tuple[bool, int, bytes]]:
+        """Returns the next complete message as whether it was binary framed, its encoding and its content,
+        or None if more data is needed.
+        """
+        if self._legacy_size is not None:
+            return self._next_legacy_body()
+
+        if len(self._buffer) == 0:
+            return None
+
+        if self._buffer[0] == BINARY_FRAME_MAGIC:
+            if len(self._buffer) < BINARY_FRAME_HEADER.size:
+                return None
+
+            _, encoding, size = BINARY_FRAME_HEADER.unpack_from(self._buffer)
+            if size > self._max_size:
+                raise FramingError(f"You send a message that was too long, {size} > {self._max_size} maximum.")
+            if len(self._buffer) < BINARY_FRAME_HEADER.size + size:
+                return None
+
+            data = bytes(self._buffer[BINARY_FRAME_HEADER.size:BINARY_FRAME_HEADER.size + size])
+            del self._buffer[:BINARY_FRAME_HEADER.size + size]
+            return (True, encoding, data)
+
+        # Read size of legacy message.
+        comma = self._buffer.find(b",", 0, self._max_digits + 1)
+        if comma == -1:
+            if len(self._buffer) >= self._max_digits + 1 or not self._buffer.isdigit():
+                raise FramingError("You send a message with a malformed message size.")
+            return None
+
+        if comma == 0 or not self._buffer[:comma].isdigit():
+            raise FramingError("You send a message with a malformed message size.")
+
+        size = int(self._buffer[:comma])
+        if size > self._max_size:
+            raise FramingError(f"You send a message that was too long, {size} > {self._max_size} maximum.")
+
+        del self._buffer[:comma + 1]
+        self._legacy_size = size
+        return self._next_legacy_body()
+
+
+    def _next_legacy_body(self) -> Optional[tuple[bool, int, bytes]]:
+        size = self._legacy_size
+        assert size is not None
+
+        # Invalid bytes are decoded as surrogates so that anything past the end of this message can be turned
+        # back into the exact bytes of the next message.
+        self._legacy_text += self._legacy_decoder.decode(bytes(self._buffer))
+        self._buffer.clear()
+
+        if len(self._legacy_text) < size:
+            return None
+
+        text = self._legacy_text
+        self._buffer.extend(text[size:].encode(errors="surrogateescape") + self._legacy_decoder.getstate()[0])
+        self._legacy_size = None
+        self._legacy_decoder.reset()
+        self._legacy_text = ""
+
+        try:
+            return (False, ENCODING_JSON, text[:size].encode())
+        except UnicodeEncodeError:
+            raise FramingError("You send a message which was not valid UTF-8.")
+
+
+class FrameReader():
+    """Reads framed messages from a raw file descriptor with unbuffered os.read calls, in bulk, instead of a
+    character at a time through a text wrapper.
+
+    If a monotonic deadline (from time.monotonic_ns) is given to read, the descriptor should be non-blocking,
+    and TimeoutError is raised if the whole message hasn't arrived by the deadline.
+    """
+
+    def __init__(self, fd: int, max_size: int):
+        self._fd = fd
+        self._decoder = FrameDecoder(max_size)
+
+
+    def read(self, deadline_ns: Optional[int] = None) -> tuple[bool, int, bytes]:
+        """Reads the next message, returning whether it was binary framed, its encoding and its content.
+        """
+        while True:
+            message = self._decoder.next()
+            if message is not None:
+                return message
+
+            chunk = read_some(self._fd, READ_SIZE, deadline_ns)
+            if not chunk:
+                raise EOFError
+            self._decoder.feed(chunk)
@@ -1,4 +1,4 @@
-from typing import Literal, Sequence, final
+from typing import Literal, Optional, Sequence, final
 from risk_shared.models.player_model import PlayerModel, PublicPlayerModel
 from risk_shared.records.base_record import BaseRecord
 
@@ -7,6 +7,7 @@ class RecordStartGame(BaseRecord):
     record_type: Literal["record_start_game"] = "record_start_game"
     turn_order: Sequence[int]
     players: Sequence[PlayerModel]
+    seed: Optional[int] = None
 
 @final
 class PublicRecordStartGame(BaseRecord):
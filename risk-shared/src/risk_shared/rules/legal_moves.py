@@ -0,0 +1,80 @@
+import itertools
+from typing import Sequence, Tuple
+
+from risk_shared.maps.map import Map, mask_to_territories
+from risk_shared.models.card_model import CardModel
+
+
+# The legal moves for a player, computed from territory bitsets (bit v is set if territory v is in the set) as
+# maintained by the engine's EngineState and the helper's ClientState:
+#
+#     owned_mask      the territories the player occupies
+#     movable_mask    the territories the player occupies with at least 2 troops, i.e. which troops can leave
+#     unclaimed_mask  the territories no player occupies yet
+#
+# The is_legal_* functions expect territory ids which exist on the map.
+
+MAX_ATTACKING_TROOPS = 3
+MAX_DEFENDING_TROOPS = 2
+
+
+def get_attack_targets_mask(map: Map, owned_mask: int, territory: int) -> int:
+    """The territories which can be attacked from `territory`, if it has troops to spare.
+    """
+    return map.get_adjacent_mask(territory) & ~owned_mask
+
+
+def get_fortify_targets_mask(map: Map, owned_mask: int, territory: int) -> int:
+    """The territories which troops can be moved to from `territory`, if it has troops to spare.
+    """
+    return map.get_adjacent_mask(territory) & owned_mask
+
+
+def is_legal_attack(map: Map, owned_mask: int, attacking_territory: int, defending_territory: int) -> bool:
+    return (owned_mask >> attacking_territory) & 1 == 1 and (get_attack_targets_mask(map, owned_mask, attacking_territory) >> defending_territory) & 1 == 1
+
+
+def is_legal_fortify(map: Map, owned_mask: int, source_territory: int, target_territory: int) -> bool:
+    return (owned_mask >> source_territory) & 1 == 1 and (get_fortify_targets_mask(map, owned_mask, source_territory) >> target_territory) & 1 == 1
+
+
+def get_max_attacking_troops(troops: int) -> int:
+    """The most troops which can be committed to one attack from a territory with `troops`, one must stay behind.
+    """
+    return min(MAX_ATTACKING_TROOPS, troops - 1)
+
+
+def get_max_defending_troops(troops: int) -> int:
+    return min(MAX_DEFENDING_TROOPS, troops)
+
+
+def get_legal_attacks(map: Map, owned_mask: int, movable_mask: int) -> list[Tuple[int, int]]:
+    """Every (attacking_territory, defending_territory) pair the player can attack with.
+    """
+    return [(x, y) for x in mask_to_territories(movable_mask & owned_mask) for y in mask_to_territories(get_attack_targets_mask(map, owned_mask, x))]
+
+
+def get_legal_fortifies(map: Map, owned_mask: int, movable_mask: int) -> list[Tuple[int, int]]:
+    """Every (source_territory, target_territory) pair the player can move troops between.
+    """
+    return [(x, y) for x in mask_to_territories(movable_mask & owned_mask) for y in mask_to_territories(get_fortify_targets_mask(map, owned_mask, x))]
+
+
+def get_legal_claims(unclaimed_mask: int) -> list[int]:
+    return mask_to_territories(unclaimed_mask)
+
+
+def is_card_set(symbols: Sequence[str]) -> bool:
+    """Whether cards with these symbols form a set: three of the same symbol, one of each symbol, or any set
+    with a wildcard.
+    """
+    distinct = set(symbols)
+    if "Wildcard" in distinct:
+        return True
+    return len(distinct) == 1 or len(distinct) == 3
+
+
+def get_card_sets(cards: Sequence[CardModel]) -> list[Tuple[CardModel, CardModel, CardModel]]:
+    """Every set of three of the cards which can be redeemed.
+    """
+    return [x for x in itertools.combinations(cards, 3) if is_card_set([card.symbol for card in x])]
\ No newline at end of file
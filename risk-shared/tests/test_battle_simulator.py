@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from risk_shared.battle.battle_simulator import simulate_battles
+from risk_shared.battle.battle_table import BattleTable
+
+SAMPLES = 20000
+ATTACKERS = [1, 2, 3, 5, 8, 12, 12]
+DEFENDERS = [1, 1, 2, 4, 6, 3, 12]
+
+
+@pytest.fixture(scope="module")
+def table() -> BattleTable:
+    return BattleTable.compute(16)
+
+
+def test_agrees_with_battle_table(table: BattleTable):
+    simulation = simulate_battles(ATTACKERS, DEFENDERS, samples=SAMPLES, rng=np.random.default_rng(0))
+    assert simulation.samples == SAMPLES
+
+    attackers_histogram = simulation.get_attackers_remaining_histogram()
+    defenders_histogram = simulation.get_defenders_remaining_histogram()
+    for i, (a, d) in enumerate(zip(ATTACKERS, DEFENDERS)):
+        # Within 5 standard errors of the exact probability, which a correct simulator fails about once in
+        # a million runs, and the seed makes it deterministic anyway.
+        p = table.get_win_probability(a, d)
+        assert abs(simulation.get_win_probabilities()[i] - p) <= 5 * np.sqrt(p * (1 - p) / SAMPLES) + 1e-9
+
+        attackers_expected = table.get_attackers_remaining_distribution(a, d)
+        defenders_expected = table.get_defenders_remaining_distribution(a, d)
+        assert np.abs(attackers_histogram[i, :a + 1] / SAMPLES - attackers_expected).sum() / 2 < 0.02
+        assert np.abs(defenders_histogram[i, :d + 1] / SAMPLES - defenders_expected).sum() / 2 < 0.02
+        assert attackers_histogram[i, a + 1:].sum() == 0 and defenders_histogram[i, d + 1:].sum() == 0
+
+        assert simulation.get_expected_attackers_remaining()[i] == pytest.approx(table.get_expected_attackers_remaining(a, d), abs=0.1)
+        assert simulation.get_expected_defenders_remaining()[i] == pytest.approx(table.get_expected_defenders_remaining(a, d), abs=0.1)
+
+
+def test_stop_at():
+    simulation = simulate_battles([10, 10], [10, 10], stop_at=[4, 0], samples=1000, rng=np.random.default_rng(1))
+    stopped = simulation.defenders_remaining[0] > 0
+    assert (simulation.attackers_remaining[0][stopped] <= 4).all()
+    assert (simulation.attackers_remaining[0] >= 2).all()
+    assert ((simulation.attackers_remaining[1] == 0) | (simulation.defenders_remaining[1] == 0)).all()
+
+
+def test_seeded():
+    first = simulate_battles([6], [4], samples=100, rng=np.random.default_rng(2))
+    second = simulate_battles([6], [4], samples=100, rng=np.random.default_rng(2))
+    assert np.array_equal(first.attackers_remaining, second.attackers_remaining)
+
+
+def test_invalid_stacks():
+    with pytest.raises(ValueError):
+        simulate_battles([1, 2], [1])
+    with pytest.raises(ValueError):
+        simulate_battles([-1], [1])
@@ -0,0 +1,95 @@
+import functools
+import itertools
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from risk_shared.battle import battle_table
+from risk_shared.battle.battle_table import BattleTable, get_battle_table, get_roll_loss_probabilities
+
+LIMIT = 10
+
+
+@functools.cache
+def get_roll_outcomes(attacking_dice: int, defending_dice: int) -> dict[tuple[int, int], Fraction]:
+    """(attacker losses, defender losses) of a single roll, by rolling every die.
+    """
+    outcomes: dict[tuple[int, int], Fraction] = {}
+    for roll in itertools.product(range(1, 7), repeat=attacking_dice + defending_dice):
+        attacking_rolls = sorted(roll[:attacking_dice], reverse=True)
+        defending_rolls = sorted(roll[attacking_dice:], reverse=True)
+        attacker_lost = sum(1 for x, y in zip(attacking_rolls, defending_rolls) if x <= y)
+        key = (attacker_lost, min(attacking_dice, defending_dice) - attacker_lost)
+        outcomes[key] = outcomes.get(key, Fraction(0)) + Fraction(1, 6 ** (attacking_dice + defending_dice))
+    return outcomes
+
+
+@functools.cache
+def get_final_stacks(attackers: int, defenders: int) -> dict[tuple[int, int], Fraction]:
+    """The exact distribution of (attackers, defenders) remaining when the battle ends, by recursing over every roll.
+    """
+    if attackers == 0 or defenders == 0:
+        return { (attackers, defenders): Fraction(1) }
+
+    result: dict[tuple[int, int], Fraction] = {}
+    for (attacker_lost, defender_lost), p in get_roll_outcomes(min(attackers, 3), min(defenders, 2)).items():
+        for stacks, q in get_final_stacks(attackers - attacker_lost, defenders - defender_lost).items():
+            result[stacks] = result.get(stacks, Fraction(0)) + p * q
+    return result
+
+
+@pytest.fixture(scope="module")
+def table() -> BattleTable:
+    return BattleTable.compute(LIMIT)
+
+
+def test_roll_loss_probabilities():
+    # The well known odds of three dice against two.
+    assert get_roll_loss_probabilities(3, 2) == pytest.approx((2890 / 7776, 2611 / 7776, 2275 / 7776))
+    assert get_roll_loss_probabilities(1, 1) == pytest.approx((15 / 36, 21 / 36))
+
+
+def test_outcomes_match_recursion(table: BattleTable):
+    # A battle between two empty stacks can't happen, so it has no outcome in the table.
+    for attackers, defenders in list(itertools.product(range(LIMIT + 1), repeat=2))[1:]:
+        final_stacks = get_final_stacks(attackers, defenders)
+
+        attackers_remaining = np.zeros(attackers + 1)
+        defenders_remaining = np.zeros(defenders + 1)
+        for (a, d), p in final_stacks.items():
+            attackers_remaining[a] += float(p)
+            defenders_remaining[d] += float(p)
+
+        assert table.get_win_probability(attackers, defenders) == pytest.approx(float(sum(p for (_, d), p in final_stacks.items() if d == 0)), abs=1e-12)
+        assert table.get_attackers_remaining_distribution(attackers, defenders) == pytest.approx(attackers_remaining, abs=1e-12)
+        assert table.get_defenders_remaining_distribution(attackers, defenders) == pytest.approx(defenders_remaining, abs=1e-12)
+
+
+def test_expected_remaining(table: BattleTable):
+    final_stacks = get_final_stacks(7, 5)
+    assert table.get_expected_attackers_remaining(7, 5) == pytest.approx(float(sum(a * p for (a, _), p in final_stacks.items())))
+    assert table.get_expected_defenders_remaining(7, 5) == pytest.approx(float(sum(d * p for (_, d), p in final_stacks.items())))
+
+
+def test_out_of_range(table: BattleTable):
+    with pytest.raises(IndexError):
+        table.get_win_probability(LIMIT + 1, 1)
+    with pytest.raises(IndexError):
+        table.get_attackers_remaining_distribution(1, -1)
+    with pytest.raises(ValueError):
+        BattleTable.compute(0)
+
+
+def test_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(battle_table, "_loaded_tables", {})
+    computed = get_battle_table(LIMIT, str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    monkeypatch.setattr(battle_table, "_loaded_tables", {})
+    loaded = get_battle_table(LIMIT, str(tmp_path))
+    assert loaded is not computed
+    assert np.array_equal(loaded.outcomes, computed.outcomes)
+
+    # A larger table already in memory covers smaller limits.
+    assert get_battle_table(LIMIT - 1, str(tmp_path)) is loaded
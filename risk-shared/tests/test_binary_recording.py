@@ -0,0 +1,71 @@
+import struct
+
+import pytest
+
+from risk_shared.output.binary_recording import HEADER, MAGIC, RECORD_TAGS_BY_VERSION, VERSION, BinaryRecording, BinaryRecordingError, dump_binary_recording
+from risk_shared.protocol import compact
+from risk_shared.records.base_record import BaseRecord
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.record_attack import RecordAttack
+from risk_shared.records.record_cancelled import RecordCancelled
+from risk_shared.records.record_start_turn import RecordStartTurn
+from risk_shared.records.types.record_type import RecordType
+
+RECORDING: list[RecordType] = [
+    RecordStartTurn(player=0, continents_held=[1], territories_held=9, continent_bonus=2, territory_bonus=3),
+    MoveAttack(move_by_player=0, attacking_territory=1, defending_territory=2, attacking_troops=3),
+    RecordAttack(move_attack_id=1, move_defend_id=2, attacking_troops_lost=1, defending_troops_lost=1, territory_conquered=False, defender_eliminated=False),
+    RecordStartTurn(player=1, continents_held=[], territories_held=4, continent_bonus=0, territory_bonus=3),
+    RecordCancelled(reason="Game took too long."),
+]
+
+
+def test_round_trip():
+    data = dump_binary_recording(RECORDING)
+    recording = BinaryRecording(data)
+    assert recording.version == VERSION
+    assert list(recording) == RECORDING
+    assert recording[-1] == RECORDING[-1]
+    assert recording.get_record_model(2) == RecordAttack
+    assert recording.turn_count == 2
+    assert recording.get_turn(0) == RECORDING[:3]
+    assert recording.get_turn(1) == RECORDING[3:]
+
+
+def test_header_version():
+    magic, version, _, record_count, turn_count = HEADER.unpack_from(dump_binary_recording(RECORDING), 0)
+    assert (magic, version, record_count, turn_count) == (MAGIC, VERSION, len(RECORDING), 2)
+
+
+def test_every_record_has_a_tag():
+    record_tags = [x for x, y in compact.TAGS.items() if issubclass(y, BaseRecord)]
+    assert sorted(record_tags) == sorted(RECORD_TAGS_BY_VERSION[VERSION])
+
+
+def test_version_one_tags_are_pinned():
+    # Recordings already on disk depend on these indices, they must never change.
+    assert RECORD_TAGS_BY_VERSION[1].index("ma") == 0
+    assert RECORD_TAGS_BY_VERSION[1].index("rt") == 21
+    assert RECORD_TAGS_BY_VERSION[1].index("rw") == 23
+
+
+def test_unsupported_version():
+    data = bytearray(dump_binary_recording(RECORDING))
+    struct.pack_into("<H", data, 4, max(RECORD_TAGS_BY_VERSION) + 1)
+    with pytest.raises(BinaryRecordingError):
+        BinaryRecording(data)
+
+
+def test_unknown_record_type():
+    data = bytearray(dump_binary_recording(RECORDING))
+    data[HEADER.size] = 0x7F
+    recording = BinaryRecording(data)
+    with pytest.raises(BinaryRecordingError):
+        recording[0]
+    with pytest.raises(BinaryRecordingError):
+        recording.get_record_model(0)
+
+
+def test_truncated():
+    with pytest.raises(BinaryRecordingError):
+        BinaryRecording(dump_binary_recording(RECORDING)[:HEADER.size - 1])
@@ -0,0 +1,54 @@
+import pytest
+from pydantic import ValidationError
+
+from risk_shared.models.card_model import CardModel
+from risk_shared.models.player_model import PlayerModel
+from risk_shared.protocol import compact
+from risk_shared.queries.query_attack import QueryAttack
+from risk_shared.records.moves.move_attack import MoveAttack
+from risk_shared.records.moves.move_redeem_cards import MoveRedeemCards
+from risk_shared.records.record_start_game import RecordStartGame
+
+
+def test_round_trip_move():
+    move = MoveAttack(move_by_player=1, attacking_territory=2, defending_territory=3, attacking_troops=3)
+    assert compact.dumps(move) == '["ma",1,2,3,3]'
+    assert compact.loads(compact.dumps(move)) == move
+
+
+def test_round_trip_nested_models():
+    players = [PlayerModel(player_id=x, team_id=x, troops_remaining=25, alive=True, cards=[CardModel(card_id=x, territory_id=x, symbol="Infantry")], must_place_territory_bonus=[]) for x in range(5)]
+    record = RecordStartGame(turn_order=[4, 3, 2, 1, 0], players=players, seed=7)
+    query = QueryAttack(update={0: record, 1: MoveRedeemCards(move_by_player=0, sets=[], cause="turn_started")})
+    assert compact.loads(compact.dumps(query)) == query
+
+
+def test_round_trip_plain_values():
+    for value in [[], ["a", "b"], [1, "a"], {1: ["a"], 2: {3: 4}}, None, "a", 1.5]:
+        assert compact.from_compact(compact.to_compact(value)) == value
+
+
+def test_unknown_tag():
+    with pytest.raises(ValueError, match="Unknown type tag"):
+        compact.loads('["zz",1]')
+
+
+def test_wrong_field_count():
+    with pytest.raises(ValueError, match="Expected 4 fields"):
+        compact.loads('["ma",1,2,3]')
+
+
+def test_invalid_field():
+    with pytest.raises(ValidationError):
+        compact.loads('["ma",1,2,3,"x"]')
+
+
+@pytest.mark.parametrize("data", [
+    '["ma",' + "[" * 900 + "]" * 900 + ",1,2,3]",
+    "[" * 5000 + "]" * 5000,
+    '{"0":' * 5000 + "0" + "}" * 5000,
+    "[" * (compact.MAX_DEPTH + 2) + "]" * (compact.MAX_DEPTH + 2),
+], ids=["nested_field", "nested_list", "nested_dict", "past_max_depth"])
+def test_deeply_nested(data: str):
+    with pytest.raises(ValueError, match="nested"):
+        compact.loads(data)
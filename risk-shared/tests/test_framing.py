@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from risk_shared.protocol.framing import ENCODING_COMPACT, ENCODING_JSON, FrameDecoder, FrameReader, FramingError, encode_binary_frame, encode_legacy_frame
+
+
+MESSAGES = [
+    (False, ENCODING_JSON, encode_legacy_frame('{"a":1}')),
+    (True, ENCODING_COMPACT, encode_binary_frame(b'["ma",1,2,3,3]', ENCODING_COMPACT)),
+    (False, ENCODING_JSON, encode_legacy_frame('"é中\U0001f600"')),
+    (True, ENCODING_JSON, encode_binary_frame("é中".encode())),
+    (False, ENCODING_JSON, encode_legacy_frame("")),
+]
+
+
+def _decode(chunks: list[bytes]) -> list[tuple[bool, int, bytes]]:
+    decoder = FrameDecoder(4096)
+    result = []
+    for chunk in chunks:
+        decoder.feed(chunk)
+        while (message := decoder.next()) is not None:
+            result.append(message)
+    return result
+
+
+def _expected() -> list[tuple[bool, int, bytes]]:
+    # The content of a legacy frame is everything after the comma.
+    return [(x, y, z[z.index(b",") + 1:] if not x else z[6:]) for x, y, z in MESSAGES]
+
+
+def test_decode_whole_stream():
+    assert _decode([b"".join([x for _, _, x in MESSAGES])]) == _expected()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+def test_decode_split_reads(size: int):
+    # Splitting at every offset also splits multi-byte characters and frame headers across reads.
+    stream = b"".join([x for _, _, x in MESSAGES])
+    assert _decode([stream[i:i + size] for i in range(0, len(stream), size)]) == _expected()
+
+
+def test_legacy_size_is_in_characters():
+    assert _decode([encode_legacy_frame("éé") + b"1,a"]) == [(False, ENCODING_JSON, "éé".encode()), (False, ENCODING_JSON, b"a")]
+
+
+@pytest.mark.parametrize("data", [b",abc", b"1a,b", b"12345,", encode_binary_frame(b"x" * 5000)], ids=["empty_size", "malformed_size", "too_long", "binary_too_long"])
+def test_decode_malformed(data: bytes):
+    with pytest.raises(FramingError):
+        _decode([data])
+
+
+def test_reader():
+    read_fd, write_fd = os.pipe()
+    try:
+        os.write(write_fd, b"".join([x for _, _, x in MESSAGES]))
+        os.close(write_fd)
+        reader = FrameReader(read_fd, 4096)
+        assert [reader.read() for _ in MESSAGES] == _expected()
+        with pytest.raises(EOFError):
+            reader.read()
+    finally:
+        os.close(read_fd)
@@ -0,0 +1,14 @@
+import itertools
+
+from risk_shared.maps import earth
+from risk_shared.rules import legal_moves
+
+
+def test_card_sets():
+    cards = list(earth.create_cards().values())
+    cards = cards[:8] + [x for x in cards if x.symbol == "Wildcard"]
+    for card_set in itertools.combinations(cards, 3):
+        symbols = [x.symbol for x in card_set]
+        expected = "Wildcard" in symbols or len(set(symbols)) in (1, 3)
+        assert legal_moves.is_card_set(symbols) == expected
+        assert (card_set in legal_moves.get_card_sets(list(card_set))) == expected
@@ -0,0 +1,32 @@
+import pytest
+
+from risk_shared.maps.earth import create_map
+
+
+def test_lookups_match_edges():
+    map = create_map()
+    for v in map.get_vertices():
+        assert map.get_adjacent_set(v) == frozenset(map.get_adjacent_to(v))
+        for u in map.get_vertices():
+            assert map.is_adjacent(v, u) == (u in map.get_adjacent_to(v))
+            assert (map.get_adjacent_mask(v) >> u) & 1 == map.is_adjacent(v, u)
+            assert (map.get_distance(v, u) == 1) == map.is_adjacent(v, u)
+
+
+@pytest.mark.parametrize("v", [-1, -42, 42, 1000])
+def test_unknown_territory(v: int):
+    map = create_map()
+    with pytest.raises(KeyError):
+        map.is_adjacent(v, 0)
+    with pytest.raises(KeyError):
+        map.get_adjacent_set(v)
+    with pytest.raises(KeyError):
+        map.get_adjacent_mask(v)
+    with pytest.raises(KeyError):
+        map.get_distance(0, v)
+
+
+def test_unknown_second_territory_is_not_adjacent():
+    map = create_map()
+    assert not map.is_adjacent(0, -1)
+    assert not map.is_adjacent(0, 1000)
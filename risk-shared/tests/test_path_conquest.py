@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from risk_shared.battle.battle_table import BattleTable
+from risk_shared.battle.path_conquest import PathConquest
+
+LIMIT = 16
+PATHS = [[], [1], [3], [3, 2], [2, 2, 2], [5, 1, 4], [1, 1, 1, 1, 1, 1]]
+
+
+def get_survivors_distribution(table: BattleTable, attackers: int, defenders: list[int]) -> np.ndarray:
+    """Fights the path one battle at a time, leaving one troop behind after every conquest.
+    """
+    available = { attackers: 1.0 }
+    for d in defenders:
+        next_available: dict[int, float] = {}
+        for a, p in available.items():
+            for k, q in enumerate(table.get_attackers_remaining_distribution(a, d)):
+                if k > 0:
+                    next_available[k - 1] = next_available.get(k - 1, 0.0) + p * q
+        available = next_available
+
+    if len(defenders) == 0:
+        distribution = np.zeros(attackers + 1)
+        distribution[attackers] = 1
+        return distribution
+
+    distribution = np.zeros(attackers + 1)
+    for k, p in available.items():
+        distribution[k + 1] += p
+    distribution[0] = 1 - distribution.sum()
+    return distribution
+
+
+@pytest.fixture(scope="module")
+def table() -> BattleTable:
+    return BattleTable.compute(LIMIT)
+
+
+def test_matches_sequential_battles(table: BattleTable):
+    conquest = PathConquest(table)
+    for attackers in range(1, LIMIT + 1):
+        for path in PATHS:
+            expected = get_survivors_distribution(table, attackers, path)
+            # Survivor counts which can't be reached after leaving troops behind are left off the end.
+            distribution = conquest.get_survivors_distribution(attackers, path)
+            assert np.pad(distribution, (0, len(expected) - len(distribution))) == pytest.approx(expected, abs=1e-12)
+            assert conquest.get_conquest_probability(attackers, path) == pytest.approx(1 - expected[0] if len(path) > 0 else 1.0, abs=1e-12)
+            assert conquest.get_expected_survivors(attackers, path) == pytest.approx(float(np.dot(expected, np.arange(len(expected)))), abs=1e-12)
+
+
+def test_single_battle_matches_table(table: BattleTable):
+    conquest = PathConquest(table)
+    for attackers in range(1, LIMIT + 1):
+        assert conquest.get_conquest_probability(attackers, [4]) == pytest.approx(table.get_win_probability(attackers, 4))
+
+
+def test_batch_and_cache(table: BattleTable):
+    conquest = PathConquest(table, cache_size=None)
+    probabilities = conquest.get_conquest_probabilities(12, PATHS)
+    conquest.clear_cache()
+    assert probabilities == [conquest.get_conquest_probability(12, x) for x in PATHS]
+
+
+def test_out_of_range(table: BattleTable):
+    conquest = PathConquest(table)
+    with pytest.raises(IndexError):
+        conquest.get_conquest_probability(LIMIT + 1, [1])
+    with pytest.raises(IndexError):
+        conquest.get_conquest_probability(5, [1, LIMIT + 1])
@@ -0,0 +1,31 @@
+from risk_shared.maps.earth import create_map
+from risk_shared.maps.zobrist import EXACT_TROOPS, TROOP_BUCKETS, ZobristKeys, get_troop_bucket
+
+
+def test_troop_buckets():
+    assert [get_troop_bucket(x) for x in range(EXACT_TROOPS + 1)] == list(range(EXACT_TROOPS + 1))
+    assert get_troop_bucket(16) == get_troop_bucket(31) == EXACT_TROOPS + 1
+    assert get_troop_bucket(32) == EXACT_TROOPS + 2
+    assert get_troop_bucket(10 ** 9) == TROOP_BUCKETS - 1
+
+    buckets = [get_troop_bucket(x) for x in range(100000)]
+    assert buckets == sorted(buckets)
+
+
+def test_keys_are_shared():
+    # Every process generates the same keys, so hashes can be compared between the engine and clients.
+    assert ZobristKeys(range(42)).occupier_keys == ZobristKeys(range(42)).occupier_keys
+    assert create_map().get_zobrist_keys() is create_map().get_zobrist_keys()
+
+
+def test_changes_match_full_hash():
+    keys = ZobristKeys(range(3))
+    board = [(0, None, 0), (1, 2, 5), (2, 3, 40)]
+    full = keys.hash(board)
+
+    # The engine's -1 and the helper's None are both an unclaimed territory.
+    assert keys.hash([(0, -1, 0), (1, 2, 5), (2, 3, 40)]) == full
+
+    changed = full ^ keys.get_occupier_change(0, None, 1) ^ keys.get_troops_change(0, 0, 3) ^ keys.get_troops_change(2, 40, 50)
+    assert changed == keys.hash([(0, 1, 3), (1, 2, 5), (2, 3, 50)])
+    assert keys.get_troops_change(2, 40, 50) == 0
@@ -0,0 +1,209 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from signal import SIGKILL
+from typing import Any, Optional
+
+NUM_PLAYERS = 5
+PIPE_PERMISSIONS = 0o660
+DIRECTORY_PERMISSIONS = 0o775
+ENGINE_TIMEOUT_SECONDS = 15 * 60
+
+# Each match runs the engine and a process per player, and submissions are timed on wall clock, so running
+# a match per core would starve them and turn slow moves into timeouts.
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) // (NUM_PLAYERS + 1))
+
+def main():
+
+    # python3 tournament_simulator.py --submissions example_submissions/simple.py example_submissions/complex.py --matches 1000
+
+    commands = parse_cmd_args(sys.argv[1:])
+
+    if "--submissions" not in commands or len(commands["--submissions"]) == 0:
+        print_usage()
+    roster = commands["--submissions"]
+
+    try:
+        matches = int(commands["--matches"][0]) if "--matches" in commands else 1
+        workers = int(commands["--workers"][0]) if "--workers" in commands else DEFAULT_WORKERS
+        seed = int(commands["--seed"][0]) if "--seed" in commands else random.randrange(2**32)
+    except (ValueError, IndexError):
+        print_usage()
+
+    output = commands["--output"][0] if "--output" in commands and len(commands["--output"]) == 1 else "tournament_results.json"
+
+    for source in roster:
+        if not os.path.isfile(source):
+            print(f"Submission {source} does not exist.")
+            print_usage()
+
+    # Every match gets its own seat assignment and engine seed, decided up front so the schedule is reproducible.
+    rng = random.Random(seed)
+    schedule = [([os.path.abspath(rng.choice(roster)) for _ in range(NUM_PLAYERS)], rng.randrange(2**32)) for _ in range(matches)]
+
+    print(f"[tournament]: running {matches} matches on {workers} workers (seed={seed}).", flush=True)
+    match_results: list[dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_match, i, seats, match_seed) for i, (seats, match_seed) in enumerate(schedule)]
+        for future in as_completed(futures):
+            match_result = future.result()
+            match_results.append(match_result)
+            print(f"[tournament]: match {match_result['match']} complete ({len(match_results)}/{matches}), outcome was {match_result['result']}", flush=True)
+
+    match_results.sort(key=lambda x: x["match"])
+    with open(output, "w") as f:
+        f.write(json.dumps(aggregate_results(match_results, seed), indent=2))
+
+    print(f"[tournament]: results written to {output}.")
+
+
+def parse_cmd_args(args: list[str]):
+    commands = {}
+
+    current_command = None
+    for arg in args:
+        if arg[:2] == "--":
+            current_command = arg
+            commands[current_command] = []
+            continue
+
+        if current_command == None:
+            print_usage()
+
+        commands[current_command].append(arg)
+
+    for command in commands.keys():
+        if command not in ["--submissions", "--matches", "--workers", "--seed", "--output"]:
+            print_usage()
+
+    return commands
+
+
+def print_usage():
+    print(
+    "Usage: python3 tournament_simulator.py [options]\n"
+    "   options:\n"
+    "       --submissions <path> ...    The roster of submissions, each match seats 5 submissions drawn from the roster at random.\n"
+    "       --matches <count>           The number of matches to run, defaults to 1.\n"
+    "       --workers <count>           The number of matches to run concurrently, defaults to one per 6 cores (at least 1).\n"
+    "                                   Running more at once can make submissions time out that wouldn't in a real match.\n"
+    "       --seed <seed>               Seed for the seat assignments and match seeds, defaults to a random seed.\n"
+    "       --output <path>             Where to write the aggregated results, defaults to tournament_results.json.\n"
+    "\n"
+    "   examples:\n"
+    "       python3 tournament_simulator.py --submissions example_submissions/simple.py example_submissions/complex.py --matches 1000\n")
+    sys.exit(0)
+
+
+def run_match(match: int, seats: list[str], seed: int) -> dict[str, Any]:
+    """Runs a single match in its own sandbox directory, so that any number of matches can run
+    concurrently. Returns the parsed results.json of the match.
+    """
+
+    sandbox = tempfile.mkdtemp(prefix=f"risk_match_{match}_")
+    try:
+        setup_sandbox(sandbox, seats)
+        submission_pids = start_submissions(sandbox)
+
+        try:
+            start_engine(sandbox, seed)
+        finally:
+            for pid in submission_pids:
+                try:
+                    os.kill(pid, SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        try:
+            with open(f"{sandbox}/output/results.json", "r") as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            result = { "result_type": "CRASHED", "reason": "Game engine crashed." }
+
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    return { "match": match, "seed": seed, "seats": seats, "result": result }
+
+
+def setup_sandbox(sandbox: str, seats: list[str]):
+    os.mkdir(f"{sandbox}/output")
+    os.mkdir(f"{sandbox}/input")
+
+    for player, source in enumerate(seats):
+        os.makedirs(f"{sandbox}/submission{player}/io", mode=DIRECTORY_PERMISSIONS)
+        os.mkfifo(f"{sandbox}/submission{player}/io/to_engine.pipe", mode=PIPE_PERMISSIONS)
+        os.mkfifo(f"{sandbox}/submission{player}/io/from_engine.pipe", mode=PIPE_PERMISSIONS)
+        shutil.copy(source, f"{sandbox}/submission{player}/submission.py")
+
+    catalog = [{ "team_id": i } for i in range(NUM_PLAYERS)]
+    with open(f"{sandbox}/input/catalog.json", "w") as f:
+        f.write(json.dumps(catalog))
+
+
+def start_submissions(sandbox: str) -> list[int]:
+    player_pids = []
+    for player in range(NUM_PLAYERS):
+        directory = f"{sandbox}/submission{player}"
+        with open(f"{directory}/io/submission.log", "w") as f_log, open(f"{directory}/io/submission.err", "w") as f_err:
+            process = subprocess.Popen(["python3", "submission.py"], cwd=directory, stdout=f_log, stderr=f_err)
+
+        player_pids.append(process.pid)
+
+    return player_pids
+
+
+def start_engine(sandbox: str, seed: int):
+    env = dict(os.environ)
+    env["GAME_ENGINE_CORE_DIRECTORY"] = sandbox
+    env["GAME_ENGINE_SEED"] = str(seed)
+
+    with open(f"{sandbox}/output/engine.log", "w") as f_log, open(f"{sandbox}/output/engine.err", "w") as f_err:
+        try:
+            subprocess.run(["python3", "-m", "risk_engine"], cwd=sandbox, env=env, stdout=f_log, stderr=f_err, timeout=ENGINE_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def aggregate_results(match_results: list[dict[str, Any]], seed: Optional[int]) -> dict[str, Any]:
+    """Aggregates the match results into per-submission and per-seat rank counts, where
+    rank_counts[i] is the number of times the submission (or seat) finished in position i + 1.
+    """
+
+    def empty_entry():
+        return { "matches": 0, "rank_counts": [0] * NUM_PLAYERS, "banned": 0, "cancelled": 0, "crashed": 0 }
+
+    submissions: dict[str, dict[str, Any]] = {}
+    seats: dict[int, dict[str, Any]] = dict([(x, empty_entry()) for x in range(NUM_PLAYERS)])
+
+    for match_result in match_results:
+        result = match_result["result"]
+        for seat, source in enumerate(match_result["seats"]):
+            entries = [seats[seat], submissions.setdefault(source, empty_entry())]
+            for entry in entries:
+                entry["matches"] += 1
+                match result["result_type"]:
+                    case "SUCCESS":
+                        entry["rank_counts"][result["ranking"].index(seat)] += 1
+                    case "PLAYER_BANNED":
+                        if result["player"] == seat:
+                            entry["banned"] += 1
+                    case "CANCELLED":
+                        entry["cancelled"] += 1
+                    case _:
+                        entry["crashed"] += 1
+
+    for entry in list(submissions.values()) + list(seats.values()):
+        ranked = sum(entry["rank_counts"])
+        entry["mean_rank"] = sum((i + 1) * count for i, count in enumerate(entry["rank_counts"])) / ranked if ranked > 0 else None
+
+    return { "seed": seed, "submissions": submissions, "seats": seats, "matches": match_results }
+
+
+if __name__ == "__main__":
+    main()